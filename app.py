@@ -12,10 +12,15 @@ Usage:
     # Server runs at http://127.0.0.1:5000
 """
 
-from flask import Flask, request
+from flask import Flask, abort, request, send_file
 import base64
+import functools
 import os
 import re
+from contextlib import closing
+
+from src.index import MappingRow, lookup_index, open_index, read_key_mapping, scan_index_ids
+from src.keys import AES_BIT_LENGTH, derive_article_key, load_master_key
 
 app = Flask(__name__)
 
@@ -27,7 +32,11 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 INPUT_PNG = os.path.join(BASE_DIR, "encryption", "carrier", "base_image.png")
 OUTPUT_PNG_DIR = os.path.join(BASE_DIR, "encryption", "carrier", "encoded")
-KEY_INFO_FILE = os.path.join(BASE_DIR, "encryption", "key", "key_mapping.txt")
+GENERATION_PREFIX = "gen-"  # Encoder generation directories (see publish.new_generation_dir)
+KEY_INFO_FILE = os.path.join(BASE_DIR, "encryption", "key", "key_mapping.txt")  # Legacy fallback
+INDEX_FILE = os.path.join(BASE_DIR, "encryption", "key", "index.sqlite3")
+INDEX_PAGE_SIZE = 200  # Articles per index page
+MASTER_KEY_FILE = os.path.join(BASE_DIR, "encryption", "key", "master.key")
 
 # Keywords to block AI/crawler requests
 AI_KEYWORDS = [
@@ -56,43 +65,103 @@ def reject_ai_crawler():
     return False, "", 200
 
 
-def read_article_mapping(mapping_file: str) -> dict:
+def read_mapping_by_id(mapping_file: str) -> dict:
     """
-    Read article-image-key mapping from file.
-
-    Expected format (tab-separated with header):
-    ARTICLE_NAME    IMAGE_PATH    AES_KEY_B64    PAYLOAD_LEN
+    Read a TSV key mapping (see index.read_key_mapping) keyed by article id.
 
     Args:
         mapping_file: Path to mapping file
 
     Returns:
-        Dict mapping article_id to {img_path, aes_key_b64, payload_len}
+        Dict mapping article_id (file name without extension) to its mapping row
+    """
+    return {os.path.splitext(name)[0]: row for name, row in read_key_mapping(mapping_file).items()}
+
+
+def row_to_article(row: MappingRow) -> dict:
+    """
+    Convert a mapping row (index or TSV) to the article dict used by the pages.
+
+    Args:
+        row: Mapping row
+
+    Returns:
+        Article mapping entry: {id, img_path, aes_key_b64, payload_len, width, height,
+        lsb_bits, webp_path, tiles, key_version, atlas_offset}
+    """
+    return {
+        "id": os.path.splitext(row.article)[0],
+        "img_path": row.img_path,
+        "aes_key_b64": row.aes_key_b64,
+        "payload_len": row.payload_len,
+        "width": row.width or None,
+        "height": row.height or None,
+        "lsb_bits": row.lsb_bits,
+        "webp_path": row.webp_path or None,
+        "tiles": row.tiles.split(",") if row.tiles else [],
+        "key_version": row.key_version,
+        "atlas_offset": row.atlas_offset,
+    }
+
+
+def get_article(article_id: str):
+    """
+    Look up one article by id.
+
+    Uses a primary-key lookup in the SQLite article index; trees encoded
+    before the index existed fall back to parsing the TSV mapping.
+
+    Args:
+        article_id: Article id
+
+    Returns:
+        Article mapping entry, or None if unknown
+    """
+    if not os.path.exists(INDEX_FILE):
+        row = read_mapping_by_id(KEY_INFO_FILE).get(article_id)
+    else:
+        with closing(open_index(INDEX_FILE, readonly=True)) as conn:
+            row = lookup_index(conn, article_id, BASE_DIR)
+    return row_to_article(row) if row else None
+
+
+def list_article_ids(after: str = "", limit: int = INDEX_PAGE_SIZE) -> list:
+    """
+    List article ids in order, starting after `after`.
+
+    Args:
+        after: Exclusive lower bound (pagination cursor)
+        limit: Maximum number of ids
+
+    Returns:
+        Sorted list of article ids
+    """
+    if not os.path.exists(INDEX_FILE):
+        return [i for i in sorted(read_mapping_by_id(KEY_INFO_FILE)) if i > after][:limit]
+    with closing(open_index(INDEX_FILE, readonly=True)) as conn:
+        return scan_index_ids(conn, after, limit)
+
+
+@functools.lru_cache(maxsize=1)
+def master_key() -> bytes:
+    """Master key for derived-key articles (read once per process)."""
+    return load_master_key(MASTER_KEY_FILE)
+
+
+def article_key_b64(art: dict) -> str:
+    """
+    Base64 AES key of an article: stored in the mapping, or derived on demand.
+
+    Args:
+        art: Article mapping entry
+
+    Returns:
+        Base64 key string
     """
-    mp = {}
-    with open(mapping_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    if not lines:
-        raise RuntimeError("Mapping file is empty")
-
-    for line in lines[1:]:  # Skip header
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split("\t")
-        if len(parts) != 4:
-            continue  # Skip malformed lines
-        article_id, img_path, aes_key_b64, payload_len = parts
-        # Use filename without extension as ID
-        article_key = os.path.splitext(article_id)[0]
-        mp[article_key] = {
-            "id": article_key,
-            "img_path": img_path,
-            "aes_key_b64": aes_key_b64,
-            "payload_len": int(payload_len),
-        }
-    return mp
+    if not art["key_version"]:
+        return art["aes_key_b64"]
+    key = derive_article_key(master_key(), art["id"], art["key_version"], AES_BIT_LENGTH)
+    return base64.b64encode(key).decode()
 
 
 def img_to_base64(img_path: str) -> str:
@@ -100,14 +169,88 @@ def img_to_base64(img_path: str) -> str:
     Convert local image to Base64 data URL.
 
     Args:
-        img_path: Path to image file
+        img_path: Path to image file (.png or .webp)
 
     Returns:
         Base64 data URL string
     """
+    mime = "image/webp" if img_path.lower().endswith(".webp") else "image/png"
     with open(img_path, "rb") as f:
         b64 = base64.b64encode(f.read()).decode()
-    return f"data:image/png;base64,{b64}"
+    return f"data:{mime};base64,{b64}"
+
+
+def client_accepts_webp() -> bool:
+    """
+    Check whether the client explicitly lists image/webp in its Accept header.
+
+    A bare */* is not treated as WebP support.
+
+    Returns:
+        True if image/webp is accepted with non-zero quality
+    """
+    return any(mime == "image/webp" and q > 0 for mime, q in request.accept_mimetypes)
+
+
+def select_article_image(art: dict, index: int = 0) -> str:
+    """
+    Pick the encoded image variant to serve for an article (or one of its tiles).
+
+    Args:
+        art: Article mapping entry
+        index: Tile index (tiled articles only)
+
+    Returns:
+        Path to the WebP variant if available and accepted, else the PNG
+    """
+    if art["tiles"]:
+        png_path = art["tiles"][index]
+        webp_path = os.path.splitext(png_path)[0] + ".webp" if art.get("webp_path") else None
+    else:
+        png_path, webp_path = art["img_path"], art.get("webp_path")
+    return select_image_variant(png_path, webp_path)
+
+
+def select_image_variant(png_path: str, webp_path: str = None) -> str:
+    """
+    Pick between the PNG and WebP encodings of one image.
+
+    Args:
+        png_path: Path to the PNG
+        webp_path: Path to the WebP variant, if any
+
+    Returns:
+        webp_path if it exists and the client accepts WebP, else png_path
+    """
+    if webp_path and client_accepts_webp() and os.path.exists(webp_path):
+        return webp_path
+    return png_path
+
+
+def tile_url_prefix(art: dict) -> str:
+    """
+    URL prefix of an article's tiles (tile i is fetched from prefix + i).
+
+    Tiles written into an encoder generation are addressed by generation
+    and file name, so the page keeps fetching the tiles that belong to its
+    inlined first tile and key even after the article is re-encoded or
+    rotated; they stay available until prune_generations removes the
+    generation. Other tiles are looked up by article id.
+
+    Args:
+        art: Article mapping entry
+
+    Returns:
+        URL prefix ending in "/"
+    """
+    if art["tiles"]:
+        gen_dir, name = os.path.split(os.path.normpath(art["tiles"][0]))
+        generation = os.path.basename(gen_dir)
+        if (os.path.dirname(gen_dir) == os.path.normpath(OUTPUT_PNG_DIR)
+                and generation.startswith(GENERATION_PREFIX)):
+            tileset = os.path.splitext(os.path.splitext(name)[0])[0]  # <tileset>.0.png
+            return f"/tiles/{generation}/{tileset}/"
+    return f"/tiles/{art['id']}/"
 
 
 def safe_title(s: str) -> str:
@@ -132,11 +275,15 @@ def index_page():
     if blocked:
         return html, code
 
-    mapping = read_article_mapping(KEY_INFO_FILE)
     base_img_b64 = img_to_base64(INPUT_PNG)
 
-    # Generate sorted list of article IDs
-    ids = sorted(mapping.keys())
+    # One page of article IDs, in order, from an ordered range scan
+    after = request.args.get("after", "")
+    ids = list_article_ids(after, INDEX_PAGE_SIZE + 1)
+    next_link = ""
+    if len(ids) > INDEX_PAGE_SIZE:
+        ids = ids[:INDEX_PAGE_SIZE]
+        next_link = f'<div class="item"><a href="/?after={safe_title(ids[-1])}">Next page</a></div>'
 
     return f"""<!doctype html>
 <html>
@@ -208,6 +355,7 @@ def index_page():
       <div class="hint">Click an article to view (decrypted client-side)</div>
       <div class="list">
         {''.join([f'<div class="item"><a href="/{safe_title(i)}">{safe_title(i)}</a></div>' for i in ids])}
+        {next_link}
       </div>
     </div>
   </body>
@@ -215,6 +363,43 @@ def index_page():
 """
 
 
+# -------------------------- Routes: Article Tiles --------------------------
+
+@app.get("/tiles/<article_id>/<int:index>")
+def article_tile(article_id: str, index: int):
+    """Serve one tile image of a tiled article (fetched by the article page script)."""
+    blocked, html, code = reject_ai_crawler()
+    if blocked:
+        return html, code
+
+    art = get_article(safe_title(article_id))
+    if art is None or index >= len(art["tiles"]):
+        abort(404)
+
+    response = send_file(select_article_image(art, index), max_age=0)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+@app.get("/tiles/<generation>/<tileset>/<int:index>")
+def generation_tile(generation: str, tileset: str, index: int):
+    """Serve one tile from the encoder generation the article page was rendered from."""
+    blocked, html, code = reject_ai_crawler()
+    if blocked:
+        return html, code
+
+    gen_dir = os.path.join(OUTPUT_PNG_DIR, generation)
+    png_path = os.path.join(gen_dir, f"{tileset}.{index}.png")
+    if (not generation.startswith(GENERATION_PREFIX) or tileset.startswith(".")
+            or not os.path.isdir(gen_dir) or not os.path.isfile(png_path)):
+        abort(404)
+
+    response = send_file(select_image_variant(png_path, os.path.splitext(png_path)[0] + ".webp"),
+                         max_age=0)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
 # -------------------------- Routes: Article Page --------------------------
 
 @app.get("/<article_id>")
@@ -225,9 +410,9 @@ def article_page(article_id: str):
         return html, code
 
     article_id = safe_title(article_id)
-    mapping = read_article_mapping(KEY_INFO_FILE)
+    art = get_article(article_id)
 
-    if article_id not in mapping:
+    if art is None:
         return f"""<html><head><meta charset="utf-8"></head>
         <body style="font-family:system-ui;padding:30px;">
         <h3>404: Article not found</h3>
@@ -235,11 +420,12 @@ def article_page(article_id: str):
         <p><a href="/">Back to index</a></p>
         </body></html>""", 404
 
-    art = mapping[article_id]
     base_img_b64 = img_to_base64(INPUT_PNG)
 
-    # Load the steganographic image for this article
-    img_b64 = img_to_base64(art["img_path"])
+    # Load the steganographic image for this article (WebP when the client accepts it).
+    # Tiled articles inline their first tile; the rest are fetched from /tiles/.
+    img_b64 = img_to_base64(select_article_image(art))
+    tile_count = max(len(art["tiles"]), 1)
 
     return f"""<!doctype html>
 <html>
@@ -342,8 +528,12 @@ def article_page(article_id: str):
 
       <div class="card"
            id="article-card"
-           data-key="{art['aes_key_b64']}"
+           data-key="{article_key_b64(art)}"
            data-payload="{art['payload_len']}"
+           data-lsb-bits="{art['lsb_bits']}"
+           data-offset="{max(art['atlas_offset'], 0)}"
+           data-tiles="{tile_count}"
+           data-tile-url="{tile_url_prefix(art)}"
            data-img="{img_b64}">
         <div class="article-title">{article_id}</div>
         <div class="content content-loading" id="content">(loading...)</div>
@@ -360,20 +550,21 @@ def article_page(article_id: str):
         return bytes;
       }}
 
-      function lsbBitsToBytes(bits) {{
-        const data = new Uint8Array(Math.floor(bits.length / 8));
-        for (let i = 0; i < data.length; i++) {{
-          let byte = 0;
-          for (let j = 0; j < 8; j++) {{
-            if (i + j >= bits.length) break;
-            byte = (byte << 1) | bits[i * 8 + j];
-          }}
-          data[i] = byte;
-        }}
-        return data;
+      // Versioned payload container (see encoder.seal_payload):
+      // [4s "ELCP"][u8 version][u8 flags][u8 codec][u8 lsb_bits][u16 nonce len][u32 ct len]
+      // ([u16 tile index][u16 tile count] when FLAG_TILED)[nonce][ct]
+      const CONTAINER_MAGIC = [0x45, 0x4C, 0x43, 0x50];
+      const CONTAINER_VERSION = 1;
+      const CONTAINER_HEADER_LEN = 14;
+      const TILE_EXTENSION_LEN = 4;
+      const FLAG_TILED = 0x01;
+      const KNOWN_FLAGS = FLAG_TILED;
+
+      function containerHeaderLen(flags) {{
+        return CONTAINER_HEADER_LEN + (flags & FLAG_TILED ? TILE_EXTENSION_LEN : 0);
       }}
 
-      async function extractDataFromPng(imgB64, dataLen) {{
+      async function loadCarrier(imgB64) {{
         const img = new Image();
         const canvas = document.createElement('canvas');
         const ctx = canvas.getContext('2d');
@@ -388,54 +579,154 @@ def article_page(article_id: str):
         canvas.width = img.width;
         canvas.height = img.height;
         ctx.drawImage(img, 0, 0);
+        return {{ ctx, w: canvas.width, h: canvas.height }};
+      }}
 
-        const imageData = ctx.getImageData(0, 0, canvas.width, canvas.height);
-        const pixels = imageData.data;
-        const w = canvas.width, h = canvas.height;
+      // Fill `out` from the low lsbBits of R, G, B (skipping alpha), MSB first,
+      // starting at RGB channel index `start`. Only the rows needed are read back.
+      function readLsb(carrier, start, out, lsbBits) {{
+        const {{ ctx, w, h }} = carrier;
+        const rowChannels = w * 3;
+        const end = start + Math.ceil(out.length * 8 / lsbBits);
+        if (end > rowChannels * h) {{
+          throw new Error(`Data too long! Need ${{end}} channel values, image only has ${{rowChannels * h}}`);
+        }}
+        if (!out.length) return out;
+
+        const row0 = Math.floor(start / rowChannels);
+        const pixels = ctx.getImageData(0, row0, w, Math.ceil(end / rowChannels) - row0).data;
+
+        const mask = (1 << lsbBits) - 1;
+        let acc = 0, accBits = 0, byteIdx = 0;
+        for (let c = start - row0 * rowChannels; byteIdx < out.length; c++) {{
+          acc = (acc << lsbBits) | (pixels[((c / 3) | 0) * 4 + (c % 3)] & mask);
+          accBits += lsbBits;
+          if (accBits >= 8) {{
+            accBits -= 8;
+            out[byteIdx++] = (acc >> accBits) & 0xFF;
+            acc &= (1 << accBits) - 1;
+          }}
+        }}
+        return out;
+      }}
+
+      function hasContainerMagic(bytes) {{
+        return bytes.length >= CONTAINER_HEADER_LEN && CONTAINER_MAGIC.every((b, i) => bytes[i] === b);
+      }}
 
-        const needBits = dataLen * 8;
-        const maxBits = w * h * 3;
-        if (needBits > maxBits) {{
-          throw new Error(`Data too long! Need ${{needBits}} bits, image only has ${{maxBits}} bits`);
+      // The container header is always embedded at 1 bit per channel; legacy
+      // payloads (no header) need their length and density from the page.
+      // Atlas images hold many articles: `offset` is the first channel of ours,
+      // and only the rows up to the end of our payload are read back.
+      async function extractDataFromPng(imgB64, legacyLen, legacyLsbBits = 1, offset = 0) {{
+        const carrier = await loadCarrier(imgB64);
+        const head = readLsb(carrier, offset, new Uint8Array(CONTAINER_HEADER_LEN), 1);
+        if (!hasContainerMagic(head)) {{
+          return readLsb(carrier, offset, new Uint8Array(legacyLen), legacyLsbBits);
         }}
 
-        const bits = [];
-        let bitIdx = 0;
-        for (let y = 0; y < h && bitIdx < needBits; y++) {{
-          for (let x = 0; x < w && bitIdx < needBits; x++) {{
-            const off = (y * w + x) * 4;
-            const r = pixels[off];
-            const g = pixels[off + 1];
-            const b = pixels[off + 2];
-
-            bits.push(r & 1); bitIdx++;
-            if (bitIdx >= needBits) break;
-            bits.push(g & 1); bitIdx++;
-            if (bitIdx >= needBits) break;
-            bits.push(b & 1); bitIdx++;
-            if (bitIdx >= needBits) break;
+        const view = new DataView(head.buffer);
+        const lsbBits = view.getUint8(7);
+        const headerLen = containerHeaderLen(view.getUint8(5));
+        const bodyLen = view.getUint16(8, false) + view.getUint32(10, false);
+        const payload = new Uint8Array(headerLen + bodyLen);
+        payload.set(head);
+        readLsb(carrier, offset + CONTAINER_HEADER_LEN * 8, payload.subarray(CONTAINER_HEADER_LEN, headerLen), 1);
+        readLsb(carrier, offset + headerLen * 8, payload.subarray(headerLen), lsbBits);
+        return payload;
+      }}
+
+      // Zero-copy parse: every section is a subarray view of `payload`
+      function parsePayload(payload) {{
+        const view = new DataView(payload.buffer, payload.byteOffset, payload.byteLength);
+        if (hasContainerMagic(payload)) {{
+          const version = view.getUint8(4);
+          if (version !== CONTAINER_VERSION) {{
+            throw new Error(`Unsupported payload version: ${{version}}`);
+          }}
+          const flags = view.getUint8(5);
+          if (flags & ~KNOWN_FLAGS) {{
+            throw new Error(`Unsupported payload flags: ${{flags}}`);
           }}
+          const headerLen = containerHeaderLen(flags);
+          const nonceEnd = headerLen + view.getUint16(8, false);
+          const ctLen = view.getUint32(10, false);
+          const tiled = (flags & FLAG_TILED) !== 0;
+          return {{
+            version, flags,
+            codec: view.getUint8(6),
+            tileIndex: tiled ? view.getUint16(CONTAINER_HEADER_LEN, false) : 0,
+            tileCount: tiled ? view.getUint16(CONTAINER_HEADER_LEN + 2, false) : 1,
+            nonce: payload.subarray(headerLen, nonceEnd),
+            ct: payload.subarray(nonceEnd, nonceEnd + ctLen),
+            aad: payload.subarray(0, headerLen),
+          }};
         }}
-        return lsbBitsToBytes(bits);
+        // Legacy: [12-byte nonce][u8 codec][u24 ct len][ct]
+        const lengthField = view.getUint32(12, false);
+        return {{
+          version: 0, flags: 0,
+          codec: lengthField >>> 24,
+          tileIndex: 0, tileCount: 1,
+          nonce: payload.subarray(0, 12),
+          ct: payload.subarray(16, 16 + (lengthField & 0xFFFFFF)),
+          aad: null,
+        }};
       }}
 
-      async function aesGcmDecrypt(nonce, ct, key) {{
+      async function aesGcmDecrypt(nonce, ct, key, aad = null) {{
         const cryptoKey = await window.crypto.subtle.importKey(
           'raw', key, {{ name: 'AES-GCM' }}, false, ['decrypt']
         );
-        const plainBuf = await window.crypto.subtle.decrypt(
-          {{ name: 'AES-GCM', iv: nonce }}, cryptoKey, ct
-        );
+        const params = {{ name: 'AES-GCM', iv: nonce }};
+        if (aad) params.additionalData = aad;
+        return await window.crypto.subtle.decrypt(params, cryptoKey, ct);
+      }}
+
+      // Codec ids from the payload header (see encoder.compress_plaintext)
+      const CODEC_FORMATS = {{ 0: null, 1: 'deflate', 2: 'deflate-raw' }};
+
+      async function inflate(buf, codec) {{
+        if (!(codec in CODEC_FORMATS)) {{
+          throw new Error(`Unknown compression codec: ${{codec}}`);
+        }}
+        const format = CODEC_FORMATS[codec];
+        if (!format) return buf;
+        const stream = new Blob([buf]).stream().pipeThrough(new DecompressionStream(format));
+        return await new Response(stream).arrayBuffer();
+      }}
+
+      async function extractAndDecryptPng(key, imgB64, legacyLen, legacyLsbBits = 1, offset = 0) {{
+        const payload = await extractDataFromPng(imgB64, legacyLen, legacyLsbBits, offset);
+        const p = parsePayload(payload);
+        const plainBuf = await inflate(await aesGcmDecrypt(p.nonce, p.ct, key, p.aad), p.codec);
         return new TextDecoder('utf-8').decode(plainBuf);
       }}
 
-      async function extractAndDecryptPng(key, imgB64, totalPayloadLen) {{
-        const payload = await extractDataFromPng(imgB64, totalPayloadLen);
-        const nonce = payload.slice(0, 12);
-        const ctLenView = new DataView(payload.buffer, 12, 4);
-        const ctLen = ctLenView.getUint32(0, false);
-        const ct = payload.slice(16, 16 + ctLen);
-        return await aesGcmDecrypt(nonce, ct, key);
+      // Tiled articles: every tile is a self-contained container holding one
+      // chunk of the (compressed) plaintext. Tiles are fetched and decrypted
+      // in parallel, then joined in index order and inflated once.
+      async function extractAndDecryptTiles(key, sources) {{
+        const parts = await Promise.all(sources.map(async (src) => {{
+          const p = parsePayload(await extractDataFromPng(src));
+          return {{ p, chunk: new Uint8Array(await aesGcmDecrypt(p.nonce, p.ct, key, p.aad)) }};
+        }}));
+
+        const count = parts[0].p.tileCount, codec = parts[0].p.codec;
+        const chunks = new Array(count);
+        for (const {{ p, chunk }} of parts) {{
+          if (p.tileCount !== count || p.codec !== codec || p.tileIndex >= count || chunks[p.tileIndex]) {{
+            throw new Error(`Inconsistent tile ${{p.tileIndex}} of ${{p.tileCount}}`);
+          }}
+          chunks[p.tileIndex] = chunk;
+        }}
+        if (parts.length !== count) {{
+          throw new Error(`Expected ${{count}} tiles, got ${{parts.length}}`);
+        }}
+
+        const joined = new Uint8Array(chunks.reduce((n, c) => n + c.length, 0));
+        chunks.reduce((offset, c) => (joined.set(c, offset), offset + c.length), 0);
+        return new TextDecoder('utf-8').decode(await inflate(joined, codec));
       }}
 
       async function decryptOne() {{
@@ -445,10 +736,20 @@ def article_page(article_id: str):
           try {{
             const keyB64 = card.dataset.key;
             const payloadLen = parseInt(card.dataset.payload);
+            const lsbBits = parseInt(card.dataset.lsbBits || '1');
+            const offset = parseInt(card.dataset.offset || '0');
             const imgB64 = card.dataset.img;
+            const tiles = parseInt(card.dataset.tiles || '1');
 
             const key = b64ToBytes(keyB64);
-            const plaintext = await extractAndDecryptPng(key, imgB64, payloadLen);
+            let plaintext;
+            if (tiles > 1) {{
+              const sources = [imgB64];
+              for (let i = 1; i < tiles; i++) sources.push(card.dataset.tileUrl + i);
+              plaintext = await extractAndDecryptTiles(key, sources);
+            }} else {{
+              plaintext = await extractAndDecryptPng(key, imgB64, payloadLen, lsbBits, offset);
+            }}
             out.textContent = plaintext;
             out.classList.remove('content-loading');
           }} catch (e) {{
@@ -485,7 +786,7 @@ def article_page(article_id: str):
     </script>
   </body>
 </html>
-"""
+""", 200, {"Vary": "Accept"}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: vectorized LSB embedding vs. the original per-pixel loop.
+
+For each payload size, both implementations embed the same random payload
+into the bundled carrier. The resulting PNG files are checked for byte
+identity and the embedding times are reported.
+
+Usage:
+    python -m benchmarks.bench_embed
+    python -m benchmarks.bench_embed --sizes 1024 65536 --repeat 3
+"""
+
+import argparse
+import io
+import os
+import time
+from typing import List
+
+import numpy as np
+from PIL import Image
+
+from src.encoder import bytes_to_lsb_bits, embed_bits_in_array
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_PNG = os.path.join(BASE_DIR, "encryption", "carrier", "base_image.png")
+
+
+def embed_pixel_loop(img: Image.Image, data: bytes) -> Image.Image:
+    """Reference implementation: the original PixelAccess loop."""
+    pixels = img.load()
+    w, h = img.size
+    bits = bytes_to_lsb_bits(data)
+    bit_len = len(bits)
+
+    bit_idx = 0
+    for y in range(h):
+        for x in range(w):
+            if bit_idx >= bit_len:
+                break
+            r, g, b = pixels[x, y]
+            r = (r & 0xFE) | bits[bit_idx]
+            bit_idx += 1
+            if bit_idx >= bit_len:
+                pixels[x, y] = (r, g, b)
+                break
+            g = (g & 0xFE) | bits[bit_idx]
+            bit_idx += 1
+            if bit_idx >= bit_len:
+                pixels[x, y] = (r, g, b)
+                break
+            b = (b & 0xFE) | bits[bit_idx]
+            bit_idx += 1
+            pixels[x, y] = (r, g, b)
+        if bit_idx >= bit_len:
+            break
+    return img
+
+
+def embed_vectorized(img: Image.Image, data: bytes) -> Image.Image:
+    """Vectorized implementation (encoder.embed_bits_in_array) over the payload rows."""
+    w, _ = img.size
+    rows = -(-len(data) * 8 // (w * 3))
+    strip = np.array(img.crop((0, 0, w, rows)), dtype=np.uint8)
+    embed_bits_in_array(strip, data)
+    img.paste(Image.fromarray(strip, "RGB"), (0, 0))
+    return img
+
+
+def png_bytes(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def best_of(fn, carrier: Image.Image, data: bytes, repeat: int):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        img = carrier.copy()
+        t0 = time.perf_counter()
+        out = fn(img, data)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv: List[str] = None):
+    ap = argparse.ArgumentParser(description="Benchmark LSB embedding implementations")
+    ap.add_argument("--carrier", default=INPUT_PNG, help="Carrier PNG path")
+    ap.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1024, 8192, 65536, 262144],
+        help="Payload sizes in bytes"
+    )
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    args = ap.parse_args(argv)
+
+    carrier = Image.open(args.carrier).convert("RGB")
+    capacity = carrier.size[0] * carrier.size[1] * 3 // 8
+
+    print(f"Carrier: {args.carrier} {carrier.size[0]}x{carrier.size[1]} (capacity {capacity} bytes)")
+    print(f"{'bytes':>10} {'loop_s':>10} {'numpy_s':>10} {'speedup':>9} {'identical':>10}")
+    for size in args.sizes:
+        if size > capacity:
+            print(f"{size:>10} skipped: exceeds carrier capacity")
+            continue
+        data = os.urandom(size)
+        t_loop, img_loop = best_of(embed_pixel_loop, carrier, data, args.repeat)
+        t_vec, img_vec = best_of(embed_vectorized, carrier, data, args.repeat)
+        identical = png_bytes(img_loop) == png_bytes(img_vec)
+        print(f"{size:>10} {t_loop:>10.4f} {t_vec:>10.4f} {t_loop / t_vec:>8.1f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: HKDF key derivation vs. per-article key table lookup.
+
+For each table size, a synthetic key mapping with random per-article keys
+is written to a temporary directory, both as a TSV and as the SQLite article
+index. Four ways of getting one article key per request are then timed:
+
+    parse+lookup  read_key_mapping() on every request (the TSV fallback in app.py)
+    index lookup  primary-key lookup in the SQLite article index (app.py)
+    dict lookup   lookup in an already-parsed table held in memory
+    derive        derive_article_key() from the master key (no table)
+
+The size of the key table on disk and in memory is reported as well.
+
+Usage:
+    python -m benchmarks.bench_key_derivation
+    python -m benchmarks.bench_key_derivation --articles 1000 100000 --lookups 2000
+"""
+
+import argparse
+import base64
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import closing
+from typing import List
+
+from src.index import (
+    MappingRow,
+    lookup_index,
+    open_index,
+    read_key_mapping,
+    write_index,
+    write_key_mapping,
+)
+from src.keys import AES_BIT_LENGTH, MASTER_KEY_LEN, derive_article_key
+
+
+def deep_sizeof(obj) -> int:
+    """Approximate memory held by nested dicts/lists/tuples of strings and ints."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(v) for v in obj)
+    return size
+
+
+def per_op_us(fn, ids: List[str]) -> float:
+    t0 = time.perf_counter()
+    for article_id in ids:
+        fn(article_id)
+    return (time.perf_counter() - t0) / len(ids) * 1e6
+
+
+def main(argv: List[str] = None):
+    ap = argparse.ArgumentParser(description="Benchmark key derivation vs. key table lookup")
+    ap.add_argument(
+        "--articles",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Key table sizes (number of articles)"
+    )
+    ap.add_argument("--lookups", type=int, default=1000, help="Keys fetched per measurement")
+    ap.add_argument(
+        "--parse-lookups",
+        type=int,
+        default=20,
+        help="Keys fetched with a full mapping parse each (slow; kept small)"
+    )
+    args = ap.parse_args(argv)
+
+    master_key = os.urandom(MASTER_KEY_LEN)
+    print(f"{'articles':>10} {'table_MB':>9} {'mem_MB':>8} "
+          f"{'parse_us':>12} {'index_us':>9} {'dict_us':>9} {'derive_us':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.articles:
+            mapping_file = os.path.join(tmp, f"key_mapping_{n}.txt")
+            index_file = os.path.join(tmp, f"index_{n}.sqlite3")
+            rows = [
+                MappingRow(f"article_{i:07d}.txt", os.path.join(tmp, f"article_{i:07d}.png"),
+                           base64.b64encode(os.urandom(AES_BIT_LENGTH // 8)).decode(),
+                           4096, 2048, 2048)
+                for i in range(n)
+            ]
+            write_key_mapping(mapping_file, rows)
+            write_index(index_file, rows, tmp)
+            ids = [f"article_{random.randrange(n):07d}" for _ in range(args.lookups)]
+
+            table = read_key_mapping(mapping_file)
+            t_parse = per_op_us(
+                lambda a: base64.b64decode(read_key_mapping(mapping_file)[a + ".txt"].aes_key_b64),
+                ids[:args.parse_lookups]
+            )
+            with closing(open_index(index_file, readonly=True)) as conn:
+                t_index = per_op_us(
+                    lambda a: base64.b64decode(lookup_index(conn, a, tmp).aes_key_b64), ids
+                )
+            t_dict = per_op_us(lambda a: base64.b64decode(table[a + ".txt"].aes_key_b64), ids)
+            t_derive = per_op_us(
+                lambda a: derive_article_key(master_key, a, 1, AES_BIT_LENGTH), ids
+            )
+            print(f"{n:>10} {os.path.getsize(mapping_file) / 1e6:>9.2f} "
+                  f"{deep_sizeof(table) / 1e6:>8.2f} {t_parse:>12.1f} {t_index:>9.2f} "
+                  f"{t_dict:>9.2f} {t_derive:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: PNG write profiles (encode time vs. output bytes).
+
+Embeds a random payload into the bundled carrier once, then saves the
+result with every profile in encoder.PNG_PROFILES and reports write time
+and file size.
+
+Usage:
+    python -m benchmarks.bench_png_profiles
+    python -m benchmarks.bench_png_profiles --payload 65536 --fit tile --repeat 3
+"""
+
+import argparse
+import io
+import os
+import time
+from typing import List
+
+from PIL import Image
+
+from src.encoder import (
+    FIT_MODES,
+    PNG_PROFILES,
+    embed_bits_in_array,
+    fit_carrier_size,
+    load_carrier,
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_PNG = os.path.join(BASE_DIR, "encryption", "carrier", "base_image.png")
+
+
+def main(argv: List[str] = None):
+    ap = argparse.ArgumentParser(description="Benchmark PNG write profiles")
+    ap.add_argument("--carrier", default=INPUT_PNG, help="Carrier PNG path")
+    ap.add_argument("--payload", type=int, default=16384, help="Payload size in bytes")
+    ap.add_argument("--fit", choices=FIT_MODES, default="full", help="Output size mode")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per profile (best is kept)")
+    args = ap.parse_args(argv)
+
+    carrier = load_carrier(args.carrier)
+    h, w = carrier.shape[:2]
+    out_w, out_h = fit_carrier_size(w, h, args.payload, args.fit)
+    pixels = carrier[:out_h, :out_w].copy()
+    embed_bits_in_array(pixels, os.urandom(args.payload))
+    img = Image.fromarray(pixels, "RGB")
+
+    print(f"Carrier: {args.carrier} -> {out_w}x{out_h} ({args.fit}), payload {args.payload} bytes")
+    print(f"{'profile':>10} {'write_s':>10} {'bytes':>12} {'MB/s':>8}")
+    raw_mb = pixels.nbytes / 1e6
+    for name, save_kwargs in PNG_PROFILES.items():
+        best = float("inf")
+        size = 0
+        for _ in range(args.repeat):
+            buf = io.BytesIO()
+            t0 = time.perf_counter()
+            img.save(buf, format="PNG", **save_kwargs)
+            best = min(best, time.perf_counter() - t0)
+            size = buf.tell()
+        print(f"{name:>10} {best:>10.4f} {size:>12} {raw_mb / best:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
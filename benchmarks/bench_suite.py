@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: encoder stages across payload sizes, carriers and modes.
+
+For every (carrier, payload size, LSB density, PNG profile) combination the
+following stages are timed on a random payload:
+
+    aes_gcm_encrypt    encrypt the payload
+    bytes_to_lsb_bits  list-of-bits conversion (skipped above --max-list-bytes)
+    bytes_to_bit_array vectorized bit conversion
+    embed              embed_in_carrier (crop, copy, write low bits)
+    png_save           PNG encode of the embedded pixels
+    embed_data_in_png  end to end: embed and save to a file
+
+Carriers are the bundled base_image.png and generated noise carriers just
+large enough for each payload. Each result records best-of-N seconds,
+throughput (payload MB/s), tracemalloc peak bytes and output bytes, and the
+whole run is written as JSON. With --baseline, results are compared against
+a previous run and the script exits with status 1 on regressions.
+
+Usage:
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --sizes 1024 1048576 --output bench.json
+    python -m benchmarks.bench_suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_suite --baseline benchmarks/baseline.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.encoder import (
+    CONTAINER_HEADER_LEN,
+    LSB_BITS_CHOICES,
+    PNG_PROFILES,
+    aes_gcm_encrypt,
+    bytes_to_bit_array,
+    bytes_to_lsb_bits,
+    channels_needed,
+    embed_data_in_png,
+    embed_in_carrier,
+    image_to_bytes,
+    load_carrier,
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_PNG = os.path.join(BASE_DIR, "encryption", "carrier", "base_image.png")
+
+RESULT_KEY = ("carrier", "payload_bytes", "lsb_bits", "profile", "stage")
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Tuple[float, int, Any]:
+    """
+    Run fn repeat times.
+
+    Returns:
+        Tuple of (best seconds, tracemalloc peak bytes of the first run, last result)
+    """
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, peak, result
+
+
+def generated_carrier(n_bytes: int, lsb_bits: int, seed: int = 0) -> np.ndarray:
+    """Random-noise carrier, square, just large enough for n_bytes."""
+    pixels = -(-channels_needed(n_bytes, lsb_bits, CONTAINER_HEADER_LEN) // 3)
+    side = math.isqrt(pixels - 1) + 1
+    return np.random.default_rng(seed).integers(0, 256, (side, side, 3), dtype=np.uint8)
+
+
+def output_size(result: Any) -> int:
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], bytes):
+        return len(result[0]) + len(result[1])  # (nonce, ciphertext)
+    return 0
+
+
+def run_case(carrier_name: str, carrier: np.ndarray, size: int, lsb_bits: int, profile: str,
+             repeat: int, max_list_bytes: int, tmp_dir: str) -> List[Dict[str, Any]]:
+    """Time every stage for one combination."""
+    payload = os.urandom(size)
+    key = os.urandom(16)
+    h, w = carrier.shape[:2]
+    out_png = os.path.join(tmp_dir, "out.png")
+    pixels = embed_in_carrier(carrier, payload, "full", lsb_bits, CONTAINER_HEADER_LEN)
+
+    stages: List[Tuple[str, Optional[Callable[[], Any]]]] = [
+        ("aes_gcm_encrypt", lambda: aes_gcm_encrypt(payload, key)),
+        ("bytes_to_lsb_bits",
+         (lambda: bytes_to_lsb_bits(payload)) if size <= max_list_bytes else None),
+        ("bytes_to_bit_array", lambda: bytes_to_bit_array(payload)),
+        ("embed", lambda: embed_in_carrier(carrier, payload, "full", lsb_bits,
+                                           CONTAINER_HEADER_LEN)),
+        ("png_save", lambda: image_to_bytes(pixels, "PNG", profile)),
+        ("embed_data_in_png", lambda: (
+            embed_data_in_png("", out_png, payload, carrier=carrier, lsb_bits=lsb_bits,
+                              png_profile=profile, header_len=CONTAINER_HEADER_LEN),
+            os.path.getsize(out_png),
+        )[1]),
+    ]
+
+    results = []
+    for stage, fn in stages:
+        record = {"carrier": carrier_name, "width": w, "height": h, "payload_bytes": size,
+                  "lsb_bits": lsb_bits, "profile": profile, "stage": stage}
+        if fn is None:
+            record["skipped"] = f"payload above --max-list-bytes ({max_list_bytes})"
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds, peak, result = measure(fn, repeat)
+            record.update({
+                "seconds": seconds,
+                "mb_per_s": size / 1e6 / seconds if seconds > 0 else None,
+                "peak_bytes": peak,
+                "output_bytes": result if stage == "embed_data_in_png" else output_size(result),
+            })
+        results.append(record)
+        print(f"{carrier_name:>12} {size:>10} {lsb_bits:>3} {profile:>8} {stage:>20} "
+              + (f"{record['seconds']:>9.4f}s {record['mb_per_s']:>9.1f} MB/s "
+                 f"{record['peak_bytes'] / 1e6:>8.1f} MB peak"
+                 if "seconds" in record else "skipped"),
+              file=sys.stderr)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare results with a baseline run.
+
+    Returns:
+        Regressions: records slower than baseline by more than threshold (fraction)
+    """
+    base = {tuple(r[k] for k in RESULT_KEY): r for r in baseline if "seconds" in r}
+    regressions = []
+    for r in results:
+        b = base.get(tuple(r[k] for k in RESULT_KEY))
+        if b is None or "seconds" not in r:
+            continue
+        r["baseline_seconds"] = b["seconds"]
+        r["ratio"] = r["seconds"] / b["seconds"] if b["seconds"] > 0 else None
+        if r["ratio"] is not None and r["ratio"] > 1 + threshold:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv: List[str] = None):
+    ap = argparse.ArgumentParser(description="Encoder benchmark suite")
+    ap.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1024, 65536, 1048576, 10485760],
+        help="Payload sizes in bytes (default: 1 KB, 64 KB, 1 MB, 10 MB)"
+    )
+    ap.add_argument(
+        "--carriers",
+        nargs="+",
+        choices=["base", "generated"],
+        default=["base", "generated"],
+        help="Bundled base_image.png and/or generated noise carriers sized per payload"
+    )
+    ap.add_argument(
+        "--lsb-bits",
+        type=int,
+        nargs="+",
+        choices=LSB_BITS_CHOICES,
+        default=[1, 4],
+        help="LSB densities to run (default: 1 4)"
+    )
+    ap.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=list(PNG_PROFILES),
+        default=["default"],
+        help="PNG write profiles to run (default: default)"
+    )
+    ap.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is kept)")
+    ap.add_argument(
+        "--max-list-bytes",
+        type=int,
+        default=1 << 20,
+        help="Largest payload for the list-based bytes_to_lsb_bits (default: 1 MB)"
+    )
+    ap.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", help="Compare against this JSON report")
+    ap.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown vs. baseline as a fraction (default: 0.25)"
+    )
+    ap.add_argument("--save-baseline", help="Also write the report here as the new baseline")
+    args = ap.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for carrier_kind in args.carriers:
+            base = load_carrier(INPUT_PNG) if carrier_kind == "base" else None
+            for lsb_bits in args.lsb_bits:
+                for size in args.sizes:
+                    if base is not None:
+                        carrier, name = base, "base_image"
+                        capacity = base.shape[0] * base.shape[1] * 3
+                        if channels_needed(size, lsb_bits, CONTAINER_HEADER_LEN) > capacity:
+                            print(f"{name:>12} {size:>10} {lsb_bits:>3} skipped: "
+                                  f"exceeds carrier capacity", file=sys.stderr)
+                            continue
+                    else:
+                        carrier = generated_carrier(size, lsb_bits)
+                        name = f"generated_{carrier.shape[1]}"
+                    for profile in args.profiles:
+                        results.extend(run_case(name, carrier, size, lsb_bits, profile,
+                                                args.repeat, args.max_list_bytes, tmp_dir))
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        report["regressions"] = [{k: r[k] for k in RESULT_KEY + ("ratio",)} for r in regressions]
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    for r in regressions:
+        print(f"REGRESSION: {r['carrier']} {r['payload_bytes']}B lsb={r['lsb_bits']} "
+              f"{r['profile']} {r['stage']}: {r['ratio']:.2f}x baseline", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
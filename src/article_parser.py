@@ -11,13 +11,25 @@ Usage:
         --in_file data.json \\
         --out_dir ./data/articles \\
         --overwrite
+
+    python -m src.article_parser --in_file data.json --out_dir ./data/articles --profile
 """
 
 import argparse
 import json
 import os
+import sys
 from typing import Any, Dict, List, Tuple
 
+try:
+    from src.profiling import profile_run
+except ImportError:  # Run as a script (python src/article_parser.py)
+    from profiling import profile_run
+
+# Functions reported on by --profile (see profiling.profile_run)
+PROFILE_HOT_FUNCTIONS = ("read_json_or_jsonl", "split_passage_and_options",
+                         "format_options_from_dict", "safe_write", "extract_articles")
+
 
 def read_json_or_jsonl(path: str) -> List[Dict[str, Any]]:
     """
@@ -126,37 +138,25 @@ def safe_write(path: str, content: str):
         f.write(content.rstrip() + "\n")
 
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Parse JSON/JSONL dataset and extract articles to individual files"
-    )
-    ap.add_argument(
-        "--in_file",
-        required=True,
-        help="Path to input .json or .jsonl file"
-    )
-    ap.add_argument(
-        "--out_dir",
-        required=True,
-        help="Output directory for article files"
-    )
-    ap.add_argument(
-        "--ext",
-        default=".txt",
-        help="Output file extension (default: .txt)"
-    )
-    ap.add_argument(
-        "--overwrite",
-        action="store_true",
-        help="Overwrite existing files"
-    )
-    args = ap.parse_args()
+def extract_articles(in_file: str, out_dir: str, ext: str = ".txt",
+                     overwrite: bool = False) -> None:
+    """
+    Write every record of a dataset as an article file and build the index.
+
+    Args:
+        in_file: Path to input .json or .jsonl file
+        out_dir: Output directory for article files
+        ext: Output file extension
+        overwrite: Overwrite existing files
 
-    rows = read_json_or_jsonl(args.in_file)
+    Raises:
+        RuntimeError: If the input file is empty
+    """
+    rows = read_json_or_jsonl(in_file)
     if not rows:
         raise RuntimeError("Empty input file.")
 
-    os.makedirs(args.out_dir, exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
 
     index: Dict[str, Dict[str, Any]] = {}
     written = 0
@@ -185,8 +185,8 @@ def main():
         ))
         question = "\n".join(question_lines)
 
-        out_path = os.path.join(args.out_dir, f"{sid}{args.ext}")
-        if (not args.overwrite) and os.path.exists(out_path):
+        out_path = os.path.join(out_dir, f"{sid}{ext}")
+        if (not overwrite) and os.path.exists(out_path):
             skipped += 1
             continue
 
@@ -223,12 +223,12 @@ def main():
         }
 
     # Write index file
-    index_path = os.path.join(args.out_dir, "index.json")
+    index_path = os.path.join(out_dir, "index.json")
     with open(index_path, "w", encoding="utf-8") as f:
         json.dump(
             {
-                "input": os.path.abspath(args.in_file),
-                "out_dir": os.path.abspath(args.out_dir),
+                "input": os.path.abspath(in_file),
+                "out_dir": os.path.abspath(out_dir),
                 "count_in_file": len(rows),
                 "written": written,
                 "skipped": skipped,
@@ -245,5 +245,47 @@ def main():
     print(f"Index: {index_path}")
 
 
+def main():
+    ap = argparse.ArgumentParser(
+        description="Parse JSON/JSONL dataset and extract articles to individual files"
+    )
+    ap.add_argument(
+        "--in_file",
+        required=True,
+        help="Path to input .json or .jsonl file"
+    )
+    ap.add_argument(
+        "--out_dir",
+        required=True,
+        help="Output directory for article files"
+    )
+    ap.add_argument(
+        "--ext",
+        default=".txt",
+        help="Output file extension (default: .txt)"
+    )
+    ap.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Overwrite existing files"
+    )
+    ap.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="DIR",
+        help="Write a cProfile dump and a tracemalloc report to DIR "
+             "(default: <out_dir>/profiles)"
+    )
+    args = ap.parse_args()
+
+    if args.profile is None:
+        extract_articles(args.in_file, args.out_dir, args.ext, args.overwrite)
+        return
+    with profile_run(args.profile or os.path.join(args.out_dir, "profiles"), "article_parser",
+                     sys.modules[__name__], PROFILE_HOT_FUNCTIONS):
+        extract_articles(args.in_file, args.out_dir, args.ext, args.overwrite)
+
+
 if __name__ == "__main__":
     main()
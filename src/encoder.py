@@ -6,35 +6,86 @@ Encoder module for AES-GCM encryption and LSB steganography.
 This module provides functions to:
 1. Encrypt plaintext using AES-GCM
 2. Embed encrypted data into PNG images using LSB steganography
-3. Batch process multiple articles
+3. Extract and decrypt embedded data (reference for the browser decoder)
+4. Encode under per-article keys derived from a master key (see keys.py)
+5. Batch process multiple articles
+
+The streaming PNG codec, publishing (manifest and generations), watch mode
+and verification live in png_stream.py, publish.py, watch.py and verify.py.
 """
 
+import argparse
+import contextlib
+import io
+import math
 import os
 import struct
+import sys
 import base64
-from typing import Tuple, List
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, NamedTuple, Tuple, List, Optional, Union
 
+import numpy as np
 from PIL import Image
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+if __package__ in (None, ""):  # Run as a script (python src/encoder.py)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.index import (
+    MappingRow,
+    export_key_mapping,
+    import_key_mapping,
+    index_lock,
+    load_mapping_rows,
+    publish_index,
+)
+from src.keys import AES_BIT_LENGTH, derive_article_key, load_master_key, master_key_id
+from src.metrics import (
+    collect_stages,
+    metrics_record,
+    print_metrics_summary,
+    summarize_metrics,
+    timed_stage,
+    write_metrics,
+)
+from src.png_stream import STRIP_ROWS, PngStripWriter, iter_carrier_strips, open_image
+from src.profiling import profile_run
+from src.publish import (
+    fsync_paths,
+    hash_articles,
+    new_generation_dir,
+    plan_incremental,
+    prune_generations,
+    read_manifest,
+    row_image_paths,
+    sha256_file,
+    write_manifest,
+)
+from src.watch import watch_articles
+
 
 # -------------------------- Core Utility Functions --------------------------
 
-def aes_gcm_encrypt(plaintext: str, key: bytes) -> Tuple[bytes, bytes]:
+def aes_gcm_encrypt(plaintext: Union[str, bytes], key: bytes,
+                    associated_data: Optional[bytes] = None) -> Tuple[bytes, bytes]:
     """
     Encrypt plaintext using AES-GCM.
 
     Args:
-        plaintext: The text to encrypt
+        plaintext: The text to encrypt (str is UTF-8 encoded)
         key: AES key (16 or 32 bytes for AES-128/256)
+        associated_data: Optional data authenticated but not encrypted
 
     Returns:
         Tuple of (nonce, ciphertext with authentication tag)
     """
     aesgcm = AESGCM(key)
     nonce = os.urandom(12)  # GCM standard: 12-byte nonce
-    pt_bytes = plaintext.encode("utf-8")
-    ct = aesgcm.encrypt(nonce, pt_bytes, None)
+    pt_bytes = plaintext.encode("utf-8") if isinstance(plaintext, str) else plaintext
+    ct = aesgcm.encrypt(nonce, pt_bytes, associated_data)
     return nonce, ct
 
 
@@ -55,160 +106,2109 @@ def bytes_to_lsb_bits(data: bytes) -> List[int]:
     return bits
 
 
-def embed_data_in_png(input_png: str, output_png: str, data: bytes) -> None:
+def bytes_to_bit_array(data: bytes) -> np.ndarray:
+    """
+    Convert byte stream to a flat uint8 array of 0/1 bits (MSB first).
+
+    Vectorized equivalent of bytes_to_lsb_bits.
+
+    Args:
+        data: Bytes to convert
+
+    Returns:
+        1-D uint8 array of bits (0 or 1)
+    """
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+LSB_BITS_CHOICES = (1, 2, 3, 4)
+
+
+def _check_lsb_bits(lsb_bits: int) -> None:
+    if lsb_bits not in LSB_BITS_CHOICES:
+        raise ValueError(f"lsb_bits must be one of {LSB_BITS_CHOICES}, got {lsb_bits}")
+
+
+def channels_needed(n_bytes: int, lsb_bits: int = 1, header_len: int = 0) -> int:
+    """
+    Number of channel values needed to hold a payload.
+
+    The first `header_len` bytes always use 1 bit per channel; the rest use
+    `lsb_bits` bits per channel.
+
+    Args:
+        n_bytes: Payload length in bytes
+        lsb_bits: Number of low bits used per channel for the body
+        header_len: Length of the leading 1-bit-per-channel section
+
+    Returns:
+        Channel count
+    """
+    header_len = min(header_len, n_bytes)
+    return header_len * 8 + -(-(n_bytes - header_len) * 8 // lsb_bits)
+
+
+def _write_lsb(flat: np.ndarray, data: bytes, lsb_bits: int) -> None:
+    """Write data into the low bits of a flat channel array, from its start."""
+    with timed_stage("bit_expand", len(data)):
+        bits = bytes_to_bit_array(data)
+        bit_len = bits.size
+        if lsb_bits == 1:
+            values = bits
+        else:
+            # Group bits into lsb_bits-wide values, zero-padding the last group
+            n_values = -(-bit_len // lsb_bits)
+            groups = np.zeros(n_values * lsb_bits, dtype=np.uint8)
+            groups[:bit_len] = bits
+            values = np.packbits(groups.reshape(-1, lsb_bits), axis=1)[:, 0] >> (8 - lsb_bits)
+
+    with timed_stage("pixel_write", len(data)):
+        flat[:values.size] &= 0xFF ^ ((1 << lsb_bits) - 1)
+        flat[:values.size] |= values
+
+
+def _read_lsb(flat: np.ndarray, n_bytes: int, lsb_bits: int) -> bytes:
+    """Read n_bytes from the low bits of a flat channel array, from its start."""
+    bit_len = n_bytes * 8
+    n_values = -(-bit_len // lsb_bits)
+    values = flat[:n_values] & ((1 << lsb_bits) - 1)
+    if lsb_bits == 1:
+        bits = values
+    else:
+        bits = np.unpackbits(values[:, None], axis=1)[:, 8 - lsb_bits:].reshape(-1)[:bit_len]
+    return np.packbits(bits).tobytes()
+
+
+def embed_bits_in_array(pixels: np.ndarray, data: bytes, lsb_bits: int = 1,
+                        header_len: int = 0) -> None:
+    """
+    Embed binary data in-place into an RGB pixel array.
+
+    Bits are written to the low `lsb_bits` bits of R, G, B in row-major
+    pixel order (most significant payload bit first within each channel),
+    which is the order the client-side extractor reads them back. The first
+    `header_len` bytes are always written at 1 bit per channel so a reader
+    can parse them before it knows the body's density.
+
+    Args:
+        pixels: Writable uint8 array of shape (h, w, 3)
+        data: Binary data to embed
+        lsb_bits: Number of low bits used per channel (1-4)
+        header_len: Length of the leading 1-bit-per-channel section
+
+    Raises:
+        ValueError: If data is too large for the array
+    """
+    _check_lsb_bits(lsb_bits)
+    needed = channels_needed(len(data), lsb_bits, header_len)
+
+    if needed > pixels.size:
+        raise ValueError(
+            f"Data too large! Need {needed} channel values ({len(data) * 8} bits at "
+            f"{lsb_bits} bit(s)/channel), image only has {pixels.size}. "
+            "Use a larger PNG image or tiled encoding (--tile-size)."
+        )
+
+    flat = pixels.reshape(-1)
+    header_len = min(header_len, len(data))
+    _write_lsb(flat, data[:header_len], 1)
+    _write_lsb(flat[header_len * 8:], data[header_len:], lsb_bits)
+
+
+# Decoded carriers keyed by absolute path: (mtime_ns, pixels)
+_carrier_cache: Dict[str, Tuple[int, np.ndarray]] = {}
+
+
+def load_carrier(input_png: str, use_cache: bool = True) -> np.ndarray:
+    """
+    Decode a carrier image into a read-only RGB pixel array.
+
+    Decoded carriers are cached by path and modification time, so a batch
+    that embeds into the same carrier decodes it only once. Callers must
+    copy the array before writing to it.
+
+    Args:
+        input_png: Path to carrier image
+        use_cache: Reuse a cached decode if the file is unchanged
+
+    Returns:
+        Read-only uint8 array of shape (h, w, 3)
+
+    Raises:
+        FileNotFoundError: If carrier image doesn't exist
+    """
+    if not os.path.exists(input_png):
+        raise FileNotFoundError(f"Carrier image not found: {input_png}")
+
+    path = os.path.abspath(input_png)
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _carrier_cache.get(path)
+    if use_cache and cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    # Open image and convert to RGB (compatible with RGBA)
+    with timed_stage("carrier_decode", os.path.getsize(path)):
+        pixels = np.array(Image.open(path).convert("RGB"), dtype=np.uint8)
+    pixels.flags.writeable = False
+    _carrier_cache[path] = (mtime_ns, pixels)
+    return pixels
+
+
+FIT_MODES = ("full", "rows", "tile")
+
+
+def fit_carrier_size(width: int, height: int, n_bytes: int, fit: str = "full",
+                     lsb_bits: int = 1, header_len: int = 0) -> Tuple[int, int]:
+    """
+    Compute the output image size for a payload under a fit mode.
+
+    - full: the whole carrier
+    - rows: full carrier width, only as many rows as the payload needs
+    - tile: a roughly square top-left region just large enough for the payload
+
+    Args:
+        width: Carrier width
+        height: Carrier height
+        n_bytes: Payload length in bytes
+        fit: One of FIT_MODES
+        lsb_bits: Number of low bits used per channel
+        header_len: Length of the leading 1-bit-per-channel section
+
+    Returns:
+        Tuple of (output width, output height)
+
+    Raises:
+        ValueError: If fit is unknown
+    """
+    if fit not in FIT_MODES:
+        raise ValueError(f"Unknown fit mode: {fit} (expected one of {', '.join(FIT_MODES)})")
+    if fit == "full":
+        return width, height
+
+    pixels_needed = max(1, -(-channels_needed(n_bytes, lsb_bits, header_len) // 3))
+    if fit == "rows":
+        return width, min(height, -(-pixels_needed // width))
+
+    side = math.isqrt(pixels_needed - 1) + 1  # ceil(sqrt)
+    tile_w = min(width, max(side, -(-pixels_needed // height)))
+    return tile_w, min(height, -(-pixels_needed // tile_w))
+
+
+# PNG write profiles: Pillow save options (zlib level and strategy)
+PNG_PROFILES = {
+    "default": {},
+    "fast": {"compress_level": 1, "compress_type": zlib.Z_RLE},
+    "small": {"compress_level": 9, "compress_type": zlib.Z_DEFAULT_STRATEGY},
+}
+
+# Matching lossless WebP save options for the optional WebP variant
+WEBP_PROFILES = {
+    "default": {"lossless": True, "quality": 80, "method": 4},
+    "fast": {"lossless": True, "quality": 0, "method": 0},
+    "small": {"lossless": True, "quality": 100, "method": 6},
+}
+
+
+def embed_in_carrier(carrier: np.ndarray, data: bytes, fit: str = "full", lsb_bits: int = 1,
+                     header_len: int = 0) -> np.ndarray:
+    """
+    Embed data into a fitted copy of the carrier pixels (no I/O).
+
+    Args:
+        carrier: Carrier pixels of shape (h, w, 3); left untouched
+        data: Binary data to embed
+        fit: Output size mode (see fit_carrier_size)
+        lsb_bits: Number of low bits used per channel (1-4)
+        header_len: Leading bytes written at 1 bit per channel
+
+    Returns:
+        New uint8 array holding the encoded image
+
+    Raises:
+        ValueError: If data is too large for the image
+    """
+    h, w = carrier.shape[:2]
+    out_w, out_h = fit_carrier_size(w, h, len(data), fit, lsb_bits, header_len)
+    with timed_stage("carrier_copy", out_w * out_h * 3):
+        pixels = carrier[:out_h, :out_w].copy()
+    embed_bits_in_array(pixels, data, lsb_bits, header_len)
+    return pixels
+
+
+def embed_data_in_png(input_png: str, output_png: str, data: bytes,
+                      carrier: Optional[np.ndarray] = None,
+                      fit: str = "full", lsb_bits: int = 1,
+                      png_profile: str = "default",
+                      webp_output: Optional[str] = None,
+                      header_len: int = 0) -> Tuple[int, int]:
     """
     Embed binary data into PNG image using LSB steganography.
 
-    Modifies the least significant bit of each RGB channel to store data.
+    Modifies the least significant bit(s) of each RGB channel to store data.
 
     Args:
         input_png: Path to carrier image
         output_png: Path to save encoded image
         data: Binary data to embed
+        carrier: Optional pre-decoded carrier pixels; defaults to the cached
+            decode of input_png (see load_carrier). The array is left untouched.
+        fit: Output size mode (see fit_carrier_size); smaller outputs are
+            cropped from the top-left of the carrier
+        lsb_bits: Number of low bits used per channel (1-4)
+        png_profile: Write profile from PNG_PROFILES ("fast" for quick batch
+            writes, "small" for the smallest served file)
+        webp_output: Optional path to also save the image as lossless WebP
+            (written with the matching WEBP_PROFILES entry)
+        header_len: Leading bytes written at 1 bit per channel regardless of
+            lsb_bits (see embed_bits_in_array)
+
+    Returns:
+        Tuple of (width, height) of the saved image
 
     Raises:
         FileNotFoundError: If carrier image doesn't exist
-        ValueError: If data is too large for the image
+        ValueError: If data is too large for the image or png_profile is unknown
     """
+    if png_profile not in PNG_PROFILES:
+        raise ValueError(
+            f"Unknown PNG profile: {png_profile} (expected one of {', '.join(PNG_PROFILES)})"
+        )
+
     # Ensure output directory exists
     out_dir = os.path.dirname(output_png) or "."
     os.makedirs(out_dir, exist_ok=True)
 
-    # Open image and convert to RGB (compatible with RGBA)
-    if not os.path.exists(input_png):
-        raise FileNotFoundError(f"Carrier image not found: {input_png}")
+    if carrier is None:
+        carrier = load_carrier(input_png)
+
+    pixels = embed_in_carrier(carrier, data, fit, lsb_bits, header_len)
+    out_h, out_w = pixels.shape[:2]
+    img = Image.fromarray(pixels, "RGB")
+    with timed_stage("png_write", pixels.nbytes) as st:
+        img.save(output_png, format="PNG", **PNG_PROFILES[png_profile])
+        st["bytes_out"] = os.path.getsize(output_png)
+    print(f"Encoded image saved: {output_png}")
+    if webp_output:
+        with timed_stage("webp_write", pixels.nbytes) as st:
+            img.save(webp_output, format="WEBP", **WEBP_PROFILES[png_profile])
+            st["bytes_out"] = os.path.getsize(webp_output)
+        print(f"Encoded image saved: {webp_output}")
+    return out_w, out_h
+
+
+# -------------------------- Compression --------------------------
+
+# Codec ids stored in the payload header. Only formats the browser can
+# inflate natively with DecompressionStream are used.
+CODEC_NONE = 0
+CODEC_DEFLATE = 1      # zlib stream, DecompressionStream("deflate")
+CODEC_DEFLATE_RAW = 2  # raw deflate, DecompressionStream("deflate-raw")
+
+COMPRESSION_MODES = ("none", "deflate", "deflate-raw", "auto")
+
+
+def compress_plaintext(data: bytes, mode: str = "auto") -> Tuple[int, bytes]:
+    """
+    Compress plaintext bytes before encryption.
 
-    img = Image.open(input_png).convert("RGB")
-    pixels = img.load()
-    w, h = img.size
+    In "auto" mode every codec is tried and the smallest output wins,
+    including leaving the data uncompressed.
 
-    bits = bytes_to_lsb_bits(data)
-    bit_len = len(bits)
-    max_bits = w * h * 3  # 3 channels per pixel, 1 bit per channel
+    Args:
+        data: Plaintext bytes
+        mode: One of COMPRESSION_MODES
+
+    Returns:
+        Tuple of (codec id, possibly compressed bytes)
 
-    if bit_len > max_bits:
+    Raises:
+        ValueError: If mode is unknown
+    """
+    if mode not in COMPRESSION_MODES:
         raise ValueError(
-            f"Data too large! Need {bit_len} bits, image only supports {max_bits} bits. "
-            "Use a larger PNG image."
+            f"Unknown compression mode: {mode} (expected one of {', '.join(COMPRESSION_MODES)})"
         )
 
-    # Write LSB to each pixel
-    bit_idx = 0
-    for y in range(h):
-        for x in range(w):
-            if bit_idx >= bit_len:
-                break
+    candidates = [(CODEC_NONE, data)]
+    if mode in ("deflate", "auto"):
+        candidates.append((CODEC_DEFLATE, zlib.compress(data, 9)))
+    if mode in ("deflate-raw", "auto"):
+        co = zlib.compressobj(9, zlib.DEFLATED, -15)
+        candidates.append((CODEC_DEFLATE_RAW, co.compress(data) + co.flush()))
 
-            r, g, b = pixels[x, y]
+    if mode == "none":
+        return candidates[0]
+    if mode != "auto":
+        return candidates[-1]
+    return min(candidates, key=lambda c: len(c[1]))
 
-            # R channel
-            r = (r & 0xFE) | bits[bit_idx]
-            bit_idx += 1
-            if bit_idx >= bit_len:
-                pixels[x, y] = (r, g, b)
-                break
 
-            # G channel
-            g = (g & 0xFE) | bits[bit_idx]
-            bit_idx += 1
-            if bit_idx >= bit_len:
-                pixels[x, y] = (r, g, b)
-                break
+def decompress_plaintext(codec: int, data: bytes) -> bytes:
+    """
+    Reverse compress_plaintext.
 
-            # B channel
-            b = (b & 0xFE) | bits[bit_idx]
-            bit_idx += 1
+    Args:
+        codec: Codec id from the payload header
+        data: Decrypted bytes
 
-            pixels[x, y] = (r, g, b)
+    Returns:
+        Plaintext bytes
 
-        if bit_idx >= bit_len:
-            break
+    Raises:
+        ValueError: If codec is unknown
+    """
+    if codec == CODEC_NONE:
+        return bytes(data)
+    if codec == CODEC_DEFLATE:
+        return zlib.decompress(data)
+    if codec == CODEC_DEFLATE_RAW:
+        return zlib.decompress(data, -15)
+    raise ValueError(f"Unknown compression codec: {codec}")
 
-    img.save(output_png, format="PNG")
-    print(f"Encoded image saved: {output_png}")
 
+# -------------------------- Payload Container --------------------------
+
+# Versioned container (all integers big-endian):
+#   [4s magic "ELCP"][u8 version][u8 flags][u8 codec][u8 lsb_bits]
+#   [u16 nonce length][u32 ciphertext length]([u16 tile index][u16 tile count])
+#   [nonce][ciphertext with tag]
+# The header (14 bytes, plus the 4-byte tile extension when FLAG_TILED is
+# set) is always embedded at 1 bit per channel so readers can parse it before
+# knowing the body density, and it is authenticated as AES-GCM associated data.
+CONTAINER_MAGIC = b"ELCP"
+CONTAINER_VERSION = 1
+CONTAINER_HEADER = struct.Struct(">4sBBBBHI")
+CONTAINER_HEADER_LEN = CONTAINER_HEADER.size
+TILE_EXTENSION = struct.Struct(">HH")
+GCM_TAG_LEN = 16
 
-def encrypt_and_embed(plaintext: str, key: bytes, input_png: str, output_png: str) -> int:
+FLAG_TILED = 0x01  # Payload is one chunk of a multi-image article
+KNOWN_FLAGS = FLAG_TILED  # Unknown bits are rejected
+
+# Legacy (pre-container) layout: [12-byte nonce][u32 length][ciphertext], where
+# the length field's top byte holds the codec id. Its total length travels
+# out-of-band as PAYLOAD_LEN in the key mapping.
+NONCE_LEN = 12
+LEGACY_HEADER_LEN = NONCE_LEN + 4
+LEGACY_MAX_CT_LEN = 0xFFFFFF
+
+
+class ParsedPayload(NamedTuple):
+    """Zero-copy view of a payload's sections (memoryview slices)."""
+    version: int  # 0 = legacy layout
+    flags: int
+    codec: int
+    lsb_bits: int
+    nonce: memoryview
+    ciphertext: memoryview
+    associated_data: Optional[memoryview]
+    tile_index: int = 0
+    tile_count: int = 1
+
+
+def container_header_len(flags: int) -> int:
+    """Length of the 1-bit-per-channel header section for the given flags."""
+    return CONTAINER_HEADER_LEN + (TILE_EXTENSION.size if flags & FLAG_TILED else 0)
+
+
+def seal_payload(pt_bytes: bytes, key: bytes, codec: int = CODEC_NONE,
+                 lsb_bits: int = 1, flags: int = 0,
+                 tile: Optional[Tuple[int, int]] = None) -> bytes:
+    """
+    Encrypt plaintext bytes into a versioned payload container.
+
+    Args:
+        pt_bytes: (Possibly compressed) plaintext bytes
+        key: AES key
+        codec: Compression codec id
+        lsb_bits: Body density recorded for readers
+        flags: Feature flags (must be within KNOWN_FLAGS)
+        tile: Optional (tile index, tile count); sets FLAG_TILED
+
+    Returns:
+        Payload bytes
+    """
+    if tile is not None:
+        flags |= FLAG_TILED
+    header = CONTAINER_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, flags, codec, lsb_bits,
+                                   NONCE_LEN, len(pt_bytes) + GCM_TAG_LEN)
+    if tile is not None:
+        header += TILE_EXTENSION.pack(*tile)
+    nonce, ct = aes_gcm_encrypt(pt_bytes, key, associated_data=header)
+    return header + nonce + ct
+
+
+def parse_container_header(header: bytes) -> Optional[Tuple[int, int, int, int, int, int]]:
+    """
+    Parse a container header.
+
+    Args:
+        header: At least CONTAINER_HEADER_LEN bytes
+
+    Returns:
+        Tuple of (version, flags, codec, lsb_bits, nonce length, ciphertext length),
+        or None if the magic does not match (legacy payload)
+
+    Raises:
+        ValueError: If the version or flags are not supported
+    """
+    if len(header) < CONTAINER_HEADER_LEN:
+        return None
+    magic, version, flags, codec, lsb_bits, nonce_len, ct_len = CONTAINER_HEADER.unpack_from(header)
+    if magic != CONTAINER_MAGIC:
+        return None
+    if version != CONTAINER_VERSION:
+        raise ValueError(f"Unsupported payload version: {version}")
+    if flags & ~KNOWN_FLAGS:
+        raise ValueError(f"Unsupported payload flags: {flags:#04x}")
+    return version, flags, codec, lsb_bits, nonce_len, ct_len
+
+
+def seal_plaintext(plaintext: Union[str, bytes], key: bytes, compression: str = "none",
+                   lsb_bits: int = 1) -> Tuple[int, bytes]:
+    """
+    Compress and encrypt a plaintext into one payload container.
+
+    Args:
+        plaintext: Text (or UTF-8 bytes) to seal
+        key: AES key
+        compression: Compression mode applied before encryption (see compress_plaintext)
+        lsb_bits: Body density recorded for readers
+
+    Returns:
+        Tuple of (codec id, payload bytes)
+    """
+    data = plaintext.encode("utf-8") if isinstance(plaintext, str) else plaintext
+    with timed_stage("compress", len(data)) as st:
+        codec, pt_bytes = compress_plaintext(data, compression)
+        st["bytes_out"] = len(pt_bytes)
+    with timed_stage("encrypt", len(pt_bytes)) as st:
+        payload = seal_payload(pt_bytes, key, codec, lsb_bits)
+        st["bytes_out"] = len(payload)
+    return codec, payload
+
+
+def encrypt_and_embed(plaintext: str, key: bytes, input_png: str, output_png: str,
+                      carrier: Optional[np.ndarray] = None, fit: str = "full",
+                      compression: str = "none", lsb_bits: int = 1,
+                      png_profile: str = "default", webp_output: Optional[str] = None,
+                      streaming: bool = False) -> int:
     """
     Encrypt plaintext and embed into PNG image.
 
-    Payload structure: [12-byte nonce][4-byte ciphertext length][ciphertext with tag]
+    Payload structure: versioned container (see seal_payload). The image is
+    built in memory by encode_to_bytes (or strip by strip when streaming)
+    and then written out.
 
     Args:
         plaintext: Text to encrypt and embed
         key: AES key
         input_png: Path to carrier image
         output_png: Path to save encoded image
+        carrier: Optional pre-decoded carrier pixels (see load_carrier)
+        fit: Output size mode (see fit_carrier_size)
+        compression: Compression mode applied before encryption (see compress_plaintext)
+        lsb_bits: Number of low bits used per channel (1-4)
+        png_profile: PNG write profile (see PNG_PROFILES)
+        webp_output: Optional path for an additional lossless WebP variant
+        streaming: Encode strip by strip in bounded memory (see
+            embed_data_streaming); carrier is ignored and WebP is not supported
 
     Returns:
         Total payload length in bytes
     """
-    nonce, ct = aes_gcm_encrypt(plaintext, key)
-    ct_len = len(ct)
-    payload = nonce + struct.pack(">I", ct_len) + ct
-    embed_data_in_png(input_png, output_png, payload)
-    return len(payload)
+    if streaming:
+        if webp_output:
+            raise ValueError("Streaming encoding cannot write a WebP variant")
+        payload = seal_plaintext(plaintext, key, compression, lsb_bits)[1]
+        embed_data_streaming(input_png, output_png, payload, fit=fit, lsb_bits=lsb_bits,
+                             png_profile=png_profile, header_len=CONTAINER_HEADER_LEN)
+        return len(payload)
 
+    encoded = encode_to_bytes(plaintext, key, input_png if carrier is None else carrier,
+                              fit=fit, compression=compression, lsb_bits=lsb_bits,
+                              png_profile=png_profile, webp=bool(webp_output))
+    outputs = [(output_png, encoded.data)]
+    if webp_output:
+        outputs.append((webp_output, encoded.webp))
+    for path, data in outputs:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with timed_stage("file_write", len(data)) as st:
+            with open(path, "wb") as f:
+                f.write(data)
+            st["bytes_out"] = len(data)
+        print(f"Encoded image saved: {path}")
+    return encoded.payload_len
 
-# -------------------------- Main Execution --------------------------
 
-if __name__ == "__main__":
-    # Configuration
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+def tile_chunk_capacity(tile_size: int, lsb_bits: int = 1) -> int:
+    """
+    Plaintext bytes that fit in one square tile of a tiled article.
 
-    INPUT_PNG = os.path.join(BASE_DIR, "encryption", "carrier", "base_image.png")
-    OUTPUT_PNG_DIR = os.path.join(BASE_DIR, "encryption", "carrier", "encoded")
-    KEY_INFO_FILE = os.path.join(BASE_DIR, "encryption", "key", "key_mapping.txt")
-    ARTICLE_DIR = os.path.join(BASE_DIR, "data", "articles")
-    AES_BIT_LENGTH = 128  # AES key length (128 or 256)
+    Args:
+        tile_size: Tile side length in pixels
+        lsb_bits: Number of low bits used per channel for the body
 
-    # Ensure directories exist
-    os.makedirs(OUTPUT_PNG_DIR, exist_ok=True)
-    os.makedirs(ARTICLE_DIR, exist_ok=True)
+    Returns:
+        Chunk capacity in bytes (<= 0 if the tile is too small)
+    """
+    header_len = container_header_len(FLAG_TILED)
+    body_channels = tile_size * tile_size * 3 - header_len * 8
+    return body_channels * lsb_bits // 8 - NONCE_LEN - GCM_TAG_LEN
 
-    # Get all txt files in article directory
-    txt_files = [f for f in os.listdir(ARTICLE_DIR) if f.lower().endswith(".txt")]
-    if not txt_files:
-        print(f"Warning: No txt files found in {ARTICLE_DIR}")
-        exit(0)
 
-    # Write article-image-key mapping (overwrite to ensure latest)
-    with open(KEY_INFO_FILE, "w", encoding="utf-8") as f:
-        f.write("ARTICLE_NAME\tIMAGE_PATH\tAES_KEY_B64\tPAYLOAD_LEN\n")
+def tile_paths(output_png: str, count: int) -> List[str]:
+    """Ordered tile image paths derived from an article's output path."""
+    stem, ext = os.path.splitext(output_png)
+    return [f"{stem}.{i}{ext}" for i in range(count)]
 
-        print("===== Starting batch encryption and embedding =====")
-        for txt_file in txt_files:
-            # Read article content
-            article_path = os.path.join(ARTICLE_DIR, txt_file)
-            with open(article_path, "r", encoding="utf-8") as af:
-                secret_text = af.read().strip()
 
-            if not secret_text:
-                print(f"Skipping empty file: {txt_file}")
-                continue
+def encrypt_and_embed_tiles(plaintext: str, key: bytes, input_png: str, output_png: str,
+                            tile_size: int, carrier: Optional[np.ndarray] = None,
+                            compression: str = "none", lsb_bits: int = 1,
+                            png_profile: str = "default", webp: bool = False
+                            ) -> List[Tuple[str, int]]:
+    """
+    Encrypt plaintext and spread it over an ordered set of fixed-size tiles.
 
-            # Generate unique AES key for this article
-            aes_key = AESGCM.generate_key(bit_length=AES_BIT_LENGTH)
-            aes_key_b64 = base64.b64encode(aes_key).decode("utf-8")
+    The (possibly compressed) plaintext is split into chunks, and each chunk
+    is sealed in its own container with FLAG_TILED and its index/count, so
+    every tile can be extracted and decrypted on its own. Tiles are cut from
+    the top-left tile_size x tile_size region of the carrier and saved as
+    <output stem>.<index><ext>.
 
-            # Define output image path (same name as article, with .png extension)
-            img_name = os.path.splitext(txt_file)[0] + ".png"
-            output_png = os.path.join(OUTPUT_PNG_DIR, img_name)
+    Args:
+        plaintext: Text to encrypt and embed
+        key: AES key
+        input_png: Path to carrier image
+        output_png: Base output path (tile paths derive from it)
+        tile_size: Tile side length in pixels
+        carrier: Optional pre-decoded carrier pixels (see load_carrier)
+        compression: Compression mode applied before encryption
+        lsb_bits: Number of low bits used per channel (1-4)
+        png_profile: PNG write profile (see PNG_PROFILES)
+        webp: Also write a lossless WebP variant of each tile
 
-            # Encrypt and embed
-            try:
-                payload_len = encrypt_and_embed(
-                    plaintext=secret_text,
-                    key=aes_key,
-                    input_png=INPUT_PNG,
-                    output_png=output_png
-                )
-                # Write mapping (tab-separated for easy parsing)
-                f.write(f"{txt_file}\t{output_png}\t{aes_key_b64}\t{payload_len}\n")
-                print(f"Processed: {txt_file} -> {img_name}")
-            except Exception as e:
-                print(f"Failed: {txt_file} - {str(e)}")
+    Returns:
+        List of (tile path, payload length) in tile order
 
-    print(f"\nBatch processing complete!")
-    print(f"Key mapping file: {KEY_INFO_FILE}")
-    print(f"Encoded images directory: {OUTPUT_PNG_DIR}")
+    Raises:
+        ValueError: If the tile is too small or larger than the carrier
+    """
+    if carrier is None:
+        carrier = load_carrier(input_png)
+    h, w = carrier.shape[:2]
+    if tile_size > min(w, h):
+        raise ValueError(f"Tile size {tile_size} exceeds carrier size {w}x{h}")
+    capacity = tile_chunk_capacity(tile_size, lsb_bits)
+    if capacity <= 0:
+        raise ValueError(f"Tile size {tile_size} is too small to hold any data")
+
+    data = plaintext.encode("utf-8")
+    with timed_stage("compress", len(data)) as st:
+        codec, pt_bytes = compress_plaintext(data, compression)
+        st["bytes_out"] = len(pt_bytes)
+    chunks = [pt_bytes[i:i + capacity] for i in range(0, max(len(pt_bytes), 1), capacity)]
+    if len(chunks) > 0xFFFF:
+        raise ValueError(f"Too many tiles: {len(chunks)} (max {0xFFFF})")
+
+    tile_carrier = carrier[:tile_size, :tile_size]
+    tiles = []
+    for index, (path, chunk) in enumerate(zip(tile_paths(output_png, len(chunks)), chunks)):
+        with timed_stage("encrypt", len(chunk)) as st:
+            payload = seal_payload(chunk, key, codec, lsb_bits, tile=(index, len(chunks)))
+            st["bytes_out"] = len(payload)
+        embed_data_in_png(input_png, path, payload, carrier=tile_carrier, lsb_bits=lsb_bits,
+                          png_profile=png_profile,
+                          webp_output=os.path.splitext(path)[0] + ".webp" if webp else None,
+                          header_len=container_header_len(FLAG_TILED))
+        tiles.append((path, len(payload)))
+    return tiles
+
+
+# -------------------------- In-Memory Encoding --------------------------
+
+class EncodedImage(NamedTuple):
+    """Result of encode_to_bytes."""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    payload_len: int
+    lsb_bits: int
+    codec: int
+    webp: Optional[bytes] = None  # Lossless WebP variant, if requested
+
+
+def carrier_pixels(carrier: Union[str, "os.PathLike[str]", bytes, np.ndarray]) -> np.ndarray:
+    """
+    Normalize a carrier given as a path, encoded image bytes or a pixel array.
+
+    Args:
+        carrier: Image path (decoded through the load_carrier cache), encoded
+            image bytes (PNG, WebP, ...), or a uint8 array of shape (h, w, 3)
+            or (h, w, 4) (alpha is ignored)
+
+    Returns:
+        uint8 array of shape (h, w, 3); callers must not write to it
+
+    Raises:
+        ValueError: If an array carrier has the wrong shape or dtype
+    """
+    if isinstance(carrier, np.ndarray):
+        if carrier.dtype != np.uint8 or carrier.ndim != 3 or carrier.shape[2] not in (3, 4):
+            raise ValueError(f"Carrier array must be uint8 (h, w, 3|4), got "
+                             f"{carrier.dtype} {carrier.shape}")
+        return carrier[:, :, :3]
+    if isinstance(carrier, (bytes, bytearray, memoryview)):
+        with Image.open(io.BytesIO(carrier)) as img:
+            return np.array(img.convert("RGB"), dtype=np.uint8)
+    return load_carrier(os.fspath(carrier))
+
+
+def image_to_bytes(pixels: np.ndarray, fmt: str = "PNG", png_profile: str = "default") -> bytes:
+    """
+    Encode RGB pixels as PNG or lossless WebP bytes.
+
+    Args:
+        pixels: uint8 array of shape (h, w, 3)
+        fmt: "PNG" or "WEBP"
+        png_profile: Write profile (see PNG_PROFILES / WEBP_PROFILES)
+
+    Returns:
+        Encoded image bytes
+
+    Raises:
+        ValueError: If fmt or png_profile is unknown
+    """
+    profiles = {"PNG": PNG_PROFILES, "WEBP": WEBP_PROFILES}.get(fmt.upper())
+    if profiles is None:
+        raise ValueError(f"Unknown image format: {fmt} (expected PNG or WEBP)")
+    if png_profile not in profiles:
+        raise ValueError(
+            f"Unknown PNG profile: {png_profile} (expected one of {', '.join(profiles)})"
+        )
+    buf = io.BytesIO()
+    Image.fromarray(pixels, "RGB").save(buf, format=fmt.upper(), **profiles[png_profile])
+    return buf.getvalue()
+
+
+def encode_to_bytes(plaintext: Union[str, bytes], key: bytes,
+                    carrier: Union[str, "os.PathLike[str]", bytes, np.ndarray],
+                    fit: str = "full", compression: str = "none", lsb_bits: int = 1,
+                    png_profile: str = "default", webp: bool = False) -> EncodedImage:
+    """
+    Encrypt plaintext and embed it into a carrier entirely in memory.
+
+    Nothing is written to disk or stdout. encrypt_and_embed writes the
+    result to files, so both decode with the same readers.
+
+    Args:
+        plaintext: Text (or UTF-8 bytes) to encrypt and embed
+        key: AES key
+        carrier: Carrier as a path, encoded image bytes or pixel array (see carrier_pixels)
+        fit: Output size mode (see fit_carrier_size)
+        compression: Compression mode applied before encryption (see compress_plaintext)
+        lsb_bits: Number of low bits used per channel (1-4)
+        png_profile: Write profile (see PNG_PROFILES)
+        webp: Also produce a lossless WebP variant
+
+    Returns:
+        EncodedImage with the PNG bytes and payload metadata
+
+    Raises:
+        ValueError: If the payload does not fit the carrier
+    """
+    codec, payload = seal_plaintext(plaintext, key, compression, lsb_bits)
+    pixels = embed_in_carrier(carrier_pixels(carrier), payload, fit, lsb_bits,
+                              CONTAINER_HEADER_LEN)
+    with timed_stage("png_write", pixels.nbytes) as st:
+        png = image_to_bytes(pixels, "PNG", png_profile)
+        st["bytes_out"] = len(png)
+    webp_bytes = None
+    if webp:
+        with timed_stage("webp_write", pixels.nbytes) as st:
+            webp_bytes = image_to_bytes(pixels, "WEBP", png_profile)
+            st["bytes_out"] = len(webp_bytes)
+    return EncodedImage(
+        data=png,
+        mime_type="image/png",
+        width=pixels.shape[1],
+        height=pixels.shape[0],
+        payload_len=len(payload),
+        lsb_bits=lsb_bits,
+        codec=codec,
+        webp=webp_bytes,
+    )
+
+
+# -------------------------- Streaming Encoding --------------------------
+
+def _lsb_values(data: bytes, first: int, count: int, lsb_bits: int) -> np.ndarray:
+    """
+    Values first .. first + count of data split into lsb_bits-wide groups
+    (most significant bit first, last group zero-padded), as _write_lsb
+    lays them out. Only the bytes covering that range are unpacked.
+    """
+    bit0 = first * lsb_bits
+    bit1 = min((first + count) * lsb_bits, len(data) * 8)
+    if bit1 <= bit0:
+        return np.zeros(0, dtype=np.uint8)
+    with timed_stage("bit_expand", -(-bit1 // 8) - bit0 // 8):
+        bits = bytes_to_bit_array(data[bit0 // 8:-(-bit1 // 8)])[bit0 % 8:bit0 % 8 + bit1 - bit0]
+        if lsb_bits == 1:
+            return bits
+        groups = np.zeros(-(-bits.size // lsb_bits) * lsb_bits, dtype=np.uint8)
+        groups[:bits.size] = bits
+        return np.packbits(groups.reshape(-1, lsb_bits), axis=1)[:, 0] >> (8 - lsb_bits)
+
+
+def embed_bits_in_strip(pixels: np.ndarray, offset: int, data: bytes, lsb_bits: int = 1,
+                        header_len: int = 0) -> None:
+    """
+    Embed the part of a payload that falls into one strip, in place.
+
+    Produces exactly the bits embed_bits_in_array would write into these
+    rows of the full image.
+
+    Args:
+        pixels: Writable contiguous uint8 array of shape (rows, w, 3)
+        offset: Index of the strip's first channel value in the whole image
+        data: Complete payload
+        lsb_bits: Number of low bits used per channel (1-4)
+        header_len: Length of the leading 1-bit-per-channel section
+    """
+    flat = pixels.reshape(-1)
+    header_len = min(header_len, len(data))
+    header_channels = header_len * 8
+
+    if offset < header_channels:
+        values = _lsb_values(data[:header_len], offset, header_channels - offset, 1)[:flat.size]
+        with timed_stage("pixel_write", values.size // 8):
+            flat[:values.size] &= 0xFE
+            flat[:values.size] |= values
+
+    start = max(header_channels - offset, 0)
+    if start < flat.size:
+        values = _lsb_values(data[header_len:], offset + start - header_channels,
+                             flat.size - start, lsb_bits)
+        with timed_stage("pixel_write", values.size * lsb_bits // 8):
+            body = flat[start:start + values.size]
+            body &= 0xFF ^ ((1 << lsb_bits) - 1)
+            body |= values
+
+
+def embed_data_streaming(input_png: str, output_png: str, data: bytes, fit: str = "full",
+                         lsb_bits: int = 1, png_profile: str = "default", header_len: int = 0,
+                         strip_rows: int = STRIP_ROWS) -> Tuple[int, int]:
+    """
+    Embed binary data into a PNG strip by strip, in memory bounded by the strip size.
+
+    Carrier rows are decoded, embedded and written progressively (see
+    iter_carrier_strips and PngStripWriter); payload bits are unpacked
+    only for the strip being written. The pixels are identical to those of
+    embed_data_in_png; the PNG bytes may differ as rows are filtered
+    independently of Pillow.
+
+    Args:
+        input_png: Path to carrier image
+        output_png: Path to save encoded image
+        data: Binary data to embed
+        fit: Output size mode (see fit_carrier_size)
+        lsb_bits: Number of low bits used per channel (1-4)
+        png_profile: Write profile from PNG_PROFILES
+        header_len: Leading bytes written at 1 bit per channel
+        strip_rows: Rows per strip
+
+    Returns:
+        Tuple of (width, height) of the saved image
+
+    Raises:
+        FileNotFoundError: If carrier image doesn't exist
+        ValueError: If data is too large for the image or png_profile is unknown
+    """
+    _check_lsb_bits(lsb_bits)
+    if png_profile not in PNG_PROFILES:
+        raise ValueError(
+            f"Unknown PNG profile: {png_profile} (expected one of {', '.join(PNG_PROFILES)})"
+        )
+    width, height = carrier_size(input_png)
+    needed = channels_needed(len(data), lsb_bits, header_len)
+    if needed > width * height * 3:
+        raise ValueError(
+            f"Data too large! Need {needed} channel values ({len(data) * 8} bits at "
+            f"{lsb_bits} bit(s)/channel), image only has {width * height * 3}. "
+            "Use a larger PNG image or tiled encoding (--tile-size)."
+        )
+    out_w, out_h = fit_carrier_size(width, height, len(data), fit, lsb_bits, header_len)
+
+    out_dir = os.path.dirname(output_png) or "."
+    os.makedirs(out_dir, exist_ok=True)
+
+    with PngStripWriter(output_png, out_w, out_h, **PNG_PROFILES[png_profile]) as writer:
+        strips = iter_carrier_strips(input_png, strip_rows)
+        for strip in strips:
+            with timed_stage("carrier_copy", strip.nbytes):
+                pixels = strip[:out_h - writer.rows_written, :out_w].copy()
+            embed_bits_in_strip(pixels, writer.rows_written * out_w * 3, data, lsb_bits,
+                                header_len)
+            with timed_stage("png_write", pixels.nbytes):
+                writer.write(pixels)
+            if writer.rows_written == out_h:
+                strips.close()
+                break
+    print(f"Encoded image saved: {output_png}")
+    return out_w, out_h
+
+
+# -------------------------- Extraction & Decryption --------------------------
+
+def _leading_channels(strips: Iterator[np.ndarray], parts: List[np.ndarray],
+                      count: int) -> np.ndarray:
+    """
+    Decode strips until at least `count` channel values (or the whole image)
+    are available, and return everything decoded so far as a flat array.
+    """
+    have = sum(p.size for p in parts)
+    while have < count:
+        strip = next(strips, None)
+        if strip is None:
+            break
+        parts.append(strip.reshape(-1))
+        have += strip.size
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def extract_payload_from_png(input_png: Union[str, bytes], payload_len: Optional[int] = None,
+                             lsb_bits: int = 1, offset: int = 0) -> bytes:
+    """
+    Extract embedded payload bytes from an encoded PNG.
+
+    Mirrors extractDataFromPng in app.py. The container header is read
+    first (1 bit per channel); its section lengths and density determine
+    the rest. Legacy payloads without a header need payload_len and
+    lsb_bits from the key mapping. Only the rows up to the end of the
+    payload are decoded.
+
+    Args:
+        input_png: Path to encoded image, or its bytes (see encode_to_bytes)
+        payload_len: Total payload length in bytes (legacy payloads only)
+        lsb_bits: Number of low bits used per channel (legacy payloads only)
+        offset: Channel index the payload starts at (atlas articles, see
+            MappingRow.atlas_offset)
+
+    Returns:
+        Payload bytes
+
+    Raises:
+        FileNotFoundError: If image doesn't exist
+        ValueError: If the payload exceeds image capacity, or it has no
+            container header and payload_len is not given
+    """
+    _check_lsb_bits(lsb_bits)
+    source = input_png if isinstance(input_png, str) else "in-memory image"
+    if isinstance(input_png, str) and not os.path.exists(input_png):
+        raise FileNotFoundError(f"Encoded image not found: {input_png}")
+
+    with open_image(input_png) as img:
+        w, h = img.size
+    capacity = w * h * 3
+
+    strips = iter_carrier_strips(input_png)
+    parts: List[np.ndarray] = []
+    try:
+        flat = _leading_channels(strips, parts, offset + CONTAINER_HEADER_LEN * 8)[offset:]
+        total, header_len, lsb_bits = _payload_extent(_read_lsb(flat, CONTAINER_HEADER_LEN, 1),
+                                                      payload_len, lsb_bits, source)
+
+        needed = offset + channels_needed(total, lsb_bits, header_len)
+        if needed > capacity:
+            raise ValueError(
+                f"Data too long! Need {needed} channel values, image only has {capacity}"
+            )
+        flat = _leading_channels(strips, parts, needed)[offset:]
+    finally:
+        strips.close()  # Rows past the payload are never decoded
+    return (_read_lsb(flat, header_len, 1)
+            + _read_lsb(flat[header_len * 8:], total - header_len, lsb_bits))
+
+
+def _payload_extent(head: bytes, payload_len: Optional[int], lsb_bits: int,
+                    source: str) -> Tuple[int, int, int]:
+    """Total length, 1-bit-per-channel header length and body density of a payload."""
+    info = parse_container_header(head)
+    if info is not None:
+        _, flags, _, lsb_bits, nonce_len, ct_len = info
+        _check_lsb_bits(lsb_bits)
+        header_len = container_header_len(flags)
+        return header_len + nonce_len + ct_len, header_len, lsb_bits
+    if payload_len is None:
+        raise ValueError(f"No payload container header in {source} and no payload_len given")
+    return payload_len, 0, lsb_bits
+
+
+def extract_payload_from_pixels(pixels: np.ndarray, payload_len: Optional[int] = None,
+                                lsb_bits: int = 1, offset: int = 0) -> bytes:
+    """
+    Extract embedded payload bytes from already decoded pixels.
+
+    Same layout rules as extract_payload_from_png; useful when several
+    payloads are read from one image (e.g. every article in an atlas).
+
+    Args:
+        pixels: uint8 array of shape (h, w, 3)
+        payload_len: Total payload length in bytes (legacy payloads only)
+        lsb_bits: Number of low bits used per channel (legacy payloads only)
+        offset: Channel index the payload starts at
+
+    Returns:
+        Payload bytes
+
+    Raises:
+        ValueError: If the payload exceeds the array, or it has no container
+            header and payload_len is not given
+    """
+    _check_lsb_bits(lsb_bits)
+    flat = pixels.reshape(-1)
+    total, header_len, lsb_bits = _payload_extent(
+        _read_lsb(flat[offset:], CONTAINER_HEADER_LEN, 1), payload_len, lsb_bits, "pixel array"
+    )
+    needed = offset + channels_needed(total, lsb_bits, header_len)
+    if needed > flat.size:
+        raise ValueError(f"Data too long! Need {needed} channel values, image only has {flat.size}")
+
+    flat = flat[offset:]
+    return (_read_lsb(flat, header_len, 1)
+            + _read_lsb(flat[header_len * 8:], total - header_len, lsb_bits))
+
+
+def parse_payload(payload: bytes) -> ParsedPayload:
+    """
+    Split a payload into its sections without copying.
+
+    Handles both the versioned container (see seal_payload) and the legacy
+    [12-byte nonce][u32 codec/length][ciphertext] layout.
+
+    Args:
+        payload: Payload bytes
+
+    Returns:
+        ParsedPayload whose byte fields are memoryview slices of payload
+
+    Raises:
+        ValueError: If payload is truncated or its version/flags are unsupported
+    """
+    view = memoryview(payload)
+    info = parse_container_header(view)
+    if info is not None:
+        version, flags, codec, lsb_bits, nonce_len, ct_len = info
+        header_len = container_header_len(flags)
+        nonce_end = header_len + nonce_len
+        if nonce_end + ct_len > len(view):
+            raise ValueError(
+                f"Payload truncated: header declares {nonce_len + ct_len} body bytes, "
+                f"only {max(len(view) - header_len, 0)} available"
+            )
+        tile_index, tile_count = 0, 1
+        if flags & FLAG_TILED:
+            tile_index, tile_count = TILE_EXTENSION.unpack_from(view, CONTAINER_HEADER_LEN)
+        return ParsedPayload(version, flags, codec, lsb_bits,
+                             view[header_len:nonce_end],
+                             view[nonce_end:nonce_end + ct_len],
+                             view[:header_len], tile_index, tile_count)
+
+    if len(view) < LEGACY_HEADER_LEN:
+        raise ValueError(f"Payload too short: {len(view)} bytes")
+
+    (length_field,) = struct.unpack_from(">I", view, NONCE_LEN)
+    codec, ct_len = length_field >> 24, length_field & LEGACY_MAX_CT_LEN
+    if LEGACY_HEADER_LEN + ct_len > len(view):
+        raise ValueError(
+            f"Payload truncated: header declares {ct_len} ciphertext bytes, "
+            f"only {len(view) - LEGACY_HEADER_LEN} available"
+        )
+    return ParsedPayload(0, 0, codec, 0, view[:NONCE_LEN],
+                         view[LEGACY_HEADER_LEN:LEGACY_HEADER_LEN + ct_len], None)
+
+
+def open_payload(payload: bytes, key: bytes) -> Tuple[ParsedPayload, bytes]:
+    """
+    Parse and decrypt a payload without decompressing it.
+
+    Args:
+        payload: Payload bytes
+        key: AES key
+
+    Returns:
+        Tuple of (parsed payload, decrypted bytes)
+    """
+    parsed = parse_payload(payload)
+    return parsed, AESGCM(key).decrypt(parsed.nonce, parsed.ciphertext, parsed.associated_data)
+
+
+def decrypt_payload(payload: bytes, key: bytes) -> str:
+    """
+    Parse and decrypt a payload produced by encrypt_and_embed.
+
+    Args:
+        payload: Payload bytes
+        key: AES key
+
+    Returns:
+        Decrypted plaintext
+
+    Raises:
+        ValueError: If the payload is one tile of a multi-tile article
+    """
+    parsed, pt_bytes = open_payload(payload, key)
+    if parsed.tile_count != 1:
+        raise ValueError(f"Payload is tile {parsed.tile_index} of {parsed.tile_count}; "
+                         "use extract_and_decrypt_tiles")
+    return decompress_plaintext(parsed.codec, pt_bytes).decode("utf-8")
+
+
+def extract_and_decrypt(key: bytes, input_png: Union[str, bytes],
+                        payload_len: Optional[int] = None, lsb_bits: int = 1,
+                        offset: int = 0) -> str:
+    """
+    Extract payload from an encoded PNG and decrypt it.
+
+    Python counterpart of extractAndDecryptPng in app.py.
+
+    Args:
+        key: AES key
+        input_png: Path to encoded image, or its bytes
+        payload_len: Total payload length in bytes (legacy payloads only)
+        lsb_bits: Number of low bits used per channel (legacy payloads only)
+        offset: Channel index the payload starts at (atlas articles only)
+
+    Returns:
+        Decrypted plaintext
+    """
+    payload = extract_payload_from_png(input_png, payload_len, lsb_bits, offset)
+    return decrypt_payload(payload, key)
+
+
+def extract_and_decrypt_tiles(key: bytes, tile_images: List[str]) -> str:
+    """
+    Extract, decrypt and reassemble a tiled article.
+
+    Args:
+        key: AES key
+        tile_images: Tile image paths (any order)
+
+    Returns:
+        Decrypted plaintext
+
+    Raises:
+        ValueError: If tiles are missing, duplicated or inconsistent
+    """
+    chunks: Dict[int, bytes] = {}
+    codec, count = None, None
+    for path in tile_images:
+        parsed, chunk = open_payload(extract_payload_from_png(path), key)
+        if count is None:
+            codec, count = parsed.codec, parsed.tile_count
+        elif (parsed.codec, parsed.tile_count) != (codec, count):
+            raise ValueError(f"Inconsistent tile header in {path}")
+        if parsed.tile_index in chunks:
+            raise ValueError(f"Duplicate tile index {parsed.tile_index} in {path}")
+        chunks[parsed.tile_index] = chunk
+
+    if count is None or sorted(chunks) != list(range(count)):
+        raise ValueError(f"Expected {count} tiles, got indices {sorted(chunks)}")
+    pt_bytes = b"".join(chunks[i] for i in range(count))
+    return decompress_plaintext(codec, pt_bytes).decode("utf-8")
+
+
+# -------------------------- Batch Processing --------------------------
+
+class EncodeOptions(NamedTuple):
+    """Per-article encoding options shared by every article in a batch."""
+    aes_bit_length: int = 128  # AES key length (128 or 256)
+    fit: str = "full"  # Output size: full carrier, payload rows only, or square tile
+    compression: str = "none"  # Plaintext compression before encryption
+    lsb_bits: int = 1  # Low bits used per RGB channel (1-4)
+    png_profile: str = "default"  # PNG write profile (see PNG_PROFILES)
+    webp: bool = False  # Also write a lossless WebP variant next to each PNG
+    tile_size: int = 0  # Split each article over square tiles of this size (0 = one image)
+    key_version: int = 0  # Lowest derived-key version (see reencode_options; 0 = random keys)
+    streaming: bool = False  # Decode, embed and write the carrier strip by strip
+    atlas: bool = False  # Pack many articles into shared carrier images (see encode_atlas_batch)
+
+
+# Per-worker state, populated once by _init_worker
+_worker_carrier: Optional[np.ndarray] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def article_key(article: str, options: EncodeOptions,
+                master_key: Optional[bytes] = None) -> Tuple[bytes, str]:
+    """
+    Key for one article: derived from the master key when options.key_version
+    is set, otherwise random.
+
+    Args:
+        article: Article file name
+        options: Encoding options
+        master_key: Master key (required when options.key_version > 0)
+
+    Returns:
+        Tuple of (AES key, base64 key for the mapping row; empty for derived keys)
+
+    Raises:
+        ValueError: If a derived key is requested without a master key
+    """
+    if options.key_version:
+        if master_key is None:
+            raise ValueError("A master key is required for derived keys")
+        return derive_article_key(master_key, os.path.splitext(article)[0],
+                                  options.key_version, options.aes_bit_length), ""
+    aes_key = AESGCM.generate_key(bit_length=options.aes_bit_length)
+    return aes_key, base64.b64encode(aes_key).decode("utf-8")
+
+
+def reencode_options(article: str, options: EncodeOptions,
+                     previous_rows: Optional[Dict[str, MappingRow]] = None) -> EncodeOptions:
+    """
+    Options for (re-)encoding one article.
+
+    A derived-key article that was published before moves past the key
+    version it last used (which key rotation may have raised above
+    options.key_version), so an old key is never used again.
+
+    Args:
+        article: Article file name
+        options: Encoding options
+        previous_rows: Previously published mapping rows by article
+
+    Returns:
+        Options with the article's key version
+    """
+    row = (previous_rows or {}).get(article)
+    if not options.key_version or row is None:
+        return options
+    return options._replace(key_version=max(row.key_version + 1, options.key_version))
+
+
+def encode_article(article_path: str, output_png: str, input_png: str,
+                   options: EncodeOptions = EncodeOptions(),
+                   carrier: Optional[np.ndarray] = None,
+                   master_key: Optional[bytes] = None) -> Optional[MappingRow]:
+    """
+    Encrypt one article file and embed it into a PNG.
+
+    The key is random (and recorded in the mapping row) unless
+    options.key_version is set, in which case it is derived from the master
+    key and the row only records the version.
+
+    Args:
+        article_path: Path to article text file
+        output_png: Path to save encoded image
+        input_png: Path to carrier image
+        options: Encoding options
+        carrier: Optional pre-decoded carrier pixels
+        master_key: Master key (required when options.key_version > 0)
+
+    Returns:
+        Mapping row for the article, or None if the article is empty
+    """
+    with timed_stage("read", os.path.getsize(article_path)):
+        with open(article_path, "r", encoding="utf-8") as af:
+            secret_text = af.read().strip()
+
+    if not secret_text:
+        return None
+
+    article = os.path.basename(article_path)
+    aes_key, aes_key_b64 = article_key(article, options, master_key)
+
+    if options.tile_size:
+        tiles = encrypt_and_embed_tiles(
+            plaintext=secret_text,
+            key=aes_key,
+            input_png=input_png,
+            output_png=output_png,
+            tile_size=options.tile_size,
+            carrier=carrier,
+            compression=options.compression,
+            lsb_bits=options.lsb_bits,
+            png_profile=options.png_profile,
+            webp=options.webp
+        )
+        first = tiles[0][0]
+        with timed_stage("hash", os.path.getsize(first)):
+            image_sha256 = sha256_file(first)
+        return MappingRow(article, first, aes_key_b64, sum(n for _, n in tiles),
+                          options.tile_size, options.tile_size, options.lsb_bits,
+                          os.path.splitext(first)[0] + ".webp" if options.webp else "",
+                          ",".join(path for path, _ in tiles), options.key_version,
+                          image_sha256=image_sha256)
+
+    webp_output = os.path.splitext(output_png)[0] + ".webp" if options.webp else ""
+    payload_len = encrypt_and_embed(
+        plaintext=secret_text,
+        key=aes_key,
+        input_png=input_png,
+        output_png=output_png,
+        carrier=carrier,
+        fit=options.fit,
+        compression=options.compression,
+        lsb_bits=options.lsb_bits,
+        png_profile=options.png_profile,
+        webp_output=webp_output,
+        streaming=options.streaming
+    )
+    with Image.open(output_png) as img:
+        width, height = img.size
+    with timed_stage("hash", os.path.getsize(output_png)):
+        image_sha256 = sha256_file(output_png)
+    return MappingRow(article, output_png, aes_key_b64, payload_len, width, height,
+                      options.lsb_bits, webp_output, key_version=options.key_version,
+                      image_sha256=image_sha256)
+
+
+def encode_article_with_metrics(article_path: str, output_png: str, input_png: str,
+                                options: EncodeOptions = EncodeOptions(),
+                                carrier: Optional[np.ndarray] = None,
+                                master_key: Optional[bytes] = None
+                                ) -> Tuple[Optional[MappingRow], Dict[str, Any]]:
+    """
+    encode_article with per-stage instrumentation (see timed_stage).
+
+    Args:
+        article_path: Path to article text file
+        output_png: Path to save encoded image
+        input_png: Path to carrier image
+        options: Encoding options
+        carrier: Optional pre-decoded carrier pixels
+        master_key: Master key (required when options.key_version > 0)
+
+    Returns:
+        Tuple of (mapping row or None, metrics record): article, seconds,
+        bytes_in (article file), bytes_out (all image files), payload_bytes,
+        utilization (fraction of output channel values carrying payload) and
+        stages (name -> seconds, calls, bytes_in, bytes_out)
+    """
+    t0 = time.perf_counter()
+    with collect_stages() as stages:
+        row = encode_article(article_path, output_png, input_png, options,
+                             carrier=carrier, master_key=master_key)
+
+    record = metrics_record(article_path, time.perf_counter() - t0, stages)
+    if row is not None:
+        images = len(row.tiles.split(",")) if row.tiles else 1
+        header_len = container_header_len(FLAG_TILED if row.tiles else 0) * images
+        record.update({
+            "bytes_out": sum(os.path.getsize(p) for p in row_image_paths(row)),
+            "payload_bytes": row.payload_len,
+            "utilization": channels_needed(row.payload_len, row.lsb_bits, header_len)
+                           / (images * row.width * row.height * 3),
+        })
+    return row, record
+
+
+def _init_worker(shm_name: str, shape: Tuple[int, ...]) -> None:
+    """Attach a pool worker to the shared carrier pixel buffer."""
+    global _worker_carrier, _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_carrier = np.ndarray(shape, dtype=np.uint8, buffer=_worker_shm.buf)
+    _worker_carrier.flags.writeable = False
+
+
+def _encode_one(article_path: str, output_png: str, input_png: str, options: EncodeOptions,
+                carrier: Optional[np.ndarray], master_key: Optional[bytes],
+                instrument: bool) -> Tuple[Optional[MappingRow], Optional[Dict[str, Any]]]:
+    if instrument:
+        return encode_article_with_metrics(article_path, output_png, input_png, options,
+                                           carrier=carrier, master_key=master_key)
+    return encode_article(article_path, output_png, input_png, options,
+                          carrier=carrier, master_key=master_key), None
+
+
+def _encode_article_in_worker(article_path: str, output_png: str, input_png: str,
+                              options: EncodeOptions, master_key: Optional[bytes],
+                              instrument: bool
+                              ) -> Tuple[Optional[MappingRow], Optional[Dict[str, Any]]]:
+    return _encode_one(article_path, output_png, input_png, options, _worker_carrier,
+                       master_key, instrument)
+
+
+def encode_batch(txt_files: List[str], article_dir: str, output_dir: str, input_png: str,
+                 options: EncodeOptions = EncodeOptions(), workers: int = 1,
+                 master_key: Optional[bytes] = None,
+                 metrics: Optional[List[Dict[str, Any]]] = None,
+                 previous_rows: Optional[Dict[str, MappingRow]] = None) -> List[MappingRow]:
+    """
+    Encode a batch of articles, optionally across a process pool.
+
+    The carrier is decoded once and placed in shared memory so workers
+    never receive pixel data through pickling. In streaming mode it is not
+    decoded up front; each article streams it strip by strip instead.
+    Results are reported as each article completes.
+
+    Args:
+        txt_files: Article file names inside article_dir
+        article_dir: Directory containing articles
+        output_dir: Directory for encoded images
+        input_png: Path to carrier image
+        options: Encoding options
+        workers: Number of worker processes (1 = run in this process)
+        master_key: Master key (required when options.key_version > 0)
+        metrics: If given, articles are instrumented and their metrics
+            records (see encode_article_with_metrics) are appended here
+        previous_rows: Previously published rows, for derived key versions
+            (see reencode_options)
+
+    Returns:
+        Mapping rows sorted by article name
+    """
+    instrument = metrics is not None
+    carrier = None
+    if options.streaming:
+        print(f"Streaming carrier in strips of {STRIP_ROWS} rows")
+    else:
+        t0 = time.perf_counter()
+        carrier = load_carrier(input_png)
+        decode_s = time.perf_counter() - t0
+        print(f"Carrier decoded once in {decode_s:.3f}s "
+              f"(~{decode_s * max(len(txt_files) - 1, 0):.3f}s saved vs. decoding per article)")
+
+    jobs = {
+        txt_file: (
+            os.path.join(article_dir, txt_file),
+            os.path.join(output_dir, os.path.splitext(txt_file)[0] + ".png"),
+            reencode_options(txt_file, options, previous_rows),
+        )
+        for txt_file in txt_files
+    }
+    rows = []
+
+    def collect(txt_file: str, result: Tuple[Optional[MappingRow], Optional[Dict[str, Any]]]
+                ) -> None:
+        row, record = result
+        if record is not None:
+            metrics.append(record)
+        if row is None:
+            print(f"Skipping empty file: {txt_file}")
+            return
+        rows.append(row)
+        print(f"Processed: {txt_file} -> {os.path.basename(row.img_path)}")
+
+    if workers <= 1:
+        for txt_file, (article_path, output_png, article_options) in jobs.items():
+            try:
+                collect(txt_file, _encode_one(article_path, output_png, input_png,
+                                              article_options, carrier, master_key, instrument))
+            except Exception as e:
+                print(f"Failed: {txt_file} - {str(e)}")
+        return sorted(rows)
+
+    shm = None
+    pool_kwargs: Dict[str, Any] = {}
+    if carrier is not None:
+        shm = shared_memory.SharedMemory(create=True, size=carrier.nbytes)
+        np.ndarray(carrier.shape, dtype=np.uint8, buffer=shm.buf)[:] = carrier
+        pool_kwargs = {"initializer": _init_worker, "initargs": (shm.name, carrier.shape)}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, **pool_kwargs) as pool:
+            futures = {
+                pool.submit(_encode_article_in_worker, article_path, output_png,
+                            input_png, article_options, master_key, instrument): txt_file
+                for txt_file, (article_path, output_png, article_options) in jobs.items()
+            }
+            for fut in as_completed(futures):
+                txt_file = futures[fut]
+                try:
+                    collect(txt_file, fut.result())
+                except Exception as e:
+                    print(f"Failed: {txt_file} - {str(e)}")
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    return sorted(rows)
+
+
+# -------------------------- Atlas Packing --------------------------
+
+ATLAS_PREFIX = "atlas-"
+
+
+def _write_atlas(carrier: np.ndarray, slots: List[Tuple[str, str, int, bytes, int]], used: int,
+                 output_dir: str, options: EncodeOptions) -> List[MappingRow]:
+    """Embed packed payloads into one fitted carrier copy and save it under its content hash."""
+    h, w = carrier.shape[:2]
+    out_w, out_h = fit_carrier_size(w, h, -(-used // 8), options.fit)
+    with timed_stage("carrier_copy", out_w * out_h * 3):
+        pixels = carrier[:out_h, :out_w].copy()
+    flat = pixels.reshape(-1)
+    for _, _, _, payload, offset in slots:
+        embed_bits_in_array(flat[offset:], payload, options.lsb_bits, CONTAINER_HEADER_LEN)
+
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = os.path.join(output_dir, f"{ATLAS_PREFIX}tmp{os.getpid()}.png")
+    img = Image.fromarray(pixels, "RGB")
+    with timed_stage("png_write", pixels.nbytes) as st:
+        img.save(tmp_path, format="PNG", **PNG_PROFILES[options.png_profile])
+        st["bytes_out"] = os.path.getsize(tmp_path)
+    with timed_stage("hash", os.path.getsize(tmp_path)):
+        image_sha256 = sha256_file(tmp_path)
+    atlas_png = os.path.join(output_dir, f"{ATLAS_PREFIX}{image_sha256[:16]}.png")
+    os.replace(tmp_path, atlas_png)
+    print(f"Encoded image saved: {atlas_png} ({len(slots)} article(s))")
+
+    webp_path = ""
+    if options.webp:
+        webp_path = os.path.splitext(atlas_png)[0] + ".webp"
+        with timed_stage("webp_write", pixels.nbytes) as st:
+            img.save(webp_path, format="WEBP", **WEBP_PROFILES[options.png_profile])
+            st["bytes_out"] = os.path.getsize(webp_path)
+        print(f"Encoded image saved: {webp_path}")
+
+    return [MappingRow(article, atlas_png, aes_key_b64, len(payload), out_w, out_h,
+                       options.lsb_bits, webp_path, key_version=key_version,
+                       image_sha256=image_sha256, atlas_offset=offset)
+            for article, aes_key_b64, key_version, payload, offset in slots]
+
+
+def _charge_atlas_metrics(rows: List[MappingRow], records: List[Dict[str, Any]], used: int,
+                          seconds: float, stages: Dict[str, Dict[str, float]]) -> None:
+    """
+    Split the cost of writing one atlas over the metrics records of its articles.
+
+    Each article is charged its share of the atlas channel values (seconds,
+    stage times and output bytes). Its utilization is that of the whole
+    atlas, since the output image is shared.
+    """
+    bytes_out = sum(os.path.getsize(p) for p in row_image_paths(rows[0]))
+    for row, record in zip(rows, records):
+        share = channels_needed(row.payload_len, row.lsb_bits, CONTAINER_HEADER_LEN) / used
+        record["seconds"] += share * seconds
+        for name, stage in stages.items():
+            total = record["stages"].setdefault(
+                name, {"seconds": 0.0, "calls": 0, "bytes_in": 0, "bytes_out": 0}
+            )
+            total["seconds"] += share * stage["seconds"]
+            total["calls"] += stage["calls"]
+            total["bytes_in"] += round(share * stage["bytes_in"])
+            total["bytes_out"] += round(share * stage["bytes_out"])
+        record.update({
+            "bytes_out": round(share * bytes_out),
+            "payload_bytes": row.payload_len,
+            "utilization": used / (row.width * row.height * 3),
+        })
+
+
+def encode_atlas_batch(txt_files: List[str], article_dir: str, output_dir: str, input_png: str,
+                       options: EncodeOptions = EncodeOptions(),
+                       master_key: Optional[bytes] = None,
+                       previous_rows: Optional[Dict[str, MappingRow]] = None,
+                       metrics: Optional[List[Dict[str, Any]]] = None) -> List[MappingRow]:
+    """
+    Encode a batch of articles into shared atlas images.
+
+    Every article is sealed in its own container under its own key, as in
+    encode_article. The containers are packed back to back into the
+    carrier's channel space in article name order, and a new atlas is
+    started when the next one does not fit. Each mapping row records its
+    atlas (img_path), first channel (atlas_offset) and length (payload_len),
+    so a reader decodes only the rows up to the end of its own payload and
+    cannot decrypt its neighbours.
+
+    Atlases are named by content hash, so a new atlas never overwrites one
+    carried over from an earlier generation. Packing runs in this process.
+
+    Args:
+        txt_files: Article file names inside article_dir
+        article_dir: Directory containing articles
+        output_dir: Directory for atlas images
+        input_png: Path to carrier image
+        options: Encoding options (tile_size and streaming are not supported)
+        master_key: Master key (required when options.key_version > 0)
+        previous_rows: Previously published rows, for derived key versions
+            (see reencode_options)
+        metrics: If given, articles are instrumented and their metrics
+            records (as in encode_article_with_metrics) are appended here;
+            each atlas write is charged to its articles (see
+            _charge_atlas_metrics)
+
+    Returns:
+        Mapping rows sorted by article name
+    """
+    instrument = metrics is not None
+    carrier = load_carrier(input_png)
+    h, w = carrier.shape[:2]
+    capacity = w * h * 3
+    rows: List[MappingRow] = []
+    # (article, base64 key, key version, payload, offset)
+    slots: List[Tuple[str, str, int, bytes, int]] = []
+    records: List[Dict[str, Any]] = []  # Metrics records of the open atlas's articles
+    used = 0
+
+    def write_atlas() -> List[MappingRow]:
+        if not instrument:
+            return _write_atlas(carrier, slots, used, output_dir, options)
+        t0 = time.perf_counter()
+        with collect_stages() as stages:
+            atlas_rows = _write_atlas(carrier, slots, used, output_dir, options)
+        _charge_atlas_metrics(atlas_rows, records, used, time.perf_counter() - t0, stages)
+        metrics.extend(records)
+        return atlas_rows
+
+    for txt_file in sorted(txt_files):
+        article_path = os.path.join(article_dir, txt_file)
+        t0 = time.perf_counter()
+        with collect_stages(instrument) as stages:
+            try:
+                with timed_stage("read", os.path.getsize(article_path)):
+                    with open(article_path, "r", encoding="utf-8") as af:
+                        secret_text = af.read().strip()
+                if not secret_text:
+                    print(f"Skipping empty file: {txt_file}")
+                    if instrument:
+                        metrics.append(metrics_record(article_path,
+                                                      time.perf_counter() - t0, stages))
+                    continue
+
+                article_options = reencode_options(txt_file, options, previous_rows)
+                aes_key, aes_key_b64 = article_key(txt_file, article_options, master_key)
+                data = secret_text.encode("utf-8")
+                with timed_stage("compress", len(data)) as st:
+                    codec, pt_bytes = compress_plaintext(data, options.compression)
+                    st["bytes_out"] = len(pt_bytes)
+                with timed_stage("encrypt", len(pt_bytes)) as st:
+                    payload = seal_payload(pt_bytes, aes_key, codec, options.lsb_bits)
+                    st["bytes_out"] = len(payload)
+                needed = channels_needed(len(payload), options.lsb_bits, CONTAINER_HEADER_LEN)
+                if needed > capacity:
+                    raise ValueError(f"Data too large! Need {needed} channel values, "
+                                     f"carrier only has {capacity}")
+            except Exception as e:
+                print(f"Failed: {txt_file} - {str(e)}")
+                continue
+
+        if used + needed > capacity:
+            rows += write_atlas()
+            slots, records, used = [], [], 0
+        slots.append((txt_file, aes_key_b64, article_options.key_version, payload, used))
+        if instrument:
+            records.append(metrics_record(article_path, time.perf_counter() - t0, stages))
+        print(f"Processed: {txt_file} -> atlas slot {len(slots) - 1} at channel {used}")
+        used += needed
+
+    if slots:
+        rows += write_atlas()
+    return sorted(rows)
+
+
+# -------------------------- Capacity Planning --------------------------
+
+class ArticlePlan(NamedTuple):
+    """Predicted layout of one article (see plan_article)."""
+    article: str
+    plaintext_bytes: int  # After compression
+    payload_bytes: int  # Container(s) including headers, nonces and tags
+    bits_needed: int
+    capacity_bits: int  # Per image
+    utilization: float  # Fraction of carrier channel slots used
+    out_width: int
+    out_height: int
+    tiles: int  # Number of images (1 unless tiled)
+    predicted_bytes: int  # Estimated PNG bytes, all images
+    fits: bool
+    suggestion: str  # How to make it fit, if it doesn't
+
+
+def carrier_size(input_png: str) -> Tuple[int, int]:
+    """
+    Read the carrier dimensions from its header, without decoding pixels.
+
+    Args:
+        input_png: Path to carrier image
+
+    Returns:
+        Tuple of (width, height)
+
+    Raises:
+        FileNotFoundError: If carrier image doesn't exist
+    """
+    if not os.path.exists(input_png):
+        raise FileNotFoundError(f"Carrier image not found: {input_png}")
+    with Image.open(input_png) as img:
+        return img.size
+
+
+def _predict_png_bytes(carrier_bytes: int, carrier_pixels: int, out_pixels: int,
+                       payload_bytes: int) -> int:
+    """Carrier file size scaled to the output area, plus the incompressible payload bits."""
+    return carrier_bytes * out_pixels // max(carrier_pixels, 1) + payload_bytes
+
+
+def plan_article(article: str, pt_bytes: int, width: int, height: int,
+                 options: EncodeOptions, carrier_bytes: int = 0) -> ArticlePlan:
+    """
+    Predict how an article of a given (compressed) size lands in the carrier.
+
+    Args:
+        article: Article file name
+        pt_bytes: Plaintext length after compression
+        width: Carrier width
+        height: Carrier height
+        options: Encoding options
+        carrier_bytes: Carrier file size, for the output size estimate
+
+    Returns:
+        ArticlePlan
+    """
+    lsb_bits = options.lsb_bits
+    total_channels = width * height * 3
+
+    if options.tile_size:
+        tile = options.tile_size
+        header_len = container_header_len(FLAG_TILED)
+        chunk = tile_chunk_capacity(tile, lsb_bits)
+        fits = tile <= min(width, height) and chunk > 0
+        tiles = -(-max(pt_bytes, 1) // chunk) if chunk > 0 else 0
+        fits = fits and tiles <= 0xFFFF
+        payload = pt_bytes + tiles * (header_len + NONCE_LEN + GCM_TAG_LEN)
+        capacity_bits = header_len * 8 + (tile * tile * 3 - header_len * 8) * lsb_bits
+        return ArticlePlan(
+            article, pt_bytes, payload, payload * 8, capacity_bits,
+            pt_bytes / (tiles * chunk) if fits else float("inf"), tile, tile, tiles,
+            tiles * _predict_png_bytes(carrier_bytes, width * height, tile * tile, 0) + payload,
+            fits, "" if fits else f"use a tile size between {math.isqrt(header_len * 8 // 3) + 1} "
+                                  f"and {min(width, height)}"
+        )
+
+    payload = CONTAINER_HEADER_LEN + NONCE_LEN + pt_bytes + GCM_TAG_LEN
+    needed = channels_needed(payload, lsb_bits, CONTAINER_HEADER_LEN)
+    capacity_bits = CONTAINER_HEADER_LEN * 8 + (total_channels - CONTAINER_HEADER_LEN * 8) * lsb_bits
+    fits = needed <= total_channels and payload - CONTAINER_HEADER_LEN - NONCE_LEN <= 0xFFFFFFFF
+    out_w, out_h = fit_carrier_size(width, height, payload, options.fit, lsb_bits,
+                                    CONTAINER_HEADER_LEN) if fits else (width, height)
+
+    suggestion = ""
+    if not fits:
+        denser = [b for b in LSB_BITS_CHOICES
+                  if channels_needed(payload, b, CONTAINER_HEADER_LEN) <= total_channels]
+        if denser:
+            suggestion = f"use --lsb-bits {denser[0]}"
+        else:
+            tile = min(width, height)
+            chunk = tile_chunk_capacity(tile, lsb_bits)
+            suggestion = f"use --tile-size {tile} ({-(-pt_bytes // chunk)} tiles)"
+            if options.atlas:
+                suggestion += " without --atlas"
+
+    return ArticlePlan(
+        article, pt_bytes, payload, payload * 8, capacity_bits, needed / total_channels,
+        out_w, out_h, 1,
+        _predict_png_bytes(carrier_bytes, width * height, out_w * out_h, payload),
+        fits, suggestion
+    )
+
+
+def plan_capacity(txt_files: List[str], article_dir: str, input_png: str,
+                  options: EncodeOptions) -> List[ArticlePlan]:
+    """
+    Plan every article against the carrier without decoding any pixels.
+
+    Only the carrier header is read; each article is read and (if
+    requested) compressed, which is cheap next to embedding.
+
+    Args:
+        txt_files: Article file names inside article_dir
+        article_dir: Directory containing articles
+        input_png: Path to carrier image
+        options: Encoding options
+
+    Returns:
+        Plans sorted by article name (empty articles are left out)
+    """
+    width, height = carrier_size(input_png)
+    carrier_bytes = os.path.getsize(input_png)
+    plans = []
+    for txt_file in sorted(txt_files):
+        with open(os.path.join(article_dir, txt_file), "r", encoding="utf-8") as af:
+            text = af.read().strip()
+        if not text:
+            continue
+        _, pt_bytes = compress_plaintext(text.encode("utf-8"), options.compression)
+        plans.append(plan_article(txt_file, len(pt_bytes), width, height, options, carrier_bytes))
+    return plans
+
+
+def print_capacity_plan(plans: List[ArticlePlan]) -> None:
+    """Print a capacity plan as a table."""
+    print(f"{'article':<40} {'payload':>10} {'bits':>11} {'util':>7} "
+          f"{'output':>11} {'tiles':>5} {'~bytes':>11}  status")
+    for p in plans:
+        util = f"{p.utilization:.1%}" if p.fits else "-"
+        status = "ok" if p.fits else f"TOO LARGE: {p.suggestion}"
+        print(f"{p.article:<40} {p.payload_bytes:>10} {p.bits_needed:>11} {util:>7} "
+              f"{p.out_width:>5}x{p.out_height:<5} {p.tiles:>5} {p.predicted_bytes:>11}  {status}")
+
+
+# -------------------------- Main Execution --------------------------
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INPUT_PNG = os.path.join(BASE_DIR, "encryption", "carrier", "base_image.png")
+OUTPUT_PNG_DIR = os.path.join(BASE_DIR, "encryption", "carrier", "encoded")
+KEY_INFO_FILE = os.path.join(BASE_DIR, "encryption", "key", "key_mapping.txt")  # TSV import/export
+INDEX_FILE = os.path.join(BASE_DIR, "encryption", "key", "index.sqlite3")
+MANIFEST_FILE = os.path.join(BASE_DIR, "encryption", "key", "manifest.json")
+MASTER_KEY_FILE = os.path.join(BASE_DIR, "encryption", "key", "master.key")
+ARTICLE_DIR = os.path.join(BASE_DIR, "data", "articles")
+PROFILE_DIR = os.path.join(OUTPUT_PNG_DIR, "profiles")
+
+# Functions reported on by --profile (see profiling.profile_run)
+PROFILE_HOT_FUNCTIONS = ("run_encoder", "encode_batch", "encode_atlas_batch", "encode_article",
+                         "embed_data_in_png", "embed_data_streaming", "bytes_to_bit_array",
+                         "bytes_to_lsb_bits", "src.verify.verify_rows")
+
+
+def run_encoder(options: EncodeOptions, workers: int = 1, incremental: bool = False,
+                master_key: Optional[bytes] = None, keep_generations: int = 2,
+                hash_cache: Optional[Dict[str, Tuple[Tuple[int, int], str]]] = None,
+                metrics_file: Optional[str] = None) -> Optional[List[MappingRow]]:
+    """
+    Encode the article directory and publish the mapping (one encoder run).
+
+    Args:
+        options: Encoding options
+        workers: Number of worker processes
+        incremental: Only re-encode articles that changed since the last run
+        master_key: Master key (derived-key mode only)
+        keep_generations: Encoded image generations to keep (see prune_generations)
+        hash_cache: Article hash cache reused across runs (see hash_articles)
+        metrics_file: Append per-article stage metrics and a summary here
+            (JSON lines, see write_metrics)
+
+    Returns:
+        Published mapping rows, or None if there are no articles
+    """
+    # Get all txt files in article directory
+    txt_files = [f for f in os.listdir(ARTICLE_DIR) if f.lower().endswith(".txt")]
+    if not txt_files:
+        print(f"Warning: No txt files found in {ARTICLE_DIR}")
+        return None
+
+    key_id = master_key_id(master_key) if master_key else None
+    carrier_sha256 = sha256_file(INPUT_PNG)
+    article_hashes = hash_articles(ARTICLE_DIR, txt_files, {} if hash_cache is None else hash_cache)
+
+    # Hold the index lock from reading the previous rows until the new ones
+    # are published, so a concurrent key rotation is neither lost nor undone
+    with index_lock(INDEX_FILE):
+        previous_rows = (load_mapping_rows(INDEX_FILE, KEY_INFO_FILE, BASE_DIR)
+                         if incremental or master_key else {})
+        kept = []
+        if incremental:
+            txt_files, kept = plan_incremental(
+                txt_files, article_hashes, carrier_sha256, options,
+                read_manifest(MANIFEST_FILE), previous_rows, key_id
+            )
+            print(f"Incremental: {len(kept)} unchanged, {len(txt_files)} to encode")
+
+        # Abort before any pixel work if an article cannot fit
+        misfits = [p for p in plan_capacity(txt_files, ARTICLE_DIR, INPUT_PNG, options)
+                   if not p.fits]
+        if misfits:
+            print_capacity_plan(misfits)
+            raise ValueError(f"{len(misfits)} article(s) do not fit the carrier; "
+                             "nothing was encoded")
+
+        print(f"===== Starting batch encryption and embedding ({workers} worker(s)) =====")
+        rows, encoded = sorted(kept), []
+        if txt_files:
+            # Stage the whole new set in an unreferenced generation directory
+            gen_dir = new_generation_dir(OUTPUT_PNG_DIR)
+            metrics = [] if metrics_file else None
+            t0 = time.perf_counter()
+            if options.atlas:
+                encoded = encode_atlas_batch(txt_files, ARTICLE_DIR, gen_dir, INPUT_PNG,
+                                             options=options, master_key=master_key,
+                                             previous_rows=previous_rows, metrics=metrics)
+            else:
+                encoded = encode_batch(txt_files, ARTICLE_DIR, gen_dir, INPUT_PNG,
+                                       options=options, workers=workers, master_key=master_key,
+                                       metrics=metrics, previous_rows=previous_rows)
+            if metrics_file:
+                summary = summarize_metrics(metrics, time.perf_counter() - t0)
+                write_metrics(metrics_file, metrics, summary)
+                print_metrics_summary(summary)
+                print(f"Metrics appended to: {metrics_file}")
+            encoded = [row._replace(content_sha256=article_hashes[row.article]) for row in encoded]
+            rows = sorted(kept + encoded)
+            written = sorted({p for row in encoded for p in row_image_paths(row)})
+            print(f"Staged {fsync_paths(written)} file(s) in {gen_dir}")
+
+        # Publish: the index transaction switches readers to the new generation
+        publish_index(INDEX_FILE, encoded, [row.article for row in rows], BASE_DIR)
+        write_manifest(MANIFEST_FILE, carrier_sha256, options,
+                       {row.article: article_hashes[row.article] for row in rows}, key_id)
+        for path in prune_generations(OUTPUT_PNG_DIR, rows, keep=keep_generations):
+            print(f"Removed old generation: {path}")
+
+    print(f"\nBatch processing complete!")
+    print(f"Article index: {INDEX_FILE}")
+    print(f"Encoded images directory: {OUTPUT_PNG_DIR}")
+    return rows
+
+
+def run_verification(rows: List[MappingRow], workers: int = 1,
+                     master_key: Optional[bytes] = None) -> bool:
+    """
+    Verify the published articles and print the pass/fail report.
+
+    Non-empty articles without a published row (e.g. ones whose encoding
+    failed) are reported as failures too.
+
+    Args:
+        rows: Published mapping rows
+        workers: Number of worker processes
+        master_key: Master key (derived-key mode only)
+
+    Returns:
+        True if every article passed
+    """
+    from src.verify import VerifyResult, print_verify_report, verify_rows
+
+    print(f"===== Verifying {len(rows)} encoded article(s) ({workers} worker(s)) =====")
+    t0 = time.perf_counter()
+    results = verify_rows(rows, ARTICLE_DIR, master_key, workers)
+
+    published = {row.article for row in rows}
+    for txt_file in sorted(f for f in os.listdir(ARTICLE_DIR) if f.lower().endswith(".txt")):
+        if txt_file in published:
+            continue
+        with open(os.path.join(ARTICLE_DIR, txt_file), "r", encoding="utf-8") as af:
+            if af.read().strip():
+                results.append(VerifyResult(txt_file, False, "no encoded image", 0, 0.0))
+
+    print_verify_report(results, time.perf_counter() - t0)
+    return all(r.ok for r in results)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Encrypt articles and embed them into carrier images"
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (default: 1, 0 = all CPU cores)"
+    )
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-encode articles whose content (or the carrier) changed since the last run"
+    )
+    ap.add_argument(
+        "--fit",
+        choices=FIT_MODES,
+        help="Output image size: full carrier, payload rows only, or a square tile "
+             "(default: full, or rows with --atlas)"
+    )
+    ap.add_argument(
+        "--compression",
+        choices=COMPRESSION_MODES,
+        default="none",
+        help="Compress plaintext before encryption; 'auto' keeps the smallest result (default: none)"
+    )
+    ap.add_argument(
+        "--lsb-bits",
+        type=int,
+        choices=LSB_BITS_CHOICES,
+        default=1,
+        help="Low bits used per RGB channel; 4 packs 12 bits per pixel (default: 1)"
+    )
+    ap.add_argument(
+        "--png-profile",
+        choices=list(PNG_PROFILES),
+        default="default",
+        help="PNG write profile: 'fast' for quick rebuilds, 'small' for served images (default: default)"
+    )
+    ap.add_argument(
+        "--webp",
+        action="store_true",
+        help="Also write a lossless WebP variant of each encoded image"
+    )
+    ap.add_argument(
+        "--tile-size",
+        type=int,
+        default=0,
+        help="Split each article over square tiles of this many pixels per side (default: 0 = off)"
+    )
+    ap.add_argument(
+        "--stream",
+        action="store_true",
+        help=f"Decode, embed and write the carrier in strips of {STRIP_ROWS} rows, in bounded "
+             "memory (not with --webp or --tile-size)"
+    )
+    ap.add_argument(
+        "--atlas",
+        action="store_true",
+        help="Pack many articles into shared carrier images at recorded offsets, each under "
+             "its own key (not with --tile-size or --stream)"
+    )
+    ap.add_argument(
+        "--derive-keys",
+        action="store_true",
+        help=f"Derive article keys from the master key ({MASTER_KEY_FILE}, created if missing) "
+             "instead of storing a random key per article"
+    )
+    ap.add_argument(
+        "--key-version",
+        type=int,
+        default=1,
+        help="Lowest key version for --derive-keys (default: 1). A re-encoded article moves to "
+             "max(its previous version + 1, this value), so every re-encode (a full run, or a "
+             "changed article with --incremental) already rotates its key"
+    )
+    ap.add_argument(
+        "--keep-generations",
+        type=int,
+        default=2,
+        help="Encoded image generations kept for in-flight requests (default: 2, minimum: 1)"
+    )
+    ap.add_argument(
+        "--watch",
+        action="store_true",
+        help=f"Keep running and re-encode changed articles in {ARTICLE_DIR} incrementally"
+    )
+    ap.add_argument(
+        "--debounce",
+        type=float,
+        default=1.0,
+        help="Watch mode: seconds without changes before re-encoding (default: 1.0)"
+    )
+    ap.add_argument(
+        "--poll",
+        action="store_true",
+        help="Watch mode: poll the directory instead of using inotify"
+    )
+    ap.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Watch mode: polling period in seconds (default: 1.0)"
+    )
+    ap.add_argument(
+        "--metrics",
+        metavar="JSONL",
+        help="Append per-article, per-stage timings and a p50/p95 summary to this JSON lines file"
+    )
+    ap.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="DIR",
+        help=f"Write a cProfile dump and a tracemalloc report to DIR (default: {PROFILE_DIR}); "
+             "covers this process only, so use with --workers 1"
+    )
+    ap.add_argument(
+        "--verify",
+        action="store_true",
+        help="After publishing, extract and decrypt every encoded image (using --workers "
+             "processes) and compare it with its article; exit with status 1 on any failure"
+    )
+    ap.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the capacity plan for every article and exit (reads no pixels)"
+    )
+    ap.add_argument(
+        "--import-mapping",
+        metavar="TSV",
+        help="Import a TSV key mapping into the article index and exit"
+    )
+    ap.add_argument(
+        "--export-mapping",
+        metavar="TSV",
+        help="Export the article index as a TSV key mapping and exit"
+    )
+    args = ap.parse_args()
+    if args.import_mapping:
+        n = import_key_mapping(args.import_mapping, INDEX_FILE, BASE_DIR)
+        print(f"Imported {n} row(s) from {args.import_mapping} into {INDEX_FILE}")
+        return
+    if args.export_mapping:
+        n = export_key_mapping(INDEX_FILE, args.export_mapping, BASE_DIR)
+        print(f"Exported {n} row(s) from {INDEX_FILE} to {args.export_mapping}")
+        return
+    if args.key_version < 1:
+        ap.error("--key-version must be >= 1")
+    if args.keep_generations < 1:
+        ap.error("--keep-generations must be >= 1")
+    if args.stream and (args.webp or args.tile_size):
+        ap.error("--stream cannot be combined with --webp or --tile-size")
+    if args.atlas and (args.tile_size or args.stream):
+        ap.error("--atlas cannot be combined with --tile-size or --stream")
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if args.atlas and workers > 1:
+        print(f"Note: --atlas packs in this process; --workers {workers} only applies to --verify")
+    fit = args.fit or ("rows" if args.atlas else "full")
+    options = EncodeOptions(aes_bit_length=AES_BIT_LENGTH, fit=fit,
+                            compression=args.compression, lsb_bits=args.lsb_bits,
+                            png_profile=args.png_profile, webp=args.webp,
+                            tile_size=args.tile_size,
+                            key_version=args.key_version if args.derive_keys else 0,
+                            streaming=args.stream, atlas=args.atlas)
+    master_key = load_master_key(MASTER_KEY_FILE, create=True) if args.derive_keys else None
+
+    # Ensure directories exist
+    os.makedirs(OUTPUT_PNG_DIR, exist_ok=True)
+    os.makedirs(ARTICLE_DIR, exist_ok=True)
+
+    if args.dry_run:
+        txt_files = [f for f in os.listdir(ARTICLE_DIR) if f.lower().endswith(".txt")]
+        plans = plan_capacity(txt_files, ARTICLE_DIR, INPUT_PNG, options)
+        print_capacity_plan(plans)
+        exit(0 if all(p.fits for p in plans) else 1)
+
+    profiling = contextlib.nullcontext()
+    if args.profile is not None:
+        if workers > 1:
+            print(f"Note: --profile covers this process only, not the {workers} workers")
+        profiling = profile_run(args.profile or PROFILE_DIR, "encoder", sys.modules[__name__],
+                                PROFILE_HOT_FUNCTIONS)
+
+    hash_cache: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def rebuild() -> None:
+        rows = run_encoder(options, workers, True, master_key, args.keep_generations,
+                           hash_cache, args.metrics)
+        if args.verify and rows:
+            run_verification(rows, workers, master_key)
+
+    with profiling:
+        try:
+            rows = run_encoder(options, workers, args.incremental, master_key,
+                               args.keep_generations, hash_cache, args.metrics)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(1)
+        verified = not (args.verify and rows) or run_verification(rows, workers, master_key)
+        if not verified and not args.watch:
+            exit(1)
+        if rows is None and not args.watch:
+            exit(0)
+
+        if args.watch:
+            watch_articles(
+                ARTICLE_DIR,
+                rebuild,
+                debounce=args.debounce,
+                poll_interval=args.poll_interval,
+                use_inotify=not args.poll
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Article mapping rows and their stores: the SQLite article index and the
+TSV key mapping it can be imported from and exported to.
+
+Shared by the encoder, the key rotation job and app.py. Kept apart from
+encoder.py so the web app can look up articles without loading the image
+pipeline.
+"""
+
+import contextlib
+import os
+import sqlite3
+from typing import Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writers must not overlap
+    fcntl = None
+
+
+# -------------------------- Mapping Rows --------------------------
+
+class MappingRow(NamedTuple):
+    """One line of the article-image-key mapping file."""
+    article: str
+    img_path: str
+    aes_key_b64: str
+    payload_len: int
+    width: int = 0
+    height: int = 0
+    lsb_bits: int = 1
+    webp_path: str = ""
+    tiles: str = ""  # Comma-separated tile image paths, in order (tiled articles only)
+    key_version: int = 0  # Derived-key version; aes_key_b64 is empty when > 0
+    content_sha256: str = ""  # SHA-256 of the article file
+    image_sha256: str = ""  # SHA-256 of img_path
+    atlas_offset: int = -1  # First channel of the payload in a shared atlas (-1 = own image)
+
+
+MAPPING_COLUMNS = ("ARTICLE_NAME", "IMAGE_PATH", "AES_KEY_B64", "PAYLOAD_LEN",
+                   "WIDTH", "HEIGHT", "LSB_BITS", "WEBP_PATH", "TILES", "KEY_VERSION",
+                   "CONTENT_SHA256", "IMAGE_SHA256", "ATLAS_OFFSET")
+
+
+@contextlib.contextmanager
+def atomic_open(path: str, encoding: str = "utf-8"):
+    """
+    Open a temporary sibling of path for writing; on success it is fsynced
+    and renamed over path, on error it is removed.
+
+    Args:
+        path: Final file path
+        encoding: Text encoding
+
+    Yields:
+        Writable text file object
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp_path, "w", encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def write_key_mapping(key_info_file: str, rows: List[MappingRow]) -> None:
+    """
+    Write the article-image-key mapping file (tab-separated with header).
+
+    The file is written to a temporary sibling, fsynced and renamed over the
+    old one, so concurrent readers see either the old or the new mapping.
+
+    Args:
+        key_info_file: Path to mapping file
+        rows: Mapping rows as returned by encode_batch
+    """
+    with atomic_open(key_info_file) as f:
+        f.write("\t".join(MAPPING_COLUMNS) + "\n")
+        for row in rows:
+            f.write("\t".join(str(v) for v in row) + "\n")
+
+
+def read_key_mapping(key_info_file: str) -> Dict[str, MappingRow]:
+    """
+    Read an existing key mapping file written by write_key_mapping.
+
+    Columns are matched by the header line, so files written before the
+    optional columns existed are accepted: LSB_BITS defaults to 1, KEY_VERSION
+    to 0, ATLAS_OFFSET to -1, WEBP_PATH, TILES and the hashes to empty, and
+    missing dimensions are read from the image header when the image exists.
+
+    Args:
+        key_info_file: Path to mapping file
+
+    Returns:
+        Dict mapping article name to its mapping row; empty if the file is missing
+    """
+    rows = {}
+    if not os.path.exists(key_info_file):
+        return rows
+
+    with open(key_info_file, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+
+    if not lines:
+        return rows
+    header = lines[0].rstrip("\r\n").split("\t")
+
+    for line in lines[1:]:
+        parts = line.rstrip("\r\n").split("\t")
+        if len(parts) != len(header):
+            continue  # Skip malformed lines
+        rec = dict(zip(header, parts))
+        img_path = rec["IMAGE_PATH"]
+        width, height = int(rec.get("WIDTH", 0)), int(rec.get("HEIGHT", 0))
+        if not (width and height) and os.path.exists(img_path):
+            with Image.open(img_path) as img:
+                width, height = img.size
+        rows[rec["ARTICLE_NAME"]] = MappingRow(
+            rec["ARTICLE_NAME"], img_path, rec["AES_KEY_B64"], int(rec["PAYLOAD_LEN"]),
+            width, height, int(rec.get("LSB_BITS", 1)), rec.get("WEBP_PATH", ""),
+            rec.get("TILES", ""), int(rec.get("KEY_VERSION") or 0),
+            rec.get("CONTENT_SHA256", ""), rec.get("IMAGE_SHA256", ""),
+            int(rec["ATLAS_OFFSET"]) if rec.get("ATLAS_OFFSET") else -1
+        )
+    return rows
+
+
+# -------------------------- Article Index --------------------------
+
+# SQLite store of the mapping rows, shared by the encoder and app.py.
+# Lookups by article id use the primary key and listings scan it in order,
+# so both stay O(log n) as the corpus grows. Image paths are stored relative
+# to the project root, so an index can move between machines. The database
+# runs in WAL mode: a publish upserts the changed rows and deletes removed
+# ones in one transaction while readers keep seeing the previous snapshot
+# until it commits.
+INDEX_SCHEMA_VERSION = 2
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    article TEXT NOT NULL,
+    img_path TEXT NOT NULL,
+    aes_key_b64 TEXT NOT NULL DEFAULT '',
+    payload_len INTEGER NOT NULL,
+    width INTEGER NOT NULL DEFAULT 0,
+    height INTEGER NOT NULL DEFAULT 0,
+    lsb_bits INTEGER NOT NULL DEFAULT 1,
+    webp_path TEXT NOT NULL DEFAULT '',
+    tiles TEXT NOT NULL DEFAULT '',
+    key_version INTEGER NOT NULL DEFAULT 0,
+    content_sha256 TEXT NOT NULL DEFAULT '',
+    image_sha256 TEXT NOT NULL DEFAULT '',
+    atlas_offset INTEGER NOT NULL DEFAULT -1
+) WITHOUT ROWID
+"""
+# Statements that upgrade an index from the preceding schema version
+INDEX_MIGRATIONS = {
+    2: "ALTER TABLE articles ADD COLUMN atlas_offset INTEGER NOT NULL DEFAULT -1",
+}
+_INDEX_FIELDS = MappingRow._fields
+_INDEX_PATH_FIELDS = ("img_path", "webp_path", "tiles")
+
+
+def open_index(index_file: str, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Open (and if needed create) the article index.
+
+    An index written by an older schema version is upgraded in place (see
+    INDEX_MIGRATIONS), also when it is opened read-only.
+
+    Args:
+        index_file: Path to the SQLite database
+        readonly: Open read-only (the file must exist)
+
+    Returns:
+        Connection
+
+    Raises:
+        ValueError: If the index was written by a newer schema version
+    """
+    if readonly:
+        conn = sqlite3.connect(f"file:{index_file}?mode=ro", uri=True)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_SCHEMA_VERSION:
+            conn.close()
+            open_index(index_file).close()
+            conn = sqlite3.connect(f"file:{index_file}?mode=ro", uri=True)
+    else:
+        os.makedirs(os.path.dirname(index_file) or ".", exist_ok=True)
+        conn = sqlite3.connect(index_file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(INDEX_SCHEMA)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            conn.execute(f"PRAGMA user_version={INDEX_SCHEMA_VERSION}")
+        elif version < INDEX_SCHEMA_VERSION:
+            with conn:
+                for target in range(version + 1, INDEX_SCHEMA_VERSION + 1):
+                    conn.execute(INDEX_MIGRATIONS[target])
+                conn.execute(f"PRAGMA user_version={INDEX_SCHEMA_VERSION}")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > INDEX_SCHEMA_VERSION:
+        conn.close()
+        raise ValueError(f"Unsupported index schema version: {version}")
+    return conn
+
+
+@contextlib.contextmanager
+def index_lock(index_file: str):
+    """
+    Hold an exclusive advisory lock for a read-modify-publish of the index.
+
+    The encoder and the key rotation job both read rows, write images and
+    publish new rows; the lock (a .lock file next to the index) keeps one
+    from publishing over rows the other changed in between. Readers do not
+    take it.
+
+    Args:
+        index_file: Path to the SQLite database
+    """
+    os.makedirs(os.path.dirname(index_file) or ".", exist_ok=True)
+    with open(index_file + ".lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _rel_paths(value: str, base_dir: str) -> str:
+    """Store (comma-separated) paths relative to base_dir when they live under it."""
+    def rel(path: str) -> str:
+        if not path or not os.path.isabs(path):
+            return path
+        relative = os.path.relpath(path, base_dir)
+        return path if relative.startswith("..") else relative
+    return ",".join(rel(p) for p in value.split(",")) if value else value
+
+
+def _abs_paths(value: str, base_dir: str) -> str:
+    """Resolve (comma-separated) index paths against base_dir."""
+    return ",".join(os.path.join(base_dir, p) for p in value.split(",")) if value else value
+
+
+def _row_to_record(row: MappingRow, base_dir: str) -> tuple:
+    values = row._asdict()
+    for field in _INDEX_PATH_FIELDS:
+        values[field] = _rel_paths(values[field], base_dir)
+    return (os.path.splitext(row.article)[0],) + tuple(values[f] for f in _INDEX_FIELDS)
+
+
+def _record_to_row(record: tuple, base_dir: str) -> MappingRow:
+    row = MappingRow(*record)
+    return row._replace(**{f: _abs_paths(getattr(row, f), base_dir)
+                           for f in _INDEX_PATH_FIELDS})
+
+
+_INDEX_COLUMNS = ", ".join(_INDEX_FIELDS)
+_INDEX_INSERT = (f"INSERT OR REPLACE INTO articles (id, {_INDEX_COLUMNS}) "
+                 f"VALUES ({', '.join('?' * (len(_INDEX_FIELDS) + 1))})")
+
+
+def write_index(index_file: str, rows: List[MappingRow], base_dir: str) -> None:
+    """
+    Replace the full set of rows in one transaction.
+
+    Args:
+        index_file: Path to the SQLite database
+        rows: Mapping rows to publish
+        base_dir: Project root that image paths are stored relative to
+    """
+    with contextlib.closing(open_index(index_file)) as conn:
+        with conn:
+            conn.execute("DELETE FROM articles")
+            conn.executemany(_INDEX_INSERT, (_row_to_record(r, base_dir) for r in rows))
+
+
+def publish_index(index_file: str, changed: List[MappingRow], articles: List[str],
+                  base_dir: str) -> int:
+    """
+    Upsert changed rows and delete rows of removed articles in one transaction.
+
+    Rows of unchanged articles are left as they are, so a publish costs
+    O(changed) writes rather than a rewrite of the whole table.
+
+    Args:
+        index_file: Path to the SQLite database
+        changed: New or re-encoded mapping rows
+        articles: Every article (file name) the published index should hold
+        base_dir: Project root that image paths are stored relative to
+
+    Returns:
+        Number of rows deleted
+    """
+    keep = {os.path.splitext(a)[0] for a in articles}
+    with contextlib.closing(open_index(index_file)) as conn:
+        with conn:
+            removed = [(i,) for (i,) in conn.execute("SELECT id FROM articles") if i not in keep]
+            conn.executemany("DELETE FROM articles WHERE id = ?", removed)
+            conn.executemany(_INDEX_INSERT, (_row_to_record(r, base_dir) for r in changed))
+    return len(removed)
+
+
+def update_index_row(index_file: str, row: MappingRow, base_dir: str) -> None:
+    """
+    Insert or replace a single row (e.g. after a key rotation).
+
+    Args:
+        index_file: Path to the SQLite database
+        row: Mapping row
+        base_dir: Project root that image paths are stored relative to
+    """
+    with contextlib.closing(open_index(index_file)) as conn:
+        with conn:
+            conn.execute(_INDEX_INSERT, _row_to_record(row, base_dir))
+
+
+def read_index(index_file: str, base_dir: str) -> Dict[str, MappingRow]:
+    """
+    Read every row of the index.
+
+    Args:
+        index_file: Path to the SQLite database
+        base_dir: Project root that image paths are stored relative to
+
+    Returns:
+        Dict mapping article name to its row; empty if the index is missing
+    """
+    if not os.path.exists(index_file):
+        return {}
+    with contextlib.closing(open_index(index_file, readonly=True)) as conn:
+        return {row.article: row for row in (
+            _record_to_row(rec, base_dir)
+            for rec in conn.execute(f"SELECT {_INDEX_COLUMNS} FROM articles ORDER BY id")
+        )}
+
+
+def lookup_index(conn: sqlite3.Connection, article_id: str, base_dir: str) -> Optional[MappingRow]:
+    """
+    Point lookup by article id (file name without extension).
+
+    Args:
+        conn: Index connection
+        article_id: Article id
+        base_dir: Project root that image paths are stored relative to
+
+    Returns:
+        Mapping row, or None if unknown
+    """
+    rec = conn.execute(f"SELECT {_INDEX_COLUMNS} FROM articles WHERE id = ?",
+                       (article_id,)).fetchone()
+    return _record_to_row(rec, base_dir) if rec else None
+
+
+def scan_index_ids(conn: sqlite3.Connection, after: str = "", limit: int = 100) -> List[str]:
+    """
+    Ordered range scan of article ids.
+
+    Args:
+        conn: Index connection
+        after: Return ids strictly greater than this (for pagination)
+        limit: Maximum number of ids
+
+    Returns:
+        Article ids in ascending order
+    """
+    return [r[0] for r in conn.execute(
+        "SELECT id FROM articles WHERE id > ? ORDER BY id LIMIT ?", (after, limit)
+    )]
+
+
+def _rebase_path(path: str, base_dir: str) -> str:
+    """Map an absolute path from another machine onto base_dir (by its encryption/ suffix)."""
+    if not path or os.path.exists(path):
+        return path
+    parts = path.replace("\\", "/").split("/")
+    if "encryption" in parts:
+        candidate = os.path.join(base_dir, *parts[parts.index("encryption"):])
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+
+def import_key_mapping(key_info_file: str, index_file: str, base_dir: str) -> int:
+    """
+    Load a TSV key mapping into the index (replacing its rows).
+
+    Absolute paths from another checkout are rebased onto base_dir when
+    the file exists there.
+
+    Args:
+        key_info_file: Path to TSV mapping
+        index_file: Path to the SQLite database
+        base_dir: Project root
+
+    Returns:
+        Number of rows imported
+    """
+    rows = []
+    for row in read_key_mapping(key_info_file).values():
+        row = row._replace(**{
+            f: ",".join(_rebase_path(p, base_dir) for p in getattr(row, f).split(","))
+            for f in _INDEX_PATH_FIELDS if getattr(row, f)
+        })
+        if not (row.width and row.height) and os.path.exists(row.img_path):
+            with Image.open(row.img_path) as img:
+                row = row._replace(width=img.size[0], height=img.size[1])
+        rows.append(row)
+    write_index(index_file, sorted(rows), base_dir)
+    return len(rows)
+
+
+def export_key_mapping(index_file: str, key_info_file: str, base_dir: str) -> int:
+    """
+    Write the index as a TSV key mapping (absolute paths).
+
+    Args:
+        index_file: Path to the SQLite database
+        key_info_file: Path to TSV mapping
+        base_dir: Project root
+
+    Returns:
+        Number of rows exported
+    """
+    rows = read_index(index_file, base_dir)
+    write_key_mapping(key_info_file, list(rows.values()))
+    return len(rows)
+
+
+def load_mapping_rows(index_file: str, key_info_file: str, base_dir: str) -> Dict[str, MappingRow]:
+    """
+    Current mapping rows: from the index, or from a legacy TSV mapping if
+    no index has been written yet.
+
+    Args:
+        index_file: Path to the SQLite database
+        key_info_file: Path to TSV mapping
+        base_dir: Project root
+
+    Returns:
+        Dict mapping article name to its row
+    """
+    if os.path.exists(index_file):
+        return read_index(index_file, base_dir)
+    return read_key_mapping(key_info_file)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Article key derivation shared by the encoder, the key rotation job and app.py.
+
+Kept apart from encoder.py so the web app can derive keys without loading
+the image pipeline.
+"""
+
+import base64
+import os
+import struct
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+AES_BIT_LENGTH = 128  # AES key length (128 or 256)
+
+# Derived-key mode: every article key is HKDF-SHA256(master key, info), with
+# info = KDF_INFO_PREFIX || u32 key version || UTF-8 article id. The server
+# recomputes keys on demand, so the mapping needs no per-article key column.
+# Bumping the key version rotates every article key without a new master key.
+KDF_INFO_PREFIX = b"escape-llm-claw/article-key\x00"
+MASTER_KEY_LEN = 32
+
+
+def derive_article_key(master_key: bytes, article_id: str, key_version: int = 1,
+                       bit_length: int = 128) -> bytes:
+    """
+    Derive the AES key of one article from the master key.
+
+    Args:
+        master_key: Master secret (see load_master_key)
+        article_id: Article id (file name without extension)
+        key_version: Key version (>= 1)
+        bit_length: AES key length in bits (128 or 256)
+
+    Returns:
+        AES key bytes
+    """
+    if key_version < 1:
+        raise ValueError(f"key_version must be >= 1, got {key_version}")
+    info = KDF_INFO_PREFIX + struct.pack(">I", key_version) + article_id.encode("utf-8")
+    return HKDF(algorithm=hashes.SHA256(), length=bit_length // 8, salt=None,
+                info=info).derive(master_key)
+
+
+def master_key_id(master_key: bytes) -> str:
+    """
+    Non-secret fingerprint of a master key, recorded in the manifest.
+
+    Args:
+        master_key: Master secret
+
+    Returns:
+        16 hex characters
+    """
+    return HKDF(algorithm=hashes.SHA256(), length=8, salt=None,
+                info=b"escape-llm-claw/master-key-id").derive(master_key).hex()
+
+
+def load_master_key(master_key_file: str, create: bool = False) -> bytes:
+    """
+    Read the Base64 master key file, optionally creating it.
+
+    Args:
+        master_key_file: Path to master key file
+        create: Generate a random key (mode 0600) if the file does not exist
+
+    Returns:
+        Master key bytes
+
+    Raises:
+        FileNotFoundError: If the file is missing and create is False
+        ValueError: If the file does not hold a valid key
+    """
+    if create and not os.path.exists(master_key_file):
+        os.makedirs(os.path.dirname(master_key_file) or ".", exist_ok=True)
+        fd = os.open(master_key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(base64.b64encode(os.urandom(MASTER_KEY_LEN)).decode("utf-8") + "\n")
+        print(f"Created master key: {master_key_file}")
+
+    with open(master_key_file, "r", encoding="utf-8") as f:
+        master_key = base64.b64decode(f.read().strip(), validate=True)
+    if len(master_key) < 16:
+        raise ValueError(f"Master key in {master_key_file} is too short ({len(master_key)} bytes)")
+    return master_key
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-stage timing of the encoder and the --metrics records built from it.
+
+Encoder stages (read, compress, encrypt, carrier_decode, png_write, ...)
+are wrapped in timed_stage, which costs nothing unless a collect_stages
+block is recording the current article.
+"""
+
+import contextlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+# -------------------------- Stage Timing --------------------------
+
+# Stage timings of the article being encoded in this process, or None when
+# instrumentation is off (see collect_stages)
+_stage_timings: Optional[Dict[str, Dict[str, float]]] = None
+
+
+@contextlib.contextmanager
+def timed_stage(name: str, bytes_in: int = 0):
+    """
+    Time a block as one encoder stage of the current article.
+
+    Stages are disjoint; repeated blocks of the same stage accumulate.
+    Nothing is recorded unless instrumentation is on.
+
+    Args:
+        name: Stage name
+        bytes_in: Bytes consumed by the block
+
+    Yields:
+        Dict in which the block may set "bytes_out"
+    """
+    out = {"bytes_out": 0}
+    if _stage_timings is None:
+        yield out
+        return
+    t0 = time.perf_counter()
+    try:
+        yield out
+    finally:
+        stage = _stage_timings.setdefault(
+            name, {"seconds": 0.0, "calls": 0, "bytes_in": 0, "bytes_out": 0}
+        )
+        stage["seconds"] += time.perf_counter() - t0
+        stage["calls"] += 1
+        stage["bytes_in"] += bytes_in
+        stage["bytes_out"] += out["bytes_out"]
+
+
+@contextlib.contextmanager
+def collect_stages(enabled: bool = True):
+    """
+    Record the stages timed while the block runs (one article, or one shared atlas write).
+
+    Args:
+        enabled: When False, nothing is recorded and None is yielded
+
+    Yields:
+        Dict of stage name -> seconds, calls, bytes_in, bytes_out; complete
+        once the block exits
+    """
+    global _stage_timings
+    if not enabled:
+        yield None
+        return
+    stages: Dict[str, Dict[str, float]] = {}
+    _stage_timings = stages
+    try:
+        yield stages
+    finally:
+        _stage_timings = None
+
+
+# -------------------------- Metrics Records --------------------------
+
+def metrics_record(article_path: str, seconds: float,
+                   stages: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """Metrics record of an article that has produced no image output yet."""
+    return {
+        "article": os.path.basename(article_path),
+        "seconds": seconds,
+        "bytes_in": os.path.getsize(article_path),
+        "bytes_out": 0,
+        "payload_bytes": 0,
+        "utilization": 0.0,
+        "stages": stages,
+    }
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def summarize_metrics(records: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """
+    Aggregate per-article metrics records of one batch.
+
+    Args:
+        records: Records from encode_article_with_metrics
+        wall_seconds: Wall time of the whole batch
+
+    Returns:
+        Summary: article count, throughput over the wall time, p50/p95 of
+        article seconds and utilization, and per stage the total, p50 and
+        p95 seconds per article and MB/s of stage input
+    """
+    stages: Dict[str, Dict[str, Any]] = {}
+    for name in sorted({name for r in records for name in r["stages"]}):
+        timings = [r["stages"][name] for r in records if name in r["stages"]]
+        seconds = [t["seconds"] for t in timings]
+        total = sum(seconds)
+        stages[name] = {
+            "articles": len(timings),
+            "total_s": total,
+            "p50_s": _percentile(seconds, 50),
+            "p95_s": _percentile(seconds, 95),
+            "mb_per_s": sum(t["bytes_in"] for t in timings) / 1e6 / total if total > 0 else None,
+        }
+
+    article_seconds = [r["seconds"] for r in records]
+    utilization = [r["utilization"] for r in records if r["payload_bytes"]]
+    bytes_in = sum(r["bytes_in"] for r in records)
+    bytes_out = sum(r["bytes_out"] for r in records)
+    return {
+        "articles": len(records),
+        "wall_seconds": wall_seconds,
+        "articles_per_s": len(records) / wall_seconds if wall_seconds > 0 else None,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "mb_in_per_s": bytes_in / 1e6 / wall_seconds if wall_seconds > 0 else None,
+        "mb_out_per_s": bytes_out / 1e6 / wall_seconds if wall_seconds > 0 else None,
+        "article_p50_s": _percentile(article_seconds, 50),
+        "article_p95_s": _percentile(article_seconds, 95),
+        "utilization_p50": _percentile(utilization, 50),
+        "utilization_p95": _percentile(utilization, 95),
+        "stages": stages,
+    }
+
+
+def write_metrics(metrics_file: str, records: List[Dict[str, Any]],
+                  summary: Dict[str, Any]) -> None:
+    """
+    Append one batch's metrics to a JSON lines file.
+
+    Each article becomes a {"type": "article", ...} line, followed by one
+    {"type": "summary", ...} line, so successive runs can be compared.
+
+    Args:
+        metrics_file: Path to JSON lines file
+        records: Per-article records
+        summary: Output of summarize_metrics
+    """
+    os.makedirs(os.path.dirname(metrics_file) or ".", exist_ok=True)
+    created = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(metrics_file, "a", encoding="utf-8") as f:
+        for record in sorted(records, key=lambda r: r["article"]):
+            f.write(json.dumps({"type": "article", "created": created, **record}) + "\n")
+        f.write(json.dumps({"type": "summary", "created": created, **summary}) + "\n")
+
+
+def print_metrics_summary(summary: Dict[str, Any]) -> None:
+    """Print a metrics summary as a table."""
+    def rate(value: Optional[float]) -> str:
+        return f"{value:.1f}" if value is not None else "-"
+
+    print(f"Metrics: {summary['articles']} article(s) in {summary['wall_seconds']:.3f}s, "
+          f"{rate(summary['mb_in_per_s'])} MB/s in, {rate(summary['mb_out_per_s'])} MB/s out, "
+          f"utilization p50 {summary['utilization_p50']:.1%} / p95 {summary['utilization_p95']:.1%}")
+    print(f"{'stage':<16} {'total_s':>9} {'p50_s':>9} {'p95_s':>9} {'MB/s':>9}")
+    for name, stage in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["total_s"]):
+        print(f"{name:<16} {stage['total_s']:>9.4f} {stage['p50_s']:>9.4f} "
+              f"{stage['p95_s']:>9.4f} {rate(stage['mb_per_s']):>9}")
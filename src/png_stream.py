@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming PNG codec of the encoder: strip-wise carrier decoding and
+progressive PNG writing, so memory use does not grow with image height.
+
+Only plain 8-bit, non-interlaced PNGs are decoded strip by strip; other
+images are decoded whole by Pillow and then sliced.
+"""
+
+import io
+import os
+import struct
+import zlib
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from src.metrics import timed_stage
+
+
+# -------------------------- Strip Decoding --------------------------
+
+# Rows decoded, embedded and written at a time by the streaming encoder.
+# Peak memory is a few dozen times STRIP_ROWS * width * 3 bytes (filtering
+# keeps every candidate filter of a strip), plus the payload itself.
+STRIP_ROWS = 32
+IDAT_CHUNK_SIZE = 1 << 16
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}  # Samples per pixel by PNG color type
+
+
+def open_image(source: Union[str, bytes]) -> Image.Image:
+    """Open an image from a path or from encoded image bytes."""
+    return Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+
+
+def _png_chunk(ctype: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(ctype + data))
+
+
+def _png_chunks(f) -> Iterator[Tuple[bytes, bytes]]:
+    """Yield (type, data) for each chunk of a PNG file positioned after its signature."""
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        length, ctype = struct.unpack(">I4s", head)
+        data = f.read(length)
+        f.read(4)  # CRC
+        yield ctype, data
+        if ctype == b"IEND":
+            return
+
+
+def _decode_png_strip(width: int, color: int, aux: List[bytes], prev: bytes,
+                      filtered: bytes) -> Tuple[np.ndarray, bytes]:
+    """
+    Unfilter and decode a run of filtered scanlines with Pillow.
+
+    The scanlines are wrapped in a small standalone PNG. The previous raw
+    row (if any) is prepended unfiltered, so Up/Average/Paeth filters of
+    the first row resolve exactly as in the full image.
+
+    Returns:
+        Tuple of (RGB rows, raw bytes of the last row)
+    """
+    rows = len(filtered) // (width * PNG_CHANNELS[color] + 1) + (1 if prev else 0)
+    body = (b"\x00" + prev if prev else b"") + filtered
+    png = (PNG_SIGNATURE
+           + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, rows, 8, color, 0, 0, 0))
+           + b"".join(aux)
+           + _png_chunk(b"IDAT", zlib.compress(body, 0))
+           + _png_chunk(b"IEND", b""))
+    with Image.open(io.BytesIO(png)) as img:
+        last = np.asarray(img)[-1].tobytes()
+        pixels = np.array(img.convert("RGB"), dtype=np.uint8)
+    return pixels[1:] if prev else pixels, last
+
+
+def iter_carrier_strips(input_png: Union[str, bytes],
+                        strip_rows: int = STRIP_ROWS) -> Iterator[np.ndarray]:
+    """
+    Decode a carrier image strip by strip.
+
+    Non-interlaced 8-bit PNGs (the usual carrier) are inflated
+    incrementally, so only one strip of rows is in memory at a time, and a
+    caller that stops iterating early never decodes the remaining rows.
+    Other images are decoded whole and then sliced.
+
+    Args:
+        input_png: Path to carrier image, or encoded image bytes
+        strip_rows: Rows per strip
+
+    Yields:
+        uint8 arrays of shape (rows, w, 3), top to bottom; callers must not
+        write to them
+
+    Raises:
+        FileNotFoundError: If carrier image doesn't exist
+    """
+    in_memory = isinstance(input_png, (bytes, bytearray))
+    source = "in-memory image" if in_memory else input_png
+    if not in_memory and not os.path.exists(input_png):
+        raise FileNotFoundError(f"Carrier image not found: {input_png}")
+
+    with (io.BytesIO(input_png) if in_memory else open(input_png, "rb")) as f:
+        chunks = _png_chunks(f) if f.read(8) == PNG_SIGNATURE else iter(())
+        ctype, ihdr = next(chunks, (b"", b""))
+        fields = struct.unpack(">IIBBBBB", ihdr) if ctype == b"IHDR" else None
+        if fields is None or fields[2] != 8 or fields[6] != 0 or fields[3] not in PNG_CHANNELS:
+            # Not a plain 8-bit PNG: no strip-wise decode, fall back to a full one
+            size = len(input_png) if in_memory else os.path.getsize(input_png)
+            with timed_stage("carrier_decode", size), open_image(input_png) as img:
+                pixels = np.array(img.convert("RGB"), dtype=np.uint8)
+            for y in range(0, pixels.shape[0], strip_rows):
+                yield pixels[y:y + strip_rows]
+            return
+
+        width, height, _, color, _, _, _ = fields
+        stride = width * PNG_CHANNELS[color] + 1  # Filter byte + samples
+        aux: List[bytes] = []  # PLTE / tRNS, needed to decode each strip
+        inflater = zlib.decompressobj()
+        pending = bytearray()
+        prev = b""
+        y = 0
+        for ctype, data in chunks:
+            if ctype in (b"PLTE", b"tRNS"):
+                aux.append(_png_chunk(ctype, data))
+                continue
+            if ctype != b"IDAT":
+                continue
+            while data and y < height:
+                need = min(strip_rows, height - y) * stride
+                pending += inflater.decompress(data, need)
+                data = inflater.unconsumed_tail
+                while y < height and len(pending) >= min(strip_rows, height - y) * stride:
+                    need = min(strip_rows, height - y) * stride
+                    with timed_stage("carrier_decode", need):
+                        pixels, prev = _decode_png_strip(width, color, aux, prev,
+                                                         bytes(pending[:need]))
+                    del pending[:need]
+                    y += pixels.shape[0]
+                    yield pixels
+
+        if y < height:
+            raise ValueError(f"Truncated PNG: {source} ({y} of {height} rows)")
+
+
+# -------------------------- Strip Writing --------------------------
+
+def _filter_rows(raw: np.ndarray, prev: np.ndarray, bpp: int) -> np.ndarray:
+    """
+    PNG-filter rows, choosing per row the filter with the smallest sum of
+    absolute (signed) residuals, the usual adaptive heuristic.
+
+    Args:
+        raw: uint8 array of shape (rows, stride)
+        prev: Raw row above the first one (zeros at the top of the image)
+        bpp: Bytes per pixel
+
+    Returns:
+        uint8 array of shape (rows, stride + 1), filter type byte first
+    """
+    x = raw.astype(np.int16)
+    b = np.vstack([prev[None], raw[:-1]]).astype(np.int16)
+    a = np.zeros_like(x)
+    a[:, bpp:] = x[:, :-bpp]
+    c = np.zeros_like(x)
+    c[:, bpp:] = b[:, :-bpp]
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+    # None, Sub, Up, Average, Paeth; residuals wrap modulo 256
+    candidates = np.stack([x, x - a, x - b, x - ((a + b) >> 1), x - paeth]).astype(np.uint8)
+    scores = np.abs(candidates.view(np.int8).astype(np.int16)).sum(axis=2)
+    best = scores.argmin(axis=0)
+
+    out = np.empty((raw.shape[0], raw.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = best
+    out[:, 1:] = candidates[best, np.arange(raw.shape[0])]
+    return out
+
+
+class PngStripWriter:
+    """
+    Write an RGB PNG progressively, one strip of rows at a time.
+
+    Rows are filtered and deflated as they arrive and IDAT chunks are
+    flushed to the file every IDAT_CHUNK_SIZE bytes, so memory use does not
+    depend on the image height. The zlib options are named as Pillow's PNG
+    save options, so a write profile (see encoder.PNG_PROFILES) applies as is.
+    """
+
+    def __init__(self, path: str, width: int, height: int, compress_level: int = -1,
+                 compress_type: int = zlib.Z_DEFAULT_STRATEGY):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._deflate = zlib.compressobj(compress_level, zlib.DEFLATED, zlib.MAX_WBITS, 8,
+                                         compress_type)
+        self._prev = np.zeros(width * 3, dtype=np.uint8)
+        self._buf = bytearray()
+        self._f = open(path, "wb")
+        self._f.write(PNG_SIGNATURE)
+        self._f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+
+    def write(self, strip: np.ndarray) -> None:
+        """Append rows (uint8 array of shape (rows, width, 3))."""
+        if strip.shape[1:] != (self.width, 3) or self.rows_written + strip.shape[0] > self.height:
+            raise ValueError(f"Strip of shape {strip.shape} does not fit a "
+                             f"{self.width}x{self.height} image at row {self.rows_written}")
+        raw = strip.reshape(strip.shape[0], -1)
+        self._buf += self._deflate.compress(_filter_rows(raw, self._prev, 3).tobytes())
+        self._prev = raw[-1].copy()
+        self.rows_written += strip.shape[0]
+        while len(self._buf) >= IDAT_CHUNK_SIZE:
+            self._f.write(_png_chunk(b"IDAT", bytes(self._buf[:IDAT_CHUNK_SIZE])))
+            del self._buf[:IDAT_CHUNK_SIZE]
+
+    def close(self) -> None:
+        """Finish the zlib stream and write the trailing chunks."""
+        if self.rows_written != self.height:
+            self._f.close()
+            raise ValueError(f"Only {self.rows_written} of {self.height} rows written")
+        self._buf += self._deflate.flush()
+        self._f.write(_png_chunk(b"IDAT", bytes(self._buf)))
+        self._f.write(_png_chunk(b"IEND", b""))
+        self._f.close()
+
+    def __enter__(self) -> "PngStripWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
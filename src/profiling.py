@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profiling hooks for the encoder and article parser CLIs (--profile).
+
+A profiled run writes two files to the profile directory:
+
+    <name>-<timestamp>.prof          cProfile dump (load with pstats or snakeviz)
+    <name>-<timestamp>.profile.txt   Text report
+
+The report starts with the run metadata (command line, Python, platform),
+so results can be compared across machines. It then lists the top
+functions by cumulative and own time, and a section per hot function with
+its calls, time and peak traced memory. It ends with the top allocation
+sites overall and at each hot function's largest call.
+
+Hot functions are wrapped in their module for the duration of the run, so
+calls from inside the module are measured too. Only the calling process
+is profiled; pool workers are not.
+"""
+
+import contextlib
+import cProfile
+import functools
+import importlib
+import io
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from types import ModuleType
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+TOP_N = 25
+TRACEBACK_FRAMES = 25
+
+# tracemalloc's own and the import system's allocations are noise
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+class HotFunction:
+    """Call count, peak traced memory and largest-call snapshot of one wrapped function."""
+
+    def __init__(self, name: str, func: Callable):
+        self.name = name
+        self.func = func
+        self.calls = 0
+        self.peak_bytes = 0  # Largest traced-memory increase during one call
+        self.snapshot: Optional[tracemalloc.Snapshot] = None  # At the end of that call
+
+
+class _PeakTracker:
+    """
+    Per-call peak memory for nested hot functions.
+
+    tracemalloc keeps a single peak, so each call resets it on entry and
+    hands its own peak up to the enclosing call on exit.
+    """
+
+    def __init__(self):
+        self._stack: List[List[int]] = []  # [traced at entry, max peak seen so far]
+        self.max_peak = 0  # Peak of the whole run, across resets
+
+    def enter(self) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        self.max_peak = max(self.max_peak, peak)
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        self._stack.append([current, 0])
+        tracemalloc.reset_peak()
+
+    def peek(self) -> int:
+        """Peak increase of the innermost call so far."""
+        start, seen = self._stack[-1]
+        return max(tracemalloc.get_traced_memory()[1], seen) - start
+
+    def exit(self) -> int:
+        """Return the call's peak increase over its entry."""
+        start, seen = self._stack.pop()
+        peak = max(tracemalloc.get_traced_memory()[1], seen)
+        self.max_peak = max(self.max_peak, peak)
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        return peak - start
+
+
+def _wrap(hot: HotFunction, tracker: _PeakTracker) -> Callable:
+    @functools.wraps(hot.func)
+    def wrapper(*args, **kwargs):
+        hot.calls += 1
+        tracker.enter()
+        try:
+            result = hot.func(*args, **kwargs)
+            # Snapshot the largest call before returning, while its locals are
+            # still alive. Filtering is slow under cProfile and is left to the report.
+            if hot.snapshot is None or tracker.peek() > hot.peak_bytes:
+                hot.snapshot = tracemalloc.take_snapshot()
+            return result
+        finally:
+            hot.peak_bytes = max(hot.peak_bytes, tracker.exit())
+    return wrapper
+
+
+def _cprofile_entry(stats: pstats.Stats, func: Callable) -> Optional[tuple]:
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return None
+    return stats.stats.get((code.co_filename, code.co_firstlineno, code.co_name))
+
+
+def _write_top_allocations(f, snapshot: tracemalloc.Snapshot, top_n: int) -> None:
+    for stat in snapshot.filter_traces(_SNAPSHOT_FILTERS).statistics("lineno")[:top_n]:
+        frame = stat.traceback[0]
+        f.write(f"  {stat.size / 1e6:>10.3f} MB {stat.count:>9} blocks  "
+                f"{frame.filename}:{frame.lineno}\n")
+
+
+def write_profile_report(f, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot,
+                         peak_bytes: int, hot: List[HotFunction], wall_seconds: float,
+                         top_n: int = TOP_N) -> None:
+    """
+    Write the text report of a profiled run.
+
+    Args:
+        f: Text stream
+        profiler: Finished profiler
+        snapshot: tracemalloc snapshot taken at the end of the run
+        peak_bytes: Peak traced memory of the run
+        hot: Hot function records
+        wall_seconds: Wall time of the run
+        top_n: Entries per ranking
+    """
+    f.write("== Run ==\n")
+    f.write(f"command:  {' '.join(sys.argv)}\n")
+    f.write(f"created:  {time.strftime('%Y-%m-%dT%H:%M:%S')}\n")
+    f.write(f"python:   {platform.python_version()} ({platform.python_implementation()})\n")
+    f.write(f"platform: {platform.platform()} {platform.machine()}, {os.cpu_count()} CPU(s)\n")
+    f.write(f"wall:     {wall_seconds:.3f}s\n")
+    f.write(f"peak traced memory: {peak_bytes / 1e6:.3f} MB\n\n")
+
+    for sort_key in ("cumulative", "tottime"):
+        f.write(f"== cProfile: top {top_n} by {sort_key} ==\n")
+        pstats.Stats(profiler, stream=f).strip_dirs().sort_stats(sort_key).print_stats(top_n)
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    f.write("== Hot functions ==\n")
+    f.write(f"{'function':<28} {'calls':>8} {'tottime_s':>10} {'cumtime_s':>10} "
+            f"{'per_call_s':>11} {'peak_MB':>10}\n")
+    for h in hot:
+        entry = _cprofile_entry(stats, h.func)
+        tottime, cumtime = (entry[2], entry[3]) if entry else (0.0, 0.0)
+        per_call = cumtime / h.calls if h.calls else 0.0
+        f.write(f"{h.name:<28} {h.calls:>8} {tottime:>10.4f} {cumtime:>10.4f} "
+                f"{per_call:>11.6f} {h.peak_bytes / 1e6:>10.3f}\n")
+    f.write("\n")
+
+    f.write(f"== tracemalloc: top {top_n} live allocation sites at end of run ==\n")
+    _write_top_allocations(f, snapshot, top_n)
+    f.write("\n")
+    for h in hot:
+        if h.snapshot is None:
+            continue
+        f.write(f"== tracemalloc: top {top_n} allocation sites at the largest "
+                f"{h.name} call ==\n")
+        _write_top_allocations(f, h.snapshot, top_n)
+        f.write("\n")
+
+
+@contextlib.contextmanager
+def profile_run(output_dir: str, name: str, module: Optional[ModuleType] = None,
+                hot_functions: Sequence[str] = (), top_n: int = TOP_N):
+    """
+    Profile a block with cProfile and tracemalloc and write the results.
+
+    Args:
+        output_dir: Directory for the .prof dump and the text report
+        name: File name prefix (e.g. "encoder")
+        module: Module whose hot functions are wrapped
+        hot_functions: Names of module-level functions to report on; a
+            dotted name ("src.verify.verify_rows") refers to a function of
+            that module instead
+        top_n: Entries per ranking in the report
+
+    Yields:
+        None
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    prof_path = os.path.join(output_dir, f"{name}-{stamp}.prof")
+    report_path = os.path.join(output_dir, f"{name}-{stamp}.profile.txt")
+
+    tracker = _PeakTracker()
+    hot: List[HotFunction] = []
+    originals: List[Tuple[ModuleType, str, Any]] = []
+    for qualname in hot_functions:
+        mod_name, _, fn_name = qualname.rpartition(".")
+        owner = importlib.import_module(mod_name) if mod_name else module
+        h = HotFunction(qualname, getattr(owner, fn_name))
+        hot.append(h)
+        originals.append((owner, fn_name, h.func))
+        setattr(owner, fn_name, _wrap(h, tracker))
+
+    profiler = cProfile.Profile()
+    tracemalloc.start(TRACEBACK_FRAMES)
+    t0 = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall_seconds = time.perf_counter() - t0
+        for owner, fn_name, func in originals:
+            setattr(owner, fn_name, func)
+        peak_bytes = max(tracemalloc.get_traced_memory()[1], tracker.max_peak)
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        profiler.dump_stats(prof_path)
+        with open(report_path, "w", encoding="utf-8") as f:
+            write_profile_report(f, profiler, snapshot, peak_bytes, hot, wall_seconds, top_n)
+        print(f"Profile written: {prof_path}")
+        print(f"Profile report: {report_path}")
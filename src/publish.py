@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Publishing of encoder output: the content-hash manifest behind
+--incremental, and the generation directories that let a run replace the
+published images without readers ever seeing a partial set.
+
+Shared by the encoder and the key rotation job.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.index import MappingRow, atomic_open
+
+if TYPE_CHECKING:
+    from src.encoder import EncodeOptions
+
+
+# -------------------------- Incremental Manifest --------------------------
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the hex SHA-256 digest of a file.
+
+    Args:
+        path: File path
+        chunk_size: Read size in bytes
+
+    Returns:
+        Hex digest string
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_articles(article_dir: str, txt_files: List[str],
+                  cache: Dict[str, Tuple[Tuple[int, int], str]]) -> Dict[str, str]:
+    """
+    SHA-256 of each article, re-hashing only files whose mtime or size changed.
+
+    Args:
+        article_dir: Directory containing articles
+        txt_files: Article file names
+        cache: Dict mapping file name to ((mtime_ns, size), sha256); updated in place
+
+    Returns:
+        Dict mapping file name to SHA-256
+    """
+    hashes = {}
+    for name in txt_files:
+        path = os.path.join(article_dir, name)
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_size)
+        cached = cache.get(name)
+        if cached is None or cached[0] != sig:
+            cached = cache[name] = (sig, sha256_file(path))
+        hashes[name] = cached[1]
+    for name in set(cache) - set(txt_files):
+        del cache[name]
+    return hashes
+
+
+def read_manifest(manifest_file: str) -> Dict[str, Any]:
+    """
+    Read the content-hash manifest of the last encoder run.
+
+    Manifest structure:
+        {"carrier_sha256": str, "options": {...}, "key_id": str | None,
+         "articles": {article_name: {"sha256": str}}}
+
+    Args:
+        manifest_file: Path to manifest JSON
+
+    Returns:
+        Manifest dict; an empty manifest if the file is missing or unreadable
+    """
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"carrier_sha256": None, "options": None, "key_id": None, "articles": {}}
+    manifest.setdefault("carrier_sha256", None)
+    manifest.setdefault("options", None)
+    manifest.setdefault("key_id", None)
+    manifest.setdefault("articles", {})
+    return manifest
+
+
+def write_manifest(manifest_file: str, carrier_sha256: str, options: "EncodeOptions",
+                   article_hashes: Dict[str, str], key_id: Optional[str] = None) -> None:
+    """
+    Write the content-hash manifest for the articles in the key mapping.
+
+    Args:
+        manifest_file: Path to manifest JSON
+        carrier_sha256: SHA-256 of the carrier image
+        options: Encoding options used for the articles
+        article_hashes: Dict mapping article name to SHA-256 of its file
+        key_id: Master key fingerprint (derived-key mode only)
+    """
+    with atomic_open(manifest_file) as f:
+        json.dump(
+            {
+                "carrier_sha256": carrier_sha256,
+                "options": options._asdict(),
+                "key_id": key_id,
+                "articles": {name: {"sha256": h} for name, h in sorted(article_hashes.items())},
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+
+
+def row_image_paths(row: MappingRow) -> List[str]:
+    """
+    All image files a mapping row refers to (PNG and WebP, every tile).
+
+    Args:
+        row: Mapping row
+
+    Returns:
+        List of paths
+    """
+    pngs = row.tiles.split(",") if row.tiles else [row.img_path]
+    paths = list(pngs)
+    if row.webp_path:
+        paths += [os.path.splitext(p)[0] + ".webp" for p in pngs]
+    return paths
+
+
+def plan_incremental(txt_files: List[str], article_hashes: Dict[str, str], carrier_sha256: str,
+                     options: "EncodeOptions", manifest: Dict[str, Any],
+                     previous_rows: Dict[str, MappingRow], key_id: Optional[str] = None
+                     ) -> Tuple[List[str], List[MappingRow]]:
+    """
+    Split articles into those that must be re-encoded and those that can be kept.
+
+    An article is kept only if the carrier, encoding options and master key are unchanged,
+    its hash matches the manifest, it has a mapping row, and its encoded
+    images still exist.
+
+    Args:
+        txt_files: Current article file names
+        article_hashes: Dict mapping article name to current SHA-256
+        carrier_sha256: Current SHA-256 of the carrier image
+        options: Current encoding options
+        manifest: Manifest from the previous run
+        previous_rows: Mapping rows from the previous run
+        key_id: Current master key fingerprint (derived-key mode only)
+
+    Returns:
+        Tuple of (article names to encode, mapping rows to keep)
+    """
+    if (manifest.get("carrier_sha256") != carrier_sha256
+            or manifest.get("options") != options._asdict()
+            or manifest.get("key_id") != key_id):
+        return list(txt_files), []
+
+    to_encode, kept = [], []
+    for txt_file in txt_files:
+        entry = manifest["articles"].get(txt_file)
+        row = previous_rows.get(txt_file)
+        if (entry and entry.get("sha256") == article_hashes[txt_file]
+                and row is not None and all(os.path.exists(p) for p in row_image_paths(row))):
+            kept.append(row)
+        else:
+            to_encode.append(txt_file)
+    return to_encode, kept
+
+
+# -------------------------- Atomic Publish --------------------------
+
+# Each encoder run writes its images into a fresh generation directory under
+# the output directory. Nothing references the directory until the index
+# transaction commits, so readers switch from the complete old set to the
+# complete new set in one step. Unchanged articles keep pointing into the
+# generation they were encoded in. Older generations are kept for a while
+# so requests that read the previous index still find their images.
+GENERATION_PREFIX = "gen-"
+
+
+def fsync_paths(paths: List[str]) -> int:
+    """
+    Flush the given files, then the directories that hold them.
+
+    Args:
+        paths: Files written in this run
+
+    Returns:
+        Number of files flushed
+    """
+    for path in list(paths) + sorted({os.path.dirname(p) for p in paths}):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return len(paths)
+
+
+def new_generation_dir(output_dir: str) -> str:
+    """
+    Create an empty, uniquely named generation directory.
+
+    Names sort chronologically.
+
+    Args:
+        output_dir: Encoded images directory
+
+    Returns:
+        Path to the new directory
+    """
+    name = f"{GENERATION_PREFIX}{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}"
+    path = os.path.join(output_dir, name)
+    os.makedirs(path)
+    return path
+
+
+def prune_generations(output_dir: str, rows: List[MappingRow], keep: int = 2) -> List[str]:
+    """
+    Delete old generation directories.
+
+    The newest `keep` generations survive, as does any generation still
+    referenced by the current mapping.
+
+    Args:
+        output_dir: Encoded images directory
+        rows: Rows of the published mapping
+        keep: Number of newest generations to keep
+
+    Returns:
+        Removed directories
+    """
+    referenced = {os.path.abspath(os.path.dirname(p)) for row in rows
+                  for p in row_image_paths(row)}
+    generations = sorted(
+        name for name in os.listdir(output_dir)
+        if name.startswith(GENERATION_PREFIX) and os.path.isdir(os.path.join(output_dir, name))
+    )
+    removed = []
+    for name in generations[:max(len(generations) - keep, 0)]:
+        path = os.path.join(output_dir, name)
+        if os.path.abspath(path) not in referenced:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Key rotation job for encoded articles.
+
+Re-encrypts articles one at a time, oldest key first, under a throughput
+and CPU budget so it can run on the serving host. A key's age is the
+modification time of the article's encoded image, which is rewritten
+whenever its key changes.
+
+Each pass writes the rotated images into a new encoder generation (see
+publish.new_generation_dir). An article's index row is replaced in one
+transaction once its new images are on disk; the old images stay in their
+generation until prune_generations removes it, so a request always sees a
+matching key and image. Articles packed into a shared atlas move to an
+image of their own. Every article is re-read and published under the
+index lock (see index.index_lock), so a concurrent encoder run is never
+overwritten.
+
+A pass rotates every key older than its cutoff. The cutoff is saved in a
+state file, so an interrupted pass resumes where it stopped: articles
+already rotated are newer than the cutoff.
+
+Usage:
+    python -m src.rotate_keys --rate 2 --cpu-share 0.25
+    python -m src.rotate_keys --max-age 604800 --interval 3600
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.encoder import (
+    ARTICLE_DIR,
+    BASE_DIR,
+    INDEX_FILE,
+    INPUT_PNG,
+    KEY_INFO_FILE,
+    MANIFEST_FILE,
+    MASTER_KEY_FILE,
+    OUTPUT_PNG_DIR,
+    EncodeOptions,
+    encode_article,
+    load_carrier,
+)
+from src.index import (
+    MappingRow,
+    atomic_open,
+    import_key_mapping,
+    index_lock,
+    load_mapping_rows,
+    lookup_index,
+    open_index,
+    update_index_row,
+)
+from src.keys import load_master_key
+from src.publish import (
+    fsync_paths,
+    new_generation_dir,
+    prune_generations,
+    read_manifest,
+    row_image_paths,
+    sha256_file,
+)
+
+STATE_FILE = os.path.join(os.path.dirname(INDEX_FILE), "rotation.json")
+
+
+# -------------------------- Planning --------------------------
+
+def key_timestamp(row: MappingRow) -> float:
+    """
+    Time the article's current key was created (mtime of its first image).
+
+    Args:
+        row: Mapping row
+
+    Returns:
+        Unix timestamp; 0.0 if the image is missing (rotated first)
+    """
+    try:
+        return os.path.getmtime(row.img_path)
+    except OSError:
+        return 0.0
+
+
+def plan_rotation(rows: Dict[str, MappingRow], cutoff: float) -> List[MappingRow]:
+    """
+    Select the articles whose key predates the cutoff, oldest key first.
+
+    Args:
+        rows: Current mapping rows
+        cutoff: Unix timestamp; keys created before it are rotated
+
+    Returns:
+        Mapping rows in rotation order
+    """
+    aged = [(key_timestamp(row), row.article, row) for row in rows.values()]
+    return [row for ts, _, row in sorted(aged) if ts < cutoff]
+
+
+def read_state(state_file: str) -> Optional[Dict[str, float]]:
+    """Read the saved pass state, or None if no pass is in progress."""
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(state_file: str, state: Dict[str, float]) -> None:
+    """Atomically save the pass state."""
+    with atomic_open(state_file) as f:
+        json.dump(state, f)
+
+
+# -------------------------- Throttling --------------------------
+
+class Throttle:
+    """
+    Budget for the rotation loop.
+
+    rate caps articles per second. cpu_share caps the fraction of one core
+    used: after a step that consumed c CPU-seconds, the loop idles for
+    c * (1 / cpu_share - 1) seconds.
+    """
+
+    def __init__(self, rate: float = 0.0, cpu_share: float = 1.0):
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.cpu_share = cpu_share
+        self._next_start = 0.0
+        self._started = 0.0
+        self._cpu0 = 0.0
+
+    def wait(self) -> None:
+        """Block until the next step may start."""
+        delay = self._next_start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._started = time.monotonic()
+        self._cpu0 = time.process_time()
+
+    def done(self) -> None:
+        """Record the end of a step and schedule the next start."""
+        cpu = time.process_time() - self._cpu0
+        idle = cpu * (1.0 / self.cpu_share - 1.0) if self.cpu_share < 1.0 else 0.0
+        self._next_start = max(self._started + self.min_interval, time.monotonic() + idle)
+
+
+# -------------------------- Rotation --------------------------
+
+def rotation_options(row: MappingRow, base: EncodeOptions) -> EncodeOptions:
+    """
+    Encoding options that reproduce an article's current layout with a new key.
+
+    Derived-key articles move to the next key version; random-key articles
+    get a fresh random key. Atlas articles are re-encoded into an image of
+    their own, since the shared atlas also holds other articles.
+
+    Args:
+        row: Current mapping row
+        base: Options of the last encoder run
+
+    Returns:
+        Options for re-encoding the article
+    """
+    return base._replace(
+        lsb_bits=row.lsb_bits,
+        webp=bool(row.webp_path),
+        tile_size=row.width if row.tiles else 0,
+        key_version=row.key_version + 1 if row.key_version else 0,
+        atlas=False,
+    )
+
+
+def rotate_article(row: MappingRow, base: EncodeOptions, article_dir: str, output_dir: str,
+                   input_png: str, carrier: np.ndarray,
+                   master_key: Optional[bytes], index_file: str) -> Optional[MappingRow]:
+    """
+    Re-encrypt one article under a new key and publish it.
+
+    Args:
+        row: Mapping row the pass was planned from
+        base: Options of the last encoder run (see rotation_options)
+        article_dir: Directory containing articles
+        output_dir: Generation directory of this pass
+        input_png: Path to carrier image
+        carrier: Pre-decoded carrier pixels
+        master_key: Master key (derived-key articles only)
+        index_file: Path to the article index
+
+    Returns:
+        New mapping row, or None if the article is gone, empty or was
+        re-encoded since the pass was planned
+    """
+    article_path = os.path.join(article_dir, row.article)
+    if not os.path.exists(article_path):
+        return None
+
+    stem = os.path.splitext(row.article)[0]
+    with index_lock(index_file):
+        if os.path.exists(index_file):
+            with contextlib.closing(open_index(index_file)) as conn:
+                if lookup_index(conn, stem, BASE_DIR) != row:
+                    return None  # Published again since planning; its key is fresh
+        new_row = encode_article(article_path, os.path.join(output_dir, f"{stem}.png"),
+                                 input_png, rotation_options(row, base),
+                                 carrier=carrier, master_key=master_key)
+        if new_row is None:
+            return None
+        new_row = new_row._replace(content_sha256=sha256_file(article_path))
+        fsync_paths(row_image_paths(new_row))
+        update_index_row(index_file, new_row, BASE_DIR)
+    return new_row
+
+
+def run_pass(cutoff: float, throttle: Throttle, article_dir: str = ARTICLE_DIR,
+             input_png: str = INPUT_PNG,
+             index_file: str = INDEX_FILE, state_file: str = STATE_FILE,
+             limit: int = 0, keep_generations: int = 2,
+             key_info_file: str = KEY_INFO_FILE) -> int:
+    """
+    Rotate every key older than the cutoff, oldest first.
+
+    A tree that only has a TSV key mapping is imported into the index
+    first, since rotated rows are published to the index one at a time and
+    readers switch to the index as soon as it exists. The pass state is
+    kept if any article failed, so the next run retries it.
+
+    Args:
+        cutoff: Unix timestamp; keys created before it are rotated
+        throttle: Rotation budget
+        article_dir: Directory containing articles
+        input_png: Path to carrier image
+        index_file: Path to the article index
+        state_file: Path to pass state file
+        limit: Stop after this many articles (0 = no limit)
+        keep_generations: Encoded image generations to keep (see prune_generations)
+        key_info_file: Path to the TSV key mapping (used if no index exists yet)
+
+    Returns:
+        Number of articles rotated
+    """
+    with index_lock(index_file):
+        if not os.path.exists(index_file) and os.path.exists(key_info_file):
+            n = import_key_mapping(key_info_file, index_file, BASE_DIR)
+            print(f"Imported {n} row(s) from {key_info_file} into {index_file}")
+    rows = load_mapping_rows(index_file, key_info_file, BASE_DIR)
+    todo = plan_rotation(rows, cutoff)
+    if limit:
+        todo = todo[:limit]
+    print(f"Rotation pass: {len(todo)} of {len(rows)} key(s) older than "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cutoff))}")
+    if not todo:
+        return 0
+
+    write_state(state_file, {"cutoff": cutoff})
+    manifest_options = read_manifest(MANIFEST_FILE).get("options") or {}
+    base = EncodeOptions(**{k: v for k, v in manifest_options.items()
+                            if k in EncodeOptions._fields})
+    master_key = (load_master_key(MASTER_KEY_FILE)
+                  if any(row.key_version for row in todo) else None)
+    carrier = load_carrier(input_png)
+    output_dir = new_generation_dir(OUTPUT_PNG_DIR)
+
+    rotated = failed = 0
+    for row in todo:
+        throttle.wait()
+        try:
+            age_h = (time.time() - key_timestamp(row)) / 3600
+            new_row = rotate_article(row, base, article_dir, output_dir, input_png,
+                                     carrier, master_key, index_file)
+            if new_row is None:
+                print(f"Skipping missing, empty or re-encoded article: {row.article}")
+            else:
+                rotated += 1
+                print(f"Rotated: {row.article} (key age {age_h:.1f}h)")
+        except Exception as e:
+            failed += 1
+            print(f"Failed: {row.article} - {str(e)}")
+        finally:
+            throttle.done()
+
+    if failed:
+        print(f"Warning: {failed} key(s) older than the cutoff are still in use; "
+              f"pass state kept in {state_file} so the next run retries them")
+    elif len(todo) == len(plan_rotation(rows, cutoff)):
+        os.remove(state_file)  # Pass complete
+    with index_lock(index_file):
+        published = load_mapping_rows(index_file, key_info_file, BASE_DIR)
+        for path in prune_generations(OUTPUT_PNG_DIR, list(published.values()),
+                                      keep=keep_generations):
+            print(f"Removed old generation: {path}")
+    return rotated
+
+
+# -------------------------- Main Execution --------------------------
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Rotate article keys in the background, oldest key first"
+    )
+    ap.add_argument(
+        "--max-age",
+        type=float,
+        default=0,
+        help="Rotate keys older than this many seconds (default: 0 = every key older than the pass)"
+    )
+    ap.add_argument(
+        "--rate",
+        type=float,
+        default=1.0,
+        help="Maximum articles rotated per second (default: 1, 0 = unlimited)"
+    )
+    ap.add_argument(
+        "--cpu-share",
+        type=float,
+        default=0.5,
+        help="Maximum fraction of one CPU core to use, in (0, 1] (default: 0.5)"
+    )
+    ap.add_argument(
+        "--interval",
+        type=float,
+        default=0,
+        help="Run continuously, starting a new pass every this many seconds (default: 0 = one pass)"
+    )
+    ap.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        help="Rotate at most this many articles per pass (default: 0 = no limit)"
+    )
+    ap.add_argument(
+        "--keep-generations",
+        type=int,
+        default=2,
+        help="Encoded image generations kept for in-flight requests (default: 2, minimum: 1)"
+    )
+    ap.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore an interrupted pass and start a new one"
+    )
+    args = ap.parse_args()
+    if not 0 < args.cpu_share <= 1:
+        ap.error("--cpu-share must be in (0, 1]")
+    if args.keep_generations < 1:
+        ap.error("--keep-generations must be >= 1")
+
+    throttle = Throttle(rate=args.rate, cpu_share=args.cpu_share)
+    while True:
+        state = None if args.restart else read_state(STATE_FILE)
+        if state:
+            cutoff = state["cutoff"]
+            print("Resuming interrupted rotation pass")
+        else:
+            cutoff = time.time() - args.max_age
+        args.restart = False
+
+        rotated = run_pass(cutoff, throttle, limit=args.limit,
+                           keep_generations=args.keep_generations)
+        print(f"Rotation pass complete: {rotated} article(s) rotated")
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Post-encode verification (--verify): decode every published image the way
+a reader would and check it against the article it came from.
+
+Builds on the encoder's extraction functions; encoder.py imports this
+module only when verification runs.
+"""
+
+import base64
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from src.encoder import (
+    decrypt_payload,
+    extract_and_decrypt,
+    extract_and_decrypt_tiles,
+    extract_payload_from_pixels,
+)
+from src.index import MappingRow
+from src.keys import AES_BIT_LENGTH, derive_article_key
+from src.png_stream import open_image
+
+
+class VerifyResult(NamedTuple):
+    """Outcome of verifying one published article (see verify_row)."""
+    article: str
+    ok: bool
+    error: str  # Why verification failed; empty when ok
+    images: int  # Image files extracted (PNG and WebP variants, every tile)
+    seconds: float
+
+
+def _row_key(row: MappingRow, master_key: Optional[bytes]) -> bytes:
+    """AES key of a mapping row: stored, or derived from the master key."""
+    if not row.key_version:
+        return base64.b64decode(row.aes_key_b64)
+    if master_key is None:
+        raise ValueError("A master key is required for derived keys")
+    return derive_article_key(master_key, os.path.splitext(row.article)[0], row.key_version,
+                              AES_BIT_LENGTH)
+
+
+def verify_row(row: MappingRow, article_dir: str, master_key: Optional[bytes] = None,
+               decoded: Optional[Dict[str, np.ndarray]] = None) -> VerifyResult:
+    """
+    Check that an article's encoded images decode back to its source text.
+
+    Every served variant (PNG and WebP, every tile) is extracted and
+    decrypted the way a reader would, and the SHA-256 of the plaintext is
+    compared with that of the stripped article file. Only the image rows
+    holding the payload are decoded (see extract_payload_from_png), except
+    for atlases, which are decoded whole once into `decoded` and shared by
+    every article in them.
+
+    Args:
+        row: Published mapping row
+        article_dir: Directory containing articles
+        master_key: Master key (derived-key articles only)
+        decoded: Cache of fully decoded atlas images by path
+
+    Returns:
+        VerifyResult; errors are reported in it, never raised
+    """
+    t0 = time.perf_counter()
+    images = 0
+    where = row.article
+    try:
+        with open(os.path.join(article_dir, row.article), "rb") as af:
+            source = af.read()
+        if row.content_sha256 and hashlib.sha256(source).hexdigest() != row.content_sha256:
+            raise ValueError("article changed since it was encoded")
+        expected = hashlib.sha256(source.decode("utf-8").strip().encode("utf-8")).hexdigest()
+
+        key = _row_key(row, master_key)
+        pngs = row.tiles.split(",") if row.tiles else [row.img_path]
+        variants = [pngs]
+        if row.webp_path:
+            variants.append([os.path.splitext(p)[0] + ".webp" for p in pngs])
+        for paths in variants:
+            where = os.path.basename(paths[0])
+            if row.tiles:
+                text = extract_and_decrypt_tiles(key, paths)
+            elif row.atlas_offset >= 0 and decoded is not None:
+                if paths[0] not in decoded:
+                    with open_image(paths[0]) as img:
+                        decoded[paths[0]] = np.asarray(img.convert("RGB"), dtype=np.uint8)
+                text = decrypt_payload(extract_payload_from_pixels(
+                    decoded[paths[0]], row.payload_len, row.lsb_bits, row.atlas_offset), key)
+            else:
+                text = extract_and_decrypt(key, paths[0], row.payload_len, row.lsb_bits,
+                                           max(row.atlas_offset, 0))
+            images += len(paths)
+            if hashlib.sha256(text.encode("utf-8")).hexdigest() != expected:
+                raise ValueError("decoded text does not match the article")
+    except Exception as e:
+        return VerifyResult(row.article, False, f"{where}: {str(e) or type(e).__name__}",
+                            images, time.perf_counter() - t0)
+    return VerifyResult(row.article, True, "", images, time.perf_counter() - t0)
+
+
+def _verify_group(rows: List[MappingRow], article_dir: str,
+                  master_key: Optional[bytes]) -> List[VerifyResult]:
+    decoded: Dict[str, np.ndarray] = {}
+    return [verify_row(row, article_dir, master_key, decoded) for row in rows]
+
+
+def verify_rows(rows: List[MappingRow], article_dir: str, master_key: Optional[bytes] = None,
+                workers: int = 1) -> List[VerifyResult]:
+    """
+    Verify published articles, optionally across a process pool.
+
+    Articles sharing an atlas are verified together, so each atlas is
+    decoded once. Work is handed to workers in chunks, so the per-task
+    overhead stays small for thousands of short articles.
+
+    Args:
+        rows: Published mapping rows
+        article_dir: Directory containing articles
+        master_key: Master key (derived-key articles only)
+        workers: Number of worker processes (1 = run in this process)
+
+    Returns:
+        Results in row order
+    """
+    groups: Dict[str, List[MappingRow]] = {}
+    for row in rows:
+        groups.setdefault(row.img_path if row.atlas_offset >= 0 else row.article, []).append(row)
+
+    if workers <= 1 or len(groups) <= 1:
+        results = [_verify_group(group, article_dir, master_key) for group in groups.values()]
+    else:
+        chunksize = max(1, min(64, len(groups) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_verify_group, groups.values(), repeat(article_dir),
+                                    repeat(master_key), chunksize=chunksize))
+    by_article = {r.article: r for group in results for r in group}
+    return [by_article[row.article] for row in rows]
+
+
+def print_verify_report(results: List[VerifyResult], wall_seconds: float) -> None:
+    """Print one line per failed article and a pass/fail summary."""
+    failed = [r for r in results if not r.ok]
+    for r in failed:
+        print(f"FAIL: {r.article} - {r.error}")
+    rate = len(results) / wall_seconds if wall_seconds > 0 else 0.0
+    print(f"Verification: {len(results) - len(failed)} passed, {len(failed)} failed "
+          f"({sum(r.images for r in results)} image(s) extracted in {wall_seconds:.3f}s, "
+          f"{rate:.1f} articles/s)")
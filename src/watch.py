@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Watching the article directory for the encoder's --watch mode.
+
+inotify is used on Linux (through libc, no extra dependency); elsewhere,
+or if it is unavailable, the directory is polled.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+from typing import Dict, Optional, Tuple
+
+
+def article_snapshot(article_dir: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Cheap change signature of the article directory.
+
+    Args:
+        article_dir: Directory containing articles
+
+    Returns:
+        Dict mapping .txt file name to (mtime_ns, size)
+    """
+    snapshot = {}
+    with os.scandir(article_dir) as it:
+        for entry in it:
+            if entry.name.lower().endswith(".txt") and entry.is_file():
+                st = entry.stat()
+                snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+class InotifyWatcher:
+    """
+    Directory watcher on Linux inotify (via libc, no extra dependency).
+
+    wait() returns True once a file in the directory was written, created,
+    moved or deleted.
+    """
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(libc_name, use_errno=True) if libc_name else None
+        if libc is None or not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO
+                | self.IN_CREATE | self.IN_DELETE)
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block up to timeout seconds (None = forever); True if events arrived."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher comparing article_snapshot() every poll_interval seconds."""
+
+    def __init__(self, directory: str, poll_interval: float = 1.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._snapshot = article_snapshot(directory)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block up to timeout seconds (None = forever); True if the directory changed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            time.sleep(self.poll_interval if remaining is None
+                       else min(self.poll_interval, remaining))
+            snapshot = article_snapshot(self.directory)
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                return True
+
+    def close(self) -> None:
+        pass
+
+
+def watch_articles(article_dir: str, on_change, debounce: float = 1.0,
+                   poll_interval: float = 1.0, use_inotify: bool = True) -> None:
+    """
+    Call on_change() whenever the article directory changes, until interrupted.
+
+    Bursts of changes are coalesced: on_change runs once the directory has
+    been quiet for `debounce` seconds.
+
+    Args:
+        article_dir: Directory containing articles
+        on_change: Callback invoked after each debounced burst
+        debounce: Quiet period in seconds
+        poll_interval: Polling period when inotify is unavailable
+        use_inotify: Try inotify before falling back to polling
+    """
+    watcher = None
+    if use_inotify:
+        try:
+            watcher = InotifyWatcher(article_dir)
+            print(f"Watching {article_dir} (inotify, debounce {debounce}s)")
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); falling back to polling")
+    if watcher is None:
+        watcher = PollingWatcher(article_dir, poll_interval)
+        print(f"Watching {article_dir} (polling every {poll_interval}s, debounce {debounce}s)")
+
+    try:
+        while True:
+            watcher.wait()
+            while watcher.wait(debounce):
+                pass
+            try:
+                on_change()
+            except Exception as e:
+                print(f"Failed: re-encode after change - {str(e)}")
+    except KeyboardInterrupt:
+        print("\nWatch stopped")
+    finally:
+        watcher.close()
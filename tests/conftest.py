@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures: a small project tree with a carrier and a few articles.
+"""
+
+import os
+from typing import Dict, NamedTuple
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Stored without surrounding whitespace, which the encoder strips
+ARTICLES = {
+    "alpha.txt": "Alpha article." * 8,
+    "beta.txt": "Beta article, with a comma." * 5,
+    "gamma.txt": "春江潮水连海平，海上明月共潮生。" * 3,
+    "delta.txt": "Delta\nspans\nlines.",
+}
+
+
+class Site(NamedTuple):
+    """Paths of a project tree laid out like encryption/ and data/ in the repo."""
+    base_dir: str
+    article_dir: str
+    input_png: str
+    output_dir: str
+    index_file: str
+    key_info_file: str
+    manifest_file: str
+    master_key_file: str
+    articles: Dict[str, str]
+
+
+@pytest.fixture
+def site(tmp_path) -> Site:
+    base_dir = str(tmp_path)
+    article_dir = os.path.join(base_dir, "data", "articles")
+    key_dir = os.path.join(base_dir, "encryption", "key")
+    output_dir = os.path.join(base_dir, "encryption", "carrier", "encoded")
+    for path in (article_dir, key_dir, output_dir):
+        os.makedirs(path)
+    for name, text in ARTICLES.items():
+        with open(os.path.join(article_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    rng = np.random.default_rng(1)
+    input_png = os.path.join(base_dir, "encryption", "carrier", "base_image.png")
+    Image.fromarray(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8), "RGB").save(input_png)
+    return Site(base_dir, article_dir, input_png, output_dir,
+                os.path.join(key_dir, "index.sqlite3"), os.path.join(key_dir, "key_mapping.txt"),
+                os.path.join(key_dir, "manifest.json"), os.path.join(key_dir, "master.key"),
+                dict(ARTICLES))
+
+
+@pytest.fixture
+def encoder_site(site, monkeypatch) -> Site:
+    """The site, with the encoder CLI's project paths pointed at it."""
+    from src import encoder
+    for name, value in (("BASE_DIR", site.base_dir), ("ARTICLE_DIR", site.article_dir),
+                        ("INPUT_PNG", site.input_png), ("OUTPUT_PNG_DIR", site.output_dir),
+                        ("INDEX_FILE", site.index_file), ("KEY_INFO_FILE", site.key_info_file),
+                        ("MANIFEST_FILE", site.manifest_file),
+                        ("MASTER_KEY_FILE", site.master_key_file)):
+        monkeypatch.setattr(encoder, name, value)
+    return site
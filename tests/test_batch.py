@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for batch encoding across a process pool with a shared carrier.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import base64
+import os
+from multiprocessing import shared_memory
+
+import pytest
+
+from src import encoder
+from src.encoder import EncodeOptions, encode_batch, extract_and_decrypt
+
+
+def add_article(site, name: str, text: str) -> None:
+    with open(os.path.join(site.article_dir, name), "w", encoding="utf-8") as f:
+        f.write(text)
+    site.articles[name] = text.strip()
+
+
+@pytest.mark.parametrize("options", [EncodeOptions(), EncodeOptions(streaming=True)])
+def test_pool_matches_single_process(site, tmp_path, capsys, options):
+    add_article(site, "empty.txt", "  \n")
+    add_article(site, "huge.txt", "x" * 8000)  # More than the carrier holds
+    names = sorted(site.articles)
+
+    results = {}
+    for workers in (1, 3):
+        output_dir = str(tmp_path / f"workers-{workers}")
+        rows = encode_batch(names, site.article_dir, output_dir, site.input_png, options,
+                            workers=workers)
+        out = capsys.readouterr().out
+        assert "Skipping empty file: empty.txt" in out
+        assert "Failed: huge.txt - Data too large!" in out
+        results[workers] = rows
+
+    assert [r.article for r in results[3]] == [r.article for r in results[1]]
+    assert len(results[1]) == len(names) - 2
+    for single, pooled in zip(results[1], results[3]):
+        assert pooled._replace(img_path="", aes_key_b64="", image_sha256="") \
+            == single._replace(img_path="", aes_key_b64="", image_sha256="")
+        assert extract_and_decrypt(base64.b64decode(pooled.aes_key_b64), pooled.img_path) \
+            == site.articles[pooled.article]
+
+
+def test_shared_carrier_is_released(site, tmp_path, monkeypatch):
+    created = []
+
+    class RecordingSharedMemory(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(encoder.shared_memory, "SharedMemory", RecordingSharedMemory)
+    rows = encode_batch(sorted(site.articles), site.article_dir, str(tmp_path / "out"),
+                        site.input_png, workers=2)
+
+    assert len(rows) == len(site.articles)
+    assert len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created[0])
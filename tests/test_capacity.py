@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the capacity planner and --dry-run.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+from src import encoder
+from src.encoder import EncodeOptions, encode_batch, plan_article, plan_capacity, run_encoder
+
+CARRIER_WIDTH, CARRIER_HEIGHT = 160, 120  # See conftest
+
+
+def add_article(site, name: str, text: str) -> None:
+    with open(os.path.join(site.article_dir, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.mark.parametrize("options", [
+    EncodeOptions(),
+    EncodeOptions(fit="rows", compression="auto"),
+    EncodeOptions(fit="tile", lsb_bits=3),
+    EncodeOptions(tile_size=16, lsb_bits=2),
+])
+def test_plan_matches_encoded_output(site, tmp_path, options):
+    names = sorted(site.articles)
+    plans = {p.article: p for p in plan_capacity(names, site.article_dir, site.input_png, options)}
+    rows = encode_batch(names, site.article_dir, str(tmp_path / "out"), site.input_png, options)
+
+    assert sorted(plans) == names
+    for row in rows:
+        plan = plans[row.article]
+        assert plan.fits and 0 < plan.utilization <= 1
+        assert (plan.out_width, plan.out_height) == (row.width, row.height)
+        assert plan.tiles == (len(row.tiles.split(",")) if row.tiles else 1)
+        assert plan.payload_bytes == row.payload_len
+
+
+def test_oversized_article_gets_a_suggestion():
+    denser = plan_article("a.txt", 8000, CARRIER_WIDTH, CARRIER_HEIGHT, EncodeOptions())
+    assert not denser.fits and denser.suggestion == "use --lsb-bits 2"
+
+    tiled = plan_article("a.txt", 40000, CARRIER_WIDTH, CARRIER_HEIGHT,
+                         EncodeOptions(atlas=True))
+    assert not tiled.fits
+    assert tiled.suggestion.startswith("use --tile-size 120 (")
+    assert tiled.suggestion.endswith("without --atlas")
+
+    too_small = plan_article("a.txt", 10, CARRIER_WIDTH, CARRIER_HEIGHT,
+                             EncodeOptions(tile_size=4))
+    assert not too_small.fits and too_small.suggestion.startswith("use a tile size between")
+
+
+def test_run_aborts_before_encoding_when_an_article_does_not_fit(encoder_site, capsys):
+    add_article(encoder_site, "huge.txt", "x" * 8000)
+
+    with pytest.raises(ValueError, match="1 article"):
+        run_encoder(EncodeOptions())
+
+    assert "huge.txt" in capsys.readouterr().out
+    assert os.listdir(encoder_site.output_dir) == []
+    assert not os.path.exists(encoder_site.index_file)
+
+
+@pytest.mark.parametrize("huge, status", [(False, 0), (True, 1)])
+def test_dry_run_writes_nothing(encoder_site, monkeypatch, capsys, huge, status):
+    if huge:
+        add_article(encoder_site, "huge.txt", "x" * 8000)
+    monkeypatch.setattr(sys, "argv", ["encoder.py", "--dry-run", "--fit", "rows"])
+
+    with pytest.raises(SystemExit) as exc:
+        encoder.main()
+
+    assert exc.value.code == status
+    out = capsys.readouterr().out
+    assert all(name in out for name in encoder_site.articles)
+    assert ("TOO LARGE: use --lsb-bits 2" in out) == huge
+    assert os.listdir(encoder_site.output_dir) == []
+    assert not os.path.exists(encoder_site.index_file)
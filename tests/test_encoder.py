@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the encoder: streaming vs. in-memory embedding, payload round trips
+and in-memory encoding to bytes.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import io
+import os
+import struct
+
+import numpy as np
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from PIL import Image
+
+from src.encoder import (
+    CODEC_NONE,
+    CONTAINER_HEADER_LEN,
+    FIT_MODES,
+    LSB_BITS_CHOICES,
+    aes_gcm_encrypt,
+    embed_data_in_png,
+    embed_data_streaming,
+    encrypt_and_embed,
+    encrypt_and_embed_tiles,
+    encode_to_bytes,
+    extract_and_decrypt,
+    extract_and_decrypt_tiles,
+    extract_payload_from_png,
+)
+from src.png_stream import STRIP_ROWS
+
+# Odd sizes, so neither the default nor the test strip size divides the height
+CARRIER_WIDTH = 101
+CARRIER_HEIGHT = 67
+TEXT = "Mark Twain was born in Florida, Missouri. 春江潮水连海平，海上明月共潮生。\n" * 12
+
+
+@pytest.fixture
+def carrier_png(tmp_path) -> str:
+    """Noise carrier, so every low bit of the output depends on the embedding."""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (CARRIER_HEIGHT, CARRIER_WIDTH, 3), dtype=np.uint8)
+    path = str(tmp_path / "carrier.png")
+    Image.fromarray(pixels, "RGB").save(path)
+    return path
+
+
+def read_pixels(path: str) -> np.ndarray:
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+def read_pixels_of(data: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+# -------------------------- Streaming vs. In-Memory --------------------------
+
+@pytest.mark.parametrize("strip_rows", [7, STRIP_ROWS, CARRIER_HEIGHT + 5])
+@pytest.mark.parametrize("lsb_bits", LSB_BITS_CHOICES)
+@pytest.mark.parametrize("fit", FIT_MODES)
+def test_streaming_matches_in_memory(tmp_path, carrier_png, fit, lsb_bits, strip_rows):
+    assert CARRIER_HEIGHT % 7 and CARRIER_HEIGHT % STRIP_ROWS
+    payload = os.urandom(1500)
+    in_memory = str(tmp_path / "in_memory.png")
+    streamed = str(tmp_path / "streamed.png")
+
+    size = embed_data_in_png(carrier_png, in_memory, payload, fit=fit, lsb_bits=lsb_bits,
+                             header_len=CONTAINER_HEADER_LEN)
+    streamed_size = embed_data_streaming(carrier_png, streamed, payload, fit=fit,
+                                         lsb_bits=lsb_bits, header_len=CONTAINER_HEADER_LEN,
+                                         strip_rows=strip_rows)
+
+    assert streamed_size == size
+    np.testing.assert_array_equal(read_pixels(streamed), read_pixels(in_memory))
+
+
+def test_streaming_rejects_oversized_payload(tmp_path, carrier_png):
+    with pytest.raises(ValueError, match="Data too large"):
+        embed_data_streaming(carrier_png, str(tmp_path / "out.png"),
+                             os.urandom(CARRIER_WIDTH * CARRIER_HEIGHT))
+
+
+# -------------------------- Payload Round Trips --------------------------
+
+@pytest.mark.parametrize("lsb_bits", LSB_BITS_CHOICES)
+def test_legacy_round_trip(tmp_path, carrier_png, lsb_bits):
+    key = AESGCM.generate_key(bit_length=128)
+    nonce, ct = aes_gcm_encrypt(TEXT, key)
+    payload = nonce + struct.pack(">I", (CODEC_NONE << 24) | len(ct)) + ct
+    output_png = str(tmp_path / "legacy.png")
+    embed_data_in_png(carrier_png, output_png, payload, lsb_bits=lsb_bits)
+
+    assert extract_payload_from_png(output_png, len(payload), lsb_bits) == payload
+    assert extract_and_decrypt(key, output_png, len(payload), lsb_bits) == TEXT
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("compression", ["none", "auto"])
+@pytest.mark.parametrize("lsb_bits", LSB_BITS_CHOICES)
+@pytest.mark.parametrize("fit", FIT_MODES)
+def test_container_round_trip(tmp_path, carrier_png, fit, lsb_bits, compression, streaming):
+    key = AESGCM.generate_key(bit_length=128)
+    output_png = str(tmp_path / "container.png")
+    payload_len = encrypt_and_embed(TEXT, key, carrier_png, output_png, fit=fit,
+                                    compression=compression, lsb_bits=lsb_bits,
+                                    streaming=streaming)
+
+    # The container header carries length and density: no out-of-band values needed
+    assert len(extract_payload_from_png(output_png)) == payload_len
+    assert extract_and_decrypt(key, output_png) == TEXT
+    with open(output_png, "rb") as f:
+        assert extract_and_decrypt(key, f.read()) == TEXT
+
+
+def test_container_rejects_wrong_key(tmp_path, carrier_png):
+    output_png = str(tmp_path / "container.png")
+    encrypt_and_embed(TEXT, AESGCM.generate_key(bit_length=128), carrier_png, output_png)
+    with pytest.raises(Exception):
+        extract_and_decrypt(AESGCM.generate_key(bit_length=128), output_png)
+
+
+@pytest.mark.parametrize("lsb_bits", [1, 4])
+def test_tiled_round_trip(tmp_path, carrier_png, lsb_bits):
+    key = AESGCM.generate_key(bit_length=128)
+    tiles = encrypt_and_embed_tiles(TEXT * 4, key, carrier_png, str(tmp_path / "tiled.png"),
+                                    tile_size=32, lsb_bits=lsb_bits)
+    paths = [path for path, _ in tiles]
+
+    assert len(paths) > 1
+    assert all(read_pixels(p).shape == (32, 32, 3) for p in paths)
+    assert extract_and_decrypt_tiles(key, paths[::-1]) == TEXT * 4
+    with pytest.raises(ValueError):
+        extract_and_decrypt_tiles(key, paths[1:])
+
+
+# -------------------------- In-Memory Encoding --------------------------
+
+@pytest.mark.parametrize("carrier_kind", ["path", "bytes", "rgb", "rgba"])
+def test_in_memory_round_trip(tmp_path, carrier_png, monkeypatch, capsys, carrier_kind):
+    pixels = read_pixels(carrier_png)
+    with open(carrier_png, "rb") as f:
+        carrier = {
+            "path": carrier_png,
+            "bytes": f.read(),
+            "rgb": pixels,
+            "rgba": np.dstack([pixels, np.full(pixels.shape[:2], 255, dtype=np.uint8)]),
+        }[carrier_kind]
+    monkeypatch.chdir(tmp_path)
+    before = sorted(os.listdir(tmp_path))
+    key = AESGCM.generate_key(bit_length=128)
+
+    encoded = encode_to_bytes(TEXT, key, carrier, fit="rows", compression="auto", lsb_bits=2,
+                              webp=True)
+
+    assert sorted(os.listdir(tmp_path)) == before
+    assert capsys.readouterr().out == ""
+    assert encoded.mime_type == "image/png" and encoded.data.startswith(b"\x89PNG")
+    assert encoded.width == CARRIER_WIDTH and encoded.height < CARRIER_HEIGHT
+    assert read_pixels_of(encoded.data).shape == (encoded.height, encoded.width, 3)
+    for image in (encoded.data, encoded.webp):
+        assert extract_and_decrypt(key, image) == TEXT
+        assert len(extract_payload_from_png(image)) == encoded.payload_len
+    np.testing.assert_array_equal(read_pixels_of(encoded.webp), read_pixels_of(encoded.data))
+
+
+def test_file_output_matches_in_memory(tmp_path, carrier_png):
+    key = AESGCM.generate_key(bit_length=128)
+    output_png = str(tmp_path / "out.png")
+    payload_len = encrypt_and_embed(TEXT, key, carrier_png, output_png, fit="tile",
+                                    webp_output=str(tmp_path / "out.webp"))
+    encoded = encode_to_bytes(TEXT, key, carrier_png, fit="tile")
+
+    assert payload_len == encoded.payload_len
+    assert read_pixels(output_png).shape == read_pixels_of(encoded.data).shape
+    assert extract_and_decrypt(key, str(tmp_path / "out.webp")) == TEXT
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the article index: schema migration and publishing.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from src.index import (
+    INDEX_SCHEMA_VERSION,
+    MappingRow,
+    lookup_index,
+    open_index,
+    publish_index,
+    read_index,
+)
+
+# Schema version 1: the current table without atlas_offset
+V1_SCHEMA = """
+CREATE TABLE articles (
+    id TEXT PRIMARY KEY,
+    article TEXT NOT NULL,
+    img_path TEXT NOT NULL,
+    aes_key_b64 TEXT NOT NULL DEFAULT '',
+    payload_len INTEGER NOT NULL,
+    width INTEGER NOT NULL DEFAULT 0,
+    height INTEGER NOT NULL DEFAULT 0,
+    lsb_bits INTEGER NOT NULL DEFAULT 1,
+    webp_path TEXT NOT NULL DEFAULT '',
+    tiles TEXT NOT NULL DEFAULT '',
+    key_version INTEGER NOT NULL DEFAULT 0,
+    content_sha256 TEXT NOT NULL DEFAULT '',
+    image_sha256 TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID
+"""
+
+
+@pytest.fixture
+def v1_index(tmp_path) -> str:
+    path = str(tmp_path / "index.sqlite3")
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute(V1_SCHEMA)
+        conn.execute("INSERT INTO articles (id, article, img_path, payload_len, width, height) "
+                     "VALUES ('a', 'a.txt', 'encoded/gen-1/a.png', 120, 64, 48)")
+        conn.execute("PRAGMA user_version=1")
+        conn.commit()
+    return path
+
+
+def schema_version(index_file: str) -> int:
+    with closing(sqlite3.connect(index_file)) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+@pytest.mark.parametrize("readonly", [False, True])
+def test_v1_index_is_migrated(tmp_path, v1_index, readonly):
+    with closing(open_index(v1_index, readonly=readonly)) as conn:
+        row = lookup_index(conn, "a", str(tmp_path))
+
+    assert schema_version(v1_index) == INDEX_SCHEMA_VERSION == 2
+    assert row == MappingRow("a.txt", str(tmp_path / "encoded/gen-1/a.png"), "", 120, 64, 48,
+                             atlas_offset=-1)
+
+
+def test_migrated_index_accepts_current_rows(tmp_path, v1_index):
+    row = MappingRow("b.txt", str(tmp_path / "atlas.png"), "", 80, 64, 4, atlas_offset=960)
+    publish_index(v1_index, [row], ["a.txt", "b.txt"], str(tmp_path))
+
+    rows = read_index(v1_index, str(tmp_path))
+    assert rows["b.txt"] == row
+    assert rows["a.txt"].atlas_offset == -1
+
+
+def test_newer_index_is_rejected(tmp_path, v1_index):
+    with closing(sqlite3.connect(v1_index)) as conn:
+        conn.execute(f"PRAGMA user_version={INDEX_SCHEMA_VERSION + 1}")
+    with pytest.raises(ValueError, match="Unsupported index schema version"):
+        open_index(v1_index)
+
+
+def test_publish_upserts_and_deletes(tmp_path):
+    index_file = str(tmp_path / "index.sqlite3")
+    base_dir = str(tmp_path)
+    a, b = (MappingRow(f"{n}.txt", str(tmp_path / f"{n}.png"), "k", 10, 8, 8) for n in "ab")
+    publish_index(index_file, [a, b], ["a.txt", "b.txt"], base_dir)
+
+    c = MappingRow("c.txt", str(tmp_path / "c.png"), "k", 12, 8, 8)
+    removed = publish_index(index_file, [c], ["b.txt", "c.txt"], base_dir)
+
+    assert removed == 1
+    assert read_index(index_file, base_dir) == {"b.txt": b, "c.txt": c}
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for master-key derivation of article keys and their versions.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import stat
+import struct
+
+import pytest
+
+import app
+from src.encoder import EncodeOptions, article_key, reencode_options
+from src.index import MappingRow
+from src.keys import derive_article_key, load_master_key, master_key_id
+
+MASTER_KEY = bytes(range(32))
+
+
+def hkdf_sha256(ikm: bytes, info: bytes, length: int) -> bytes:
+    """RFC 5869 HKDF-SHA256 without salt, from the standard library."""
+    prk = hmac.new(b"\x00" * 32, ikm, hashlib.sha256).digest()
+    okm, block = b"", b""
+    for i in range(-(-length // 32)):
+        block = hmac.new(prk, block + info + bytes([i + 1]), hashlib.sha256).digest()
+        okm += block
+    return okm[:length]
+
+
+@pytest.mark.parametrize("bit_length", [128, 256])
+def test_derived_key_follows_documented_info_layout(bit_length):
+    info = b"escape-llm-claw/article-key\x00" + struct.pack(">I", 7) + "春江".encode("utf-8")
+    assert derive_article_key(MASTER_KEY, "春江", 7, bit_length) \
+        == hkdf_sha256(MASTER_KEY, info, bit_length // 8)
+
+
+def test_derived_keys_are_distinct_per_article_version_and_master():
+    keys = {
+        derive_article_key(MASTER_KEY, "alpha", 1),
+        derive_article_key(MASTER_KEY, "alpha", 2),
+        derive_article_key(MASTER_KEY, "beta", 1),
+        derive_article_key(MASTER_KEY[::-1], "alpha", 1),
+    }
+    assert len(keys) == 4
+    assert derive_article_key(MASTER_KEY, "alpha", 1) == derive_article_key(MASTER_KEY, "alpha")
+    with pytest.raises(ValueError, match="key_version must be >= 1"):
+        derive_article_key(MASTER_KEY, "alpha", 0)
+
+
+def test_master_key_id_is_a_stable_fingerprint():
+    assert master_key_id(MASTER_KEY) == master_key_id(bytes(MASTER_KEY))
+    assert len(master_key_id(MASTER_KEY)) == 16
+    assert master_key_id(MASTER_KEY) != master_key_id(MASTER_KEY[::-1])
+
+
+def test_master_key_file(tmp_path, capsys):
+    path = str(tmp_path / "key" / "master.key")
+    with pytest.raises(FileNotFoundError):
+        load_master_key(path)
+
+    created = load_master_key(path, create=True)
+    assert "Created master key" in capsys.readouterr().out
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert load_master_key(path, create=True) == load_master_key(path) == created
+    assert capsys.readouterr().out == ""
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(base64.b64encode(b"short").decode() + "\n")
+    with pytest.raises(ValueError, match="too short"):
+        load_master_key(path)
+
+
+def test_article_key_modes():
+    key, key_b64 = article_key("alpha.txt", EncodeOptions())
+    assert base64.b64decode(key_b64) == key and len(key) == 16
+
+    key, key_b64 = article_key("alpha.txt", EncodeOptions(key_version=3, aes_bit_length=256),
+                               MASTER_KEY)
+    assert key_b64 == "" and key == derive_article_key(MASTER_KEY, "alpha", 3, 256)
+    with pytest.raises(ValueError, match="master key is required"):
+        article_key("alpha.txt", EncodeOptions(key_version=1))
+
+
+@pytest.mark.parametrize("previous_version, requested, expected", [
+    (None, 2, 2),  # Never published: the requested version
+    (1, 1, 2),     # Re-encoded: the next version
+    (5, 2, 6),     # Rotated past the requested version
+    (1, 4, 4),     # Explicitly raised
+    (3, 0, 0),     # Random keys: unchanged
+])
+def test_reencode_moves_to_a_new_key_version(previous_version, requested, expected):
+    previous = {}
+    if previous_version is not None:
+        previous["a.txt"] = MappingRow("a.txt", "a.png", "", 10, 8, 8,
+                                       key_version=previous_version)
+    options = EncodeOptions(key_version=requested)
+    assert reencode_options("a.txt", options, previous).key_version == expected
+    assert reencode_options("a.txt", options, previous)._replace(key_version=0) \
+        == options._replace(key_version=0)
+
+
+def test_app_derives_the_same_key(site, monkeypatch):
+    load_master_key(site.master_key_file, create=True)
+    monkeypatch.setattr(app, "MASTER_KEY_FILE", site.master_key_file)
+    app.master_key.cache_clear()
+    try:
+        expected = derive_article_key(load_master_key(site.master_key_file), "alpha", 4)
+        assert base64.b64decode(app.article_key_b64(
+            {"id": "alpha", "key_version": 4, "aes_key_b64": ""})) == expected
+        assert app.article_key_b64({"id": "alpha", "key_version": 0, "aes_key_b64": "c3RvcmVk"}) \
+            == "c3RvcmVk"
+    finally:
+        app.master_key.cache_clear()
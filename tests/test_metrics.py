@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for encoder instrumentation: stage timing and --metrics records.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import json
+import os
+
+from src.encoder import encode_article_with_metrics
+from src.metrics import collect_stages, summarize_metrics, timed_stage, write_metrics
+
+
+def test_stages_are_recorded_only_while_collecting():
+    with timed_stage("read", 10) as st:
+        st["bytes_out"] = 5
+    with collect_stages(False) as stages:
+        assert stages is None
+        with timed_stage("read", 10):
+            pass
+
+    with collect_stages() as stages:
+        for _ in range(2):
+            with timed_stage("read", 10) as st:
+                st["bytes_out"] = 4
+    with timed_stage("read", 10):
+        pass
+
+    assert list(stages) == ["read"]
+    assert stages["read"]["calls"] == 2
+    assert (stages["read"]["bytes_in"], stages["read"]["bytes_out"]) == (20, 8)
+
+
+def test_article_metrics_and_summary(site, tmp_path):
+    records = []
+    for name in sorted(site.articles):
+        output_png = os.path.join(site.output_dir, os.path.splitext(name)[0] + ".png")
+        row, record = encode_article_with_metrics(os.path.join(site.article_dir, name),
+                                                  output_png, site.input_png)
+        assert record["bytes_out"] == os.path.getsize(output_png)
+        assert record["payload_bytes"] == row.payload_len
+        assert 0 < record["utilization"] <= 1
+        assert {"read", "encrypt", "png_write"} <= set(record["stages"])
+        records.append(record)
+
+    summary = summarize_metrics(records, 1.0)
+    assert summary["articles"] == len(site.articles)
+    assert summary["bytes_out"] == sum(r["bytes_out"] for r in records)
+    assert summary["stages"]["read"]["articles"] == len(site.articles)
+
+    metrics_file = str(tmp_path / "metrics.jsonl")
+    write_metrics(metrics_file, records, summary)
+    with open(metrics_file, "r", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["type"] for line in lines] == ["article"] * len(records) + ["summary"]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the streaming PNG codec: strip decoding and progressive writing.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import io
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.png_stream import PngStripWriter, iter_carrier_strips
+
+WIDTH = 45
+HEIGHT = 38
+
+
+def noise_image(mode: str) -> Image.Image:
+    rng = np.random.default_rng(2)
+    rgb = Image.fromarray(rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8), "RGB")
+    if mode == "P":
+        return rgb.quantize(64)
+    return rgb.convert(mode)
+
+
+@pytest.mark.parametrize("save_kwargs", [{}, {"interlace": 1}])
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L", "LA", "P"])
+@pytest.mark.parametrize("strip_rows", [1, 5, HEIGHT])
+def test_strips_match_full_decode(tmp_path, mode, save_kwargs, strip_rows):
+    path = str(tmp_path / "carrier.png")
+    noise_image(mode).save(path, **save_kwargs)
+    with Image.open(path) as img:
+        expected = np.asarray(img.convert("RGB"))
+    with open(path, "rb") as f:
+        data = f.read()
+
+    for source in (path, data):
+        strips = list(iter_carrier_strips(source, strip_rows))
+        assert all(s.shape[0] <= strip_rows for s in strips)
+        np.testing.assert_array_equal(np.concatenate(strips), expected)
+
+
+def test_truncated_png_is_rejected(tmp_path):
+    buf = io.BytesIO()
+    noise_image("RGB").save(buf, format="PNG", compress_level=0)
+    with pytest.raises(ValueError, match="Truncated PNG"):
+        list(iter_carrier_strips(buf.getvalue()[:len(buf.getvalue()) // 2], 4))
+
+
+@pytest.mark.parametrize("profile", [{}, {"compress_level": 1, "compress_type": zlib.Z_RLE}])
+def test_strip_writer_round_trip(tmp_path, profile):
+    pixels = np.asarray(noise_image("RGB"))
+    path = str(tmp_path / "out.png")
+    with PngStripWriter(path, WIDTH, HEIGHT, **profile) as writer:
+        for y in range(0, HEIGHT, 7):
+            writer.write(pixels[y:y + 7])
+
+    with Image.open(path) as img:
+        np.testing.assert_array_equal(np.asarray(img.convert("RGB")), pixels)
+
+
+def test_strip_writer_checks_shape(tmp_path):
+    with pytest.raises(ValueError, match="does not fit"):
+        with PngStripWriter(str(tmp_path / "out.png"), WIDTH, 2) as writer:
+            writer.write(np.zeros((3, WIDTH, 3), dtype=np.uint8))
+
+    writer = PngStripWriter(str(tmp_path / "out.png"), WIDTH, 2)
+    writer.write(np.zeros((1, WIDTH, 3), dtype=np.uint8))
+    with pytest.raises(ValueError, match="Only 1 of 2 rows"):
+        writer.close()
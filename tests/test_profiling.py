@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the --profile hooks.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import glob
+import os
+import pstats
+import re
+import sys
+import types
+
+from src import encoder, publish
+from src.profiling import profile_run
+
+
+def hot_calls(report: str, name: str) -> int:
+    match = re.search(rf"^{re.escape(name)}\s+(\d+)\s", report, re.MULTILINE)
+    assert match, f"{name} missing from the hot function table"
+    return int(match.group(1))
+
+
+def test_profile_run_writes_dump_and_report(tmp_path, capsys):
+    module = types.ModuleType("hot")
+
+    def work(n: int) -> bytes:
+        return bytes(n)
+
+    module.work = work
+    original_sha256_file = publish.sha256_file
+    data_file = str(tmp_path / "data.bin")
+    with open(data_file, "wb") as f:
+        f.write(b"data")
+
+    with profile_run(str(tmp_path / "profiles"), "unit", module,
+                     ["work", "src.publish.sha256_file"]):
+        module.work(1 << 20)
+        module.work(10)
+        publish.sha256_file(data_file)
+
+    assert module.work is work and publish.sha256_file is original_sha256_file
+    [prof] = glob.glob(str(tmp_path / "profiles" / "unit-*.prof"))
+    [report_path] = glob.glob(str(tmp_path / "profiles" / "unit-*.profile.txt"))
+    assert f"Profile written: {prof}" in capsys.readouterr().out
+    assert pstats.Stats(prof).total_calls > 0
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = f.read()
+    for section in ("== Run ==", "== cProfile: top 25 by cumulative ==", "== Hot functions ==",
+                    "== tracemalloc: top 25 allocation sites at the largest work call =="):
+        assert section in report
+    assert hot_calls(report, "work") == 2
+    assert hot_calls(report, "src.publish.sha256_file") == 1
+
+
+def test_encoder_profile_flag(encoder_site, monkeypatch, tmp_path, capsys):
+    profile_dir = str(tmp_path / "profiles")
+    monkeypatch.setattr(sys, "argv", ["encoder.py", "--profile", profile_dir, "--verify"])
+    original_encode_article = encoder.encode_article
+
+    encoder.main()
+
+    [report_path] = glob.glob(os.path.join(profile_dir, "encoder-*.profile.txt"))
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = f.read()
+    assert hot_calls(report, "run_encoder") == 1
+    assert hot_calls(report, "encode_article") == len(encoder_site.articles)
+    assert hot_calls(report, "src.verify.verify_rows") == 1
+    assert encoder.encode_article is original_encode_article
+    assert "4 passed, 0 failed" in capsys.readouterr().out
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for publishing encoder output: generations, pruning and the
+incremental manifest.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import os
+
+from src.encoder import EncodeOptions, run_encoder
+from src.index import MappingRow, read_index
+from src.publish import (
+    GENERATION_PREFIX,
+    fsync_paths,
+    new_generation_dir,
+    plan_incremental,
+    prune_generations,
+    read_manifest,
+    sha256_file,
+    write_manifest,
+)
+
+
+def generations(output_dir: str):
+    return sorted(n for n in os.listdir(output_dir) if n.startswith(GENERATION_PREFIX))
+
+
+def test_generation_dirs_sort_chronologically(tmp_path):
+    paths = [new_generation_dir(str(tmp_path)) for _ in range(3)]
+
+    assert [os.path.basename(p) for p in paths] == generations(str(tmp_path))
+    assert all(not os.listdir(p) for p in paths)
+    with open(os.path.join(paths[0], "a.png"), "wb") as f:
+        f.write(b"png")
+    assert fsync_paths([os.path.join(paths[0], "a.png")]) == 1
+
+
+def test_prune_keeps_newest_and_referenced(tmp_path):
+    output_dir = str(tmp_path)
+    paths = [new_generation_dir(output_dir) for _ in range(5)]
+    os.makedirs(os.path.join(output_dir, "manual"))
+    row = MappingRow("a.txt", os.path.join(paths[0], "a.png"), "k", 10, 8, 8)
+
+    removed = prune_generations(output_dir, [row], keep=2)
+
+    assert sorted(removed) == paths[1:3]
+    assert generations(output_dir) == [os.path.basename(p) for p in (paths[0], *paths[3:])]
+    assert os.path.isdir(os.path.join(output_dir, "manual"))
+
+
+def test_each_run_publishes_a_new_generation(encoder_site):
+    site = encoder_site
+    first = run_encoder(EncodeOptions(), keep_generations=2)
+    first_gen = os.path.dirname(first[0].img_path)
+    assert {os.path.dirname(r.img_path) for r in first} == {first_gen}
+    assert read_index(site.index_file, site.base_dir) == {r.article: r for r in first}
+
+    second = run_encoder(EncodeOptions(), keep_generations=2)
+    second_gen = os.path.dirname(second[0].img_path)
+    assert second_gen != first_gen
+    assert read_index(site.index_file, site.base_dir) == {r.article: r for r in second}
+    # The previous generation stays for readers of the old index
+    assert os.path.isdir(first_gen)
+
+    run_encoder(EncodeOptions(), keep_generations=2)
+    assert not os.path.exists(first_gen)
+    assert os.path.isdir(second_gen)
+
+
+# -------------------------- Incremental Manifest --------------------------
+
+def test_missing_or_corrupt_manifest_is_empty(tmp_path):
+    manifest_file = str(tmp_path / "manifest.json")
+    assert read_manifest(manifest_file)["articles"] == {}
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert read_manifest(manifest_file) == {"carrier_sha256": None, "options": None,
+                                            "key_id": None, "articles": {}}
+
+
+def test_plan_keeps_only_unchanged_articles(tmp_path):
+    names = ["a.txt", "b.txt", "c.txt"]
+    rows = {}
+    for name in names:
+        img_path = str(tmp_path / name.replace(".txt", ".png"))
+        with open(img_path, "wb") as f:
+            f.write(b"png")
+        rows[name] = MappingRow(name, img_path, "k", 10, 8, 8)
+    hashes = {name: f"hash-{name}" for name in names}
+    manifest_file = str(tmp_path / "manifest.json")
+    write_manifest(manifest_file, "carrier", EncodeOptions(), hashes, "key")
+    manifest = read_manifest(manifest_file)
+
+    def plan(**changes):
+        args = {"txt_files": names + ["new.txt"], "article_hashes": {**hashes, "new.txt": "n"},
+                "carrier_sha256": "carrier", "options": EncodeOptions(), "manifest": manifest,
+                "previous_rows": rows, "key_id": "key", **changes}
+        return plan_incremental(**args)
+
+    assert plan() == (["new.txt"], [rows[n] for n in names])
+
+    os.remove(rows["b.txt"].img_path)
+    changed = {**hashes, "c.txt": "edited", "new.txt": "n"}
+    assert plan(article_hashes=changed) == (["b.txt", "c.txt", "new.txt"], [rows["a.txt"]])
+
+    everything = names + ["new.txt"]
+    assert plan(carrier_sha256="other") == (everything, [])
+    assert plan(options=EncodeOptions(lsb_bits=2)) == (everything, [])
+    assert plan(key_id=None) == (everything, [])
+
+
+def test_incremental_run_reencodes_changed_articles_only(encoder_site, capsys):
+    site = encoder_site
+    first = {r.article: r for r in run_encoder(EncodeOptions(), incremental=True)}
+
+    capsys.readouterr()
+    again = {r.article: r for r in run_encoder(EncodeOptions(), incremental=True)}
+    assert "Incremental: 4 unchanged, 0 to encode" in capsys.readouterr().out
+    assert again == first
+
+    with open(os.path.join(site.article_dir, "beta.txt"), "w", encoding="utf-8") as f:
+        f.write("Beta, rewritten.")
+    os.remove(os.path.join(site.article_dir, "delta.txt"))
+    rows = {r.article: r for r in run_encoder(EncodeOptions(), incremental=True)}
+
+    assert "Incremental: 2 unchanged, 1 to encode" in capsys.readouterr().out
+    assert sorted(rows) == ["alpha.txt", "beta.txt", "gamma.txt"]
+    assert rows["alpha.txt"] == first["alpha.txt"] and rows["gamma.txt"] == first["gamma.txt"]
+    assert rows["beta.txt"].img_path != first["beta.txt"].img_path
+    assert rows["beta.txt"].content_sha256 == sha256_file(os.path.join(site.article_dir,
+                                                                       "beta.txt"))
+    assert read_index(site.index_file, site.base_dir) == rows
+    assert sorted(read_manifest(site.manifest_file)["articles"]) == sorted(rows)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the key rotation job.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import base64
+import json
+import os
+import time
+
+import pytest
+
+import app
+from src import rotate_keys
+from src.encoder import EncodeOptions, encode_article, extract_and_decrypt
+from src.index import read_index, update_index_row, write_key_mapping
+from src.keys import derive_article_key, load_master_key
+from src.rotate_keys import Throttle, rotate_article, run_pass
+
+
+def encode_site(site, options=EncodeOptions(), master_key=None):
+    """Encode every article into the encoded directory and publish a TSV mapping only."""
+    rows = [encode_article(os.path.join(site.article_dir, name),
+                           os.path.join(site.output_dir, os.path.splitext(name)[0] + ".png"),
+                           site.input_png, options, master_key=master_key)
+            for name in sorted(site.articles)]
+    write_key_mapping(site.key_info_file, rows)
+    past = time.time() - 3600  # Keys are an hour old
+    for row in rows:
+        os.utime(row.img_path, (past, past))
+    return rows
+
+
+@pytest.fixture
+def rotation(site, monkeypatch):
+    """Point the rotation job's project paths at the site."""
+    monkeypatch.setattr(rotate_keys, "BASE_DIR", site.base_dir)
+    monkeypatch.setattr(rotate_keys, "OUTPUT_PNG_DIR", site.output_dir)
+    monkeypatch.setattr(rotate_keys, "MANIFEST_FILE", site.manifest_file)
+    monkeypatch.setattr(rotate_keys, "MASTER_KEY_FILE", site.master_key_file)
+    state_file = os.path.join(site.base_dir, "rotation.json")
+
+    def rotate(**kwargs) -> int:
+        return run_pass(time.time(), Throttle(), site.article_dir, site.input_png,
+                        site.index_file, state_file, key_info_file=site.key_info_file, **kwargs)
+
+    rotate.state_file = state_file
+    return rotate
+
+
+def test_rotation_on_tsv_only_tree_keeps_every_article(site, rotation, monkeypatch):
+    old = encode_site(site)
+    assert not os.path.exists(site.index_file)
+
+    assert rotation(limit=1) == 1
+
+    rows = read_index(site.index_file, site.base_dir)
+    assert sorted(rows) == sorted(site.articles)
+    monkeypatch.setattr(app, "INDEX_FILE", site.index_file)
+    monkeypatch.setattr(app, "KEY_INFO_FILE", site.key_info_file)
+    assert app.list_article_ids() == sorted(os.path.splitext(a)[0] for a in site.articles)
+
+    rotated = [r for r in rows.values() if r not in old]
+    assert len(rotated) == 1
+    row = rotated[0]
+    assert extract_and_decrypt(base64.b64decode(row.aes_key_b64), row.img_path) \
+        == site.articles[row.article]
+    # The old image is left for generation pruning, not deleted
+    assert all(os.path.exists(r.img_path) for r in old)
+
+
+def test_full_pass_rotates_every_key_and_clears_state(site, rotation):
+    old = {r.article: r for r in encode_site(site)}
+
+    assert rotation() == len(site.articles)
+
+    assert not os.path.exists(rotation.state_file)
+    for name, row in read_index(site.index_file, site.base_dir).items():
+        assert row.aes_key_b64 != old[name].aes_key_b64
+        assert extract_and_decrypt(base64.b64decode(row.aes_key_b64), row.img_path) \
+            == site.articles[name]
+
+
+def test_failed_article_keeps_pass_state(site, rotation, monkeypatch):
+    encode_site(site)
+    real_encode = rotate_keys.encode_article
+
+    def failing_encode(article_path, *args, **kwargs):
+        if article_path.endswith("beta.txt"):
+            raise OSError("disk full")
+        return real_encode(article_path, *args, **kwargs)
+
+    monkeypatch.setattr(rotate_keys, "encode_article", failing_encode)
+    assert rotation() == len(site.articles) - 1
+    with open(rotation.state_file, "r", encoding="utf-8") as f:
+        cutoff = json.load(f)["cutoff"]
+
+    # The next run resumes the pass and retries the failed article
+    monkeypatch.setattr(rotate_keys, "encode_article", real_encode)
+    assert run_pass(cutoff, Throttle(), site.article_dir, site.input_png, site.index_file,
+                    rotation.state_file, key_info_file=site.key_info_file) == 1
+    assert not os.path.exists(rotation.state_file)
+
+
+def test_derived_key_moves_to_next_version(site, rotation):
+    master_key = load_master_key(site.master_key_file, create=True)
+    encode_site(site, EncodeOptions(key_version=3), master_key)
+
+    assert rotation(limit=1) == 1
+
+    versions = {r.article: r.key_version for r in read_index(site.index_file,
+                                                             site.base_dir).values()}
+    assert sorted(versions.values()) == [3, 3, 3, 4]
+    name = next(a for a, v in versions.items() if v == 4)
+    row = read_index(site.index_file, site.base_dir)[name]
+    key = derive_article_key(master_key, os.path.splitext(name)[0], 4)
+    assert row.aes_key_b64 == ""
+    assert extract_and_decrypt(key, row.img_path) == site.articles[name]
+
+
+def test_article_republished_since_planning_is_skipped(site, rotation):
+    planned = encode_site(site)[0]
+    rotation()  # Import and rotate everything
+    current = read_index(site.index_file, site.base_dir)[planned.article]
+    output_dir = os.path.join(site.output_dir, "gen-test")
+    os.makedirs(output_dir)
+
+    assert rotate_article(planned, EncodeOptions(), site.article_dir, output_dir,
+                          site.input_png, None, None, site.index_file) is None
+    assert read_index(site.index_file, site.base_dir)[planned.article] == current
+
+    update_index_row(site.index_file, planned, site.base_dir)
+    assert rotate_article(planned, EncodeOptions(), site.article_dir, output_dir,
+                          site.input_png, None, None, site.index_file) is not None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for post-encode verification.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.encoder import EncodeOptions, run_encoder, run_verification
+from src.keys import load_master_key
+from src.verify import verify_row, verify_rows
+
+OPTIONS = {
+    "default": EncodeOptions(),
+    "webp": EncodeOptions(webp=True, compression="auto"),
+    "tiles": EncodeOptions(tile_size=16, lsb_bits=2),
+    "atlas": EncodeOptions(atlas=True),
+    "streaming": EncodeOptions(streaming=True, fit="rows"),
+}
+
+
+def flip_low_bits(path: str) -> None:
+    with Image.open(path) as img:
+        pixels = np.array(img.convert("RGB"))
+    pixels[:2] ^= 1
+    Image.fromarray(pixels, "RGB").save(path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("mode", sorted(OPTIONS))
+def test_published_articles_pass(encoder_site, mode, workers):
+    rows = run_encoder(OPTIONS[mode])
+
+    results = verify_rows(rows, encoder_site.article_dir, workers=workers)
+
+    assert [r.article for r in results] == [row.article for row in rows]
+    assert all(r.ok for r in results), [r.error for r in results]
+    if mode == "tiles":
+        assert any(r.images > 1 for r in results)
+
+
+def test_derived_keys_need_the_master_key(encoder_site):
+    master_key = load_master_key(encoder_site.master_key_file, create=True)
+    rows = run_encoder(EncodeOptions(key_version=1), master_key=master_key)
+
+    assert all(r.ok for r in verify_rows(rows, encoder_site.article_dir, master_key))
+    result = verify_row(rows[0], encoder_site.article_dir)
+    assert not result.ok and "master key is required" in result.error
+
+
+def test_changed_article_and_damaged_image_fail(encoder_site):
+    rows = {row.article: row for row in run_encoder(EncodeOptions())}
+    with open(os.path.join(encoder_site.article_dir, "alpha.txt"), "a", encoding="utf-8") as f:
+        f.write(" Edited.")
+    flip_low_bits(rows["beta.txt"].img_path)
+
+    results = {r.article: r for r in verify_rows(list(rows.values()),
+                                                  encoder_site.article_dir)}
+
+    assert "article changed" in results["alpha.txt"].error
+    assert not results["beta.txt"].ok
+    assert results["beta.txt"].error.startswith("beta.png")
+    assert results["gamma.txt"].ok and results["delta.txt"].ok
+
+
+def test_damaged_atlas_fails_only_its_articles(encoder_site):
+    rows = run_encoder(EncodeOptions(atlas=True))
+    assert len({row.img_path for row in rows}) == 1
+    first = min(rows, key=lambda row: row.atlas_offset)
+    flip_low_bits(first.img_path)  # Only the first rows: the first article's slot
+
+    results = {r.article: r for r in verify_rows(rows, encoder_site.article_dir, workers=2)}
+
+    assert not results[first.article].ok
+    assert sum(not r.ok for r in results.values()) == 1
+
+
+def test_unpublished_article_is_reported(encoder_site, capsys):
+    rows = run_encoder(EncodeOptions())
+    capsys.readouterr()
+
+    assert not run_verification([r for r in rows if r.article != "delta.txt"])
+
+    out = capsys.readouterr().out
+    assert "FAIL: delta.txt - no encoded image" in out
+    assert "3 passed, 1 failed" in out
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for watch mode: change detection, debouncing and the article hash cache.
+
+Run from the project root:
+    python -m pytest -q
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.publish import hash_articles, sha256_file
+from src.watch import InotifyWatcher, PollingWatcher, article_snapshot, watch_articles
+
+
+def write(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_snapshot_lists_articles_only(site):
+    write(os.path.join(site.article_dir, "notes.md"), "not an article")
+    os.makedirs(os.path.join(site.article_dir, "dir.txt"))
+
+    snapshot = article_snapshot(site.article_dir)
+
+    assert sorted(snapshot) == sorted(site.articles)
+    assert snapshot["alpha.txt"][1] == len(site.articles["alpha.txt"])
+
+
+def test_hash_cache_rehashes_changed_files_only(site, monkeypatch):
+    names = sorted(site.articles)
+    cache = {}
+    first = hash_articles(site.article_dir, names, cache)
+    assert first == {n: sha256_file(os.path.join(site.article_dir, n)) for n in names}
+
+    hashed = []
+    monkeypatch.setattr("src.publish.sha256_file",
+                        lambda path: hashed.append(os.path.basename(path)) or sha256_file(path))
+    write(os.path.join(site.article_dir, "beta.txt"), "Changed and longer.")
+    second = hash_articles(site.article_dir, names[1:], cache)
+
+    assert hashed == ["beta.txt"]
+    assert second["beta.txt"] != first["beta.txt"]
+    assert sorted(cache) == names[1:]
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watcher_reports_changes(site, use_inotify):
+    if use_inotify:
+        try:
+            watcher = InotifyWatcher(site.article_dir)
+        except (OSError, AttributeError):
+            pytest.skip("inotify is not available")
+    else:
+        watcher = PollingWatcher(site.article_dir, poll_interval=0.01)
+    try:
+        assert not watcher.wait(0.05)
+        write(os.path.join(site.article_dir, "epsilon.txt"), "New article.")
+        assert watcher.wait(2.0)
+    finally:
+        watcher.close()
+
+
+def test_burst_of_changes_triggers_one_rebuild(site):
+    seen = []
+
+    def on_change():
+        seen.append(sorted(article_snapshot(site.article_dir)))
+        raise KeyboardInterrupt  # Stop the watch after the first rebuild
+
+    def burst():
+        time.sleep(0.1)
+        for i in range(3):
+            write(os.path.join(site.article_dir, f"new{i}.txt"), f"Article {i}.")
+            time.sleep(0.02)
+
+    writer = threading.Thread(target=burst)
+    writer.start()
+    watch_articles(site.article_dir, on_change, debounce=0.2, poll_interval=0.01,
+                   use_inotify=False)
+    writer.join()
+
+    assert seen == [sorted([*site.articles, "new0.txt", "new1.txt", "new2.txt"])]